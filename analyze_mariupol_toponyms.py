@@ -197,12 +197,26 @@ def analyze_toponyms():
             count = cur.fetchone()[0]
             logger.info(f"✅ Extracted {count} toponyms")
             
-            # Analyze naming patterns
+            # Analyze naming patterns from the precomputed rename views
+            # (maintained by toponyms.refresh_name_history after each import batch)
             logger.info("🔍 Analyzing naming patterns...")
-            analysis_sql = """
-            -- Your analysis queries here
-            """
-            cur.execute(analysis_sql)
+            cur.execute("""
+                SELECT to_char(month, 'YYYY-MM'), SUM(renames), SUM(renamed_entities)
+                FROM toponyms.mv_renames_per_month
+                GROUP BY month
+                ORDER BY month
+            """)
+            for month, renames, renamed_entities in cur.fetchall():
+                logger.info(f"   {month}: {renames} renames across {renamed_entities} entities")
+
+            cur.execute("""
+                SELECT COALESCE(district_name, '(no district)'), renames
+                FROM toponyms.mv_renames_per_district
+                ORDER BY renames DESC
+                LIMIT 10
+            """)
+            for district_name, renames in cur.fetchall():
+                logger.info(f"   {district_name}: {renames} renames")
             
             logger.info("✅ Toponym analysis complete")
             
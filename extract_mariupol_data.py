@@ -18,6 +18,9 @@ from pathlib import Path
 import osmium
 from tqdm import tqdm
 
+from scripts.utils.node_index import INDEX_TYPES
+from scripts.utils.pbf_index import apply_in_bbox
+
 # Mariupol bounding box coordinates
 MARIUPOL_BBOX = {
     'min_lon': 37.29,
@@ -136,7 +139,8 @@ def parse_timestamp(timestamp_str):
         sys.exit(1)
 
 
-def extract_mariupol_data(input_file, output_file, target_timestamp=None, description=""):
+def extract_mariupol_data(input_file, output_file, target_timestamp=None, description="", node_index=None,
+                          node_cache=True, block_index=False):
     """Extract Mariupol data from OSM file."""
     
     # Ensure output directory exists
@@ -162,7 +166,8 @@ def extract_mariupol_data(input_file, output_file, target_timestamp=None, descri
     try:
         # Process the file
         print("📊 Processing OSM data...")
-        handler.apply_file(str(input_file), locations=True)
+        bbox = (MARIUPOL_BBOX['min_lon'], MARIUPOL_BBOX['min_lat'], MARIUPOL_BBOX['max_lon'], MARIUPOL_BBOX['max_lat'])
+        choice = apply_in_bbox(handler, input_file, bbox, node_index, node_cache, block_index)
         
         # Close writer
         writer.close()
@@ -170,6 +175,7 @@ def extract_mariupol_data(input_file, output_file, target_timestamp=None, descri
         print(f"✅ Extraction complete!")
         print(f"   Processed: {handler.processed_count:,} objects")
         print(f"   Extracted: {handler.extracted_count:,} objects")
+        print(f"   Node index: {choice.index_type}" + (f" ({choice.cache}: {choice.path})" if choice.cache else ""))
         print(f"   Output size: {output_file.stat().st_size / 1024 / 1024:.1f} MB")
         
         return True
@@ -213,6 +219,26 @@ Examples:
         help='Output directory (default: data/analysis/osm)'
     )
     
+    parser.add_argument(
+        '--node-index',
+        choices=('auto',) + INDEX_TYPES,
+        default='auto',
+        help='osmium node location index (default: auto, chosen from the file size and free memory)'
+    )
+    
+    parser.add_argument(
+        '--no-node-cache',
+        action='store_true',
+        help='Do not reuse or keep the on-disk node location cache for the input file'
+    )
+    
+    parser.add_argument(
+        '--block-index',
+        action='store_true',
+        help='Read only the blocks of the input that overlap the bbox (faster on large files, '
+             'but misses objects tagged Mariupol elsewhere)'
+    )
+    
     # Time period options (mutually exclusive)
     time_group = parser.add_mutually_exclusive_group(required=True)
     
@@ -281,7 +307,10 @@ Examples:
         input_file=args.input,
         output_file=output_file,
         target_timestamp=target_timestamp,
-        description=description
+        description=description,
+        node_index=args.node_index,
+        node_cache=not args.no_node_cache,
+        block_index=args.block_index
     )
     
     if success:
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# scripts/analysis/address_stats.py
+"""
+Summary statistics for the address dataset (the figures in mariupol_summary.csv).
+
+Two sources are supported:
+  * --source: a single streaming pass over an address GeoJSON/zip, no database needed.
+  * the database: one SQL aggregate over toponyms.addresses, stored per date and per
+    district in toponyms.address_summary. With --since only the (date, district)
+    groups containing addresses loaded after that timestamp are recomputed.
+
+Results are written as CSV or Parquet depending on the output file suffix.
+"""
+
+import csv
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.config import setup_logging, PROCESSED_DATA_DIR
+from scripts.utils.geojson_stream import open_geojson, iter_geojson_features
+
+logger = setup_logging(__name__)
+
+SUMMARY_COLUMNS = [
+    'total_addresses', 'unique_streets', 'unique_postcodes', 'building_types', 'amenity_types',
+    'min_housenumber_length', 'max_housenumber_length', 'avg_building_area_sqm', 'bounding_box',
+]
+
+WEB_MERCATOR_RADIUS = 6378137.0
+
+
+def _to_web_mercator(lon: float, lat: float):
+    x = WEB_MERCATOR_RADIUS * math.radians(lon)
+    y = WEB_MERCATOR_RADIUS * math.log(math.tan(math.pi / 4 + math.radians(lat) / 2))
+    return x, y
+
+
+def _bbox_geojson(min_x: float, min_y: float, max_x: float, max_y: float) -> str:
+    """Bounding box polygon in the same shape as ST_AsGeoJSON(..., 15, 2) on an EPSG:3857 envelope."""
+    return json.dumps({
+        'type': 'Polygon',
+        'crs': {'type': 'name', 'properties': {'name': 'EPSG:3857'}},
+        'coordinates': [[[min_x, min_y], [min_x, max_y], [max_x, max_y], [max_x, min_y], [min_x, min_y]]],
+    }, separators=(',', ':'))
+
+
+class AddressSummary:
+    """Single-pass accumulator for the address summary figures."""
+
+    def __init__(self):
+        from pyproj import Geod  # geodesic areas, same as ST_Area(geography)
+        self._geod = Geod(ellps='WGS84')
+        self.total = 0
+        self.streets = set()
+        self.postcodes = set()
+        self.building_types = set()
+        self.amenities = set()
+        self.min_housenumber_length = None
+        self.max_housenumber_length = None
+        self.area_sum = 0.0
+        self.area_count = 0
+        self.bbox = [math.inf, math.inf, -math.inf, -math.inf]
+
+    def _polygon_area(self, rings) -> float:
+        area = 0.0
+        for i, ring in enumerate(rings):
+            lons = [c[0] for c in ring]
+            lats = [c[1] for c in ring]
+            ring_area = abs(self._geod.polygon_area_perimeter(lons, lats)[0])
+            area += ring_area if i == 0 else -ring_area
+        return area
+
+    def add(self, properties: Dict[str, Any], geometry: Optional[Dict[str, Any]]) -> None:
+        self.total += 1
+        for value, bucket in ((properties.get('street'), self.streets),
+                              (properties.get('postcode'), self.postcodes),
+                              (properties.get('building_type'), self.building_types),
+                              (properties.get('amenity'), self.amenities)):
+            if value is not None:
+                bucket.add(value)
+
+        housenumber = properties.get('housenumber')
+        if housenumber is not None:
+            length = len(housenumber)
+            if self.min_housenumber_length is None or length < self.min_housenumber_length:
+                self.min_housenumber_length = length
+            if self.max_housenumber_length is None or length > self.max_housenumber_length:
+                self.max_housenumber_length = length
+
+        if not geometry:
+            return
+        if geometry['type'] == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry['type'] == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            return
+
+        self.area_sum += sum(self._polygon_area(rings) for rings in polygons)
+        self.area_count += 1
+        for rings in polygons:
+            for lon, lat, *_ in rings[0]:
+                x, y = _to_web_mercator(lon, lat)
+                self.bbox[0] = min(self.bbox[0], x)
+                self.bbox[1] = min(self.bbox[1], y)
+                self.bbox[2] = max(self.bbox[2], x)
+                self.bbox[3] = max(self.bbox[3], y)
+
+    def as_row(self) -> Dict[str, Any]:
+        return {
+            'total_addresses': self.total,
+            'unique_streets': len(self.streets),
+            'unique_postcodes': len(self.postcodes),
+            'building_types': len(self.building_types),
+            'amenity_types': len(self.amenities),
+            'min_housenumber_length': self.min_housenumber_length,
+            'max_housenumber_length': self.max_housenumber_length,
+            'avg_building_area_sqm': self.area_sum / self.area_count if self.area_count else None,
+            'bounding_box': _bbox_geojson(*self.bbox) if self.area_count else None,
+        }
+
+
+def summarize_geojson(source: Path, member: str = None) -> Dict[str, Any]:
+    """Compute the summary row in one streaming pass over an address GeoJSON (or zip)."""
+    summary = AddressSummary()
+    with open_geojson(source, member) as stream:
+        for feature in iter_geojson_features(stream):
+            summary.add(feature.get('properties') or {}, feature.get('geometry'))
+    return summary.as_row()
+
+
+SQL_REFRESH_SUMMARY = """
+CREATE TEMP TABLE summary_input ON COMMIT DROP AS
+SELECT a.valid_start::date AS valid_date,
+       d.entity_id AS district_entity_id,
+       a.street_text, a.postcode, a.building_type, a.amenity, a.housenumber,
+       e.geometry,
+       (%(since)s::timestamptz IS NULL OR a.loaded_at >= %(since)s::timestamptz) AS touched
+FROM toponyms.addresses a
+JOIN toponyms.entities e ON e.entity_id = a.entity_id
+LEFT JOIN LATERAL (
+    SELECT dist.entity_id
+    FROM toponyms.entities dist
+    WHERE dist.entity_type = 'district'
+      AND dist.txn_end IS NULL
+      AND ST_GeometryType(dist.geometry) IN ('ST_Polygon', 'ST_MultiPolygon')
+      AND ST_Contains(dist.geometry, e.centroid)
+    ORDER BY ST_Area(dist.geometry)
+    LIMIT 1
+) d ON TRUE
+WHERE a.valid_start::date IN (
+    SELECT DISTINCT valid_start::date FROM toponyms.addresses
+    WHERE %(since)s::timestamptz IS NULL OR loaded_at >= %(since)s::timestamptz
+);
+
+CREATE TEMP TABLE affected_groups ON COMMIT DROP AS
+SELECT DISTINCT valid_date, district_entity_id FROM summary_input WHERE touched;
+
+DELETE FROM toponyms.address_summary s
+USING (SELECT DISTINCT valid_date FROM affected_groups) g
+WHERE s.breakdown = 'date' AND s.valid_date = g.valid_date;
+
+DELETE FROM toponyms.address_summary s
+USING affected_groups g
+WHERE s.breakdown = 'district'
+  AND s.valid_date = g.valid_date
+  AND s.district_entity_id IS NOT DISTINCT FROM g.district_entity_id;
+
+INSERT INTO toponyms.address_summary
+(breakdown, valid_date, district_entity_id, total_addresses, unique_streets, unique_postcodes,
+ building_types, amenity_types, min_housenumber_length, max_housenumber_length,
+ avg_building_area_sqm, bounding_box)
+SELECT CASE WHEN GROUPING(i.district_entity_id) = 1 THEN 'date' ELSE 'district' END,
+       i.valid_date,
+       i.district_entity_id,
+       COUNT(*),
+       COUNT(DISTINCT i.street_text),
+       COUNT(DISTINCT i.postcode),
+       COUNT(DISTINCT i.building_type),
+       COUNT(DISTINCT i.amenity),
+       MIN(char_length(i.housenumber)),
+       MAX(char_length(i.housenumber)),
+       AVG(ST_Area(i.geometry::geography)),
+       ST_AsGeoJSON(ST_SetSRID(ST_Extent(ST_Transform(i.geometry, 3857))::geometry, 3857), 15, 2)
+FROM summary_input i
+GROUP BY GROUPING SETS ((i.valid_date), (i.valid_date, i.district_entity_id))
+HAVING GROUPING(i.district_entity_id) = 1
+    OR EXISTS (
+        SELECT 1 FROM affected_groups g
+        WHERE g.valid_date = i.valid_date
+          AND g.district_entity_id IS NOT DISTINCT FROM i.district_entity_id
+    );
+"""
+
+SQL_FETCH_SUMMARY = """
+SELECT s.valid_date, s.district_entity_id, dn.name_text AS district_name,
+       s.total_addresses, s.unique_streets, s.unique_postcodes, s.building_types, s.amenity_types,
+       s.min_housenumber_length, s.max_housenumber_length, s.avg_building_area_sqm, s.bounding_box
+FROM toponyms.address_summary s
+LEFT JOIN LATERAL (
+    SELECT n.name_text FROM toponyms.names n
+    WHERE n.entity_id = s.district_entity_id AND n.txn_end IS NULL
+    ORDER BY (n.language_code = 'ukr') DESC, n.valid_start DESC
+    LIMIT 1
+) dn ON TRUE
+WHERE s.breakdown = %(breakdown)s
+ORDER BY s.valid_date, district_name NULLS LAST;
+"""
+
+
+def refresh_address_summary(db_connection, since: Optional[str] = None) -> int:
+    """
+    Recompute toponyms.address_summary. With `since`, only groups holding addresses
+    loaded at or after that timestamp are rewritten. Returns the number of group rows written.
+    """
+    with db_connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_REFRESH_SUMMARY, {'since': since})
+            written = cur.rowcount
+    logger.info(f"Refreshed {written} address summary groups" + (f" touched since {since}." if since else "."))
+    return written
+
+
+def fetch_address_summary(db_connection, breakdown: str = 'date') -> List[Dict[str, Any]]:
+    with db_connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_FETCH_SUMMARY, {'breakdown': breakdown})
+            columns = [desc[0] for desc in cur.description]
+            return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+def write_summary(rows: List[Dict[str, Any]], output: Path) -> None:
+    """Write summary rows as Parquet (.parquet) or CSV (anything else)."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if output.suffix == '.parquet':
+        import pandas as pd
+        pd.DataFrame(rows).to_parquet(output, index=False)
+    else:
+        fieldnames = list(rows[0].keys()) if rows else SUMMARY_COLUMNS
+        with open(output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+    logger.info(f"Wrote {len(rows)} summary rows to {output}")
+
+
+# --- Command Line Interface ---
+@click.command()
+@click.option('--source', type=click.Path(exists=True, dir_okay=False, readable=True), default=None,
+              help='Summarize an address GeoJSON/zip directly instead of the database.')
+@click.option('--breakdown', type=click.Choice(['date', 'district']), default='date', show_default=True,
+              help='Database mode: one row per snapshot date, or per date and district.')
+@click.option('--since', default=None,
+              help='Database mode: only recompute groups with addresses loaded at or after this timestamp.')
+@click.option('--no-refresh', is_flag=True, help='Database mode: export the stored summary without recomputing.')
+@click.option('--output', type=click.Path(dir_okay=False), default=str(PROCESSED_DATA_DIR / 'mariupol_summary.csv'),
+              show_default=True, help='Output file; .parquet writes Parquet, anything else CSV.')
+def main(source: str, breakdown: str, since: str, no_refresh: bool, output: str):
+    """
+    Computes address summary statistics and writes them as CSV or Parquet.
+    """
+    try:
+        if source:
+            logger.info(f"📊 Summarizing addresses from {source}")
+            rows = [summarize_geojson(Path(source))]
+        else:
+            from scripts.utils.database import db
+            if not no_refresh:
+                refresh_address_summary(db, since)
+            rows = fetch_address_summary(db, breakdown)
+        write_summary(rows, Path(output))
+    except Exception as e:
+        logger.error(f"❌ Failed to compute address summary: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# scripts/api/cache.py
+"""
+In-process caches for lookup service results.
+
+TTLCache is a plain LRU with a per-entry time-to-live. ResultCache adds the
+import-driven invalidation used by the service: entries are tagged with the
+entity ids in their payload, and when the database cache generation moves
+(see scripts/api/generations.py) only entries that the changed entities can
+affect are dropped, so the TTL is just a safety net.
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Set
+
+# Above these sizes a change set is checked against whole entry kinds instead of per entry
+PREFIX_CHECK_LIMIT = 2000
+BOUNDS_CHECK_LIMIT = 2000
+
+METERS_PER_DEGREE = 111320.0
+
+
+class TTLCache:
+    """Least-recently-used cache of at most `maxsize` entries, each expiring after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _on_remove(self, key: Hashable) -> None:
+        """Hook for subclasses keeping secondary indexes."""
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self._on_remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted, _ = self._entries.popitem(last=False)
+            self._on_remove(evicted)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> bool:
+        if self._entries.pop(key, None) is None:
+            return False
+        self._on_remove(key)
+        return True
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self.delete(key)
+
+    def keys(self) -> List[Hashable]:
+        return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class ResultCache(TTLCache):
+    """
+    TTLCache for query results, invalidated by database cache generations.
+
+    Keys are tuples whose first element names the result kind; the layouts the
+    invalidation understands are ('search', normalized_query, ...) and
+    ('reverse', lat, lon, as_of, radius_m, ...). Any other kind is invalidated
+    through its entity tags only.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 3600.0):
+        super().__init__(maxsize, ttl)
+        self.generation: Optional[int] = None  # database generation the entries reflect
+        self.invalidations = 0
+        self.flushes = 0
+        self._tags: Dict[Hashable, Set[str]] = {}
+        self._by_entity: Dict[str, Set[Hashable]] = {}
+
+    def _on_remove(self, key: Hashable) -> None:
+        for entity_id in self._tags.pop(key, ()):
+            keys = self._by_entity.get(entity_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_entity[entity_id]
+
+    def put(self, key: Hashable, value: Any, entity_ids: Iterable[str] = (),
+            generation: Optional[int] = None) -> None:
+        """
+        Store a result computed while the cache was at `generation`; results whose
+        generation has since moved on are dropped, since they may predate the change.
+        """
+        if generation != self.generation:
+            return
+        self.delete(key)
+        super().put(key, value)
+        if key in self._entries:
+            tags = set(entity_ids)
+            self._tags[key] = tags
+            for entity_id in tags:
+                self._by_entity.setdefault(entity_id, set()).add(key)
+
+    def advance(self, generation: int) -> None:
+        self.generation = generation
+
+    def flush(self, generation: Optional[int] = None) -> int:
+        removed = len(self)
+        self.clear()
+        self.flushes += 1
+        self.invalidations += removed
+        if generation is not None:
+            self.generation = generation
+        return removed
+
+    def invalidate_changes(self, entity_ids: Iterable[str], normalized_names: Sequence[str],
+                           bounds: Sequence[Sequence[float]], generation: int) -> int:
+        """
+        Drop entries containing any changed entity, searches whose prefix matches a
+        changed name, and reverse lookups whose radius reaches a changed entity.
+        """
+        stale: Set[Hashable] = set()
+        for entity_id in entity_ids:
+            stale.update(self._by_entity.get(entity_id, ()))
+
+        for key in self.keys():
+            if key in stale or not isinstance(key, tuple) or not key:
+                continue
+            if key[0] == 'search':
+                if len(normalized_names) > PREFIX_CHECK_LIMIT or \
+                        any(name.startswith(key[1]) for name in normalized_names):
+                    stale.add(key)
+            elif key[0] == 'reverse':
+                if len(bounds) > BOUNDS_CHECK_LIMIT or \
+                        any(_within_radius(key[1], key[2], key[4], b) for b in bounds):
+                    stale.add(key)
+
+        for key in stale:
+            self.delete(key)
+        self.invalidations += len(stale)
+        self.generation = generation
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({
+            'generation': self.generation,
+            'invalidations': self.invalidations,
+            'flushes': self.flushes,
+            'tagged_entities': len(self._by_entity),
+        })
+        return stats
+
+
+def _within_radius(lat: float, lon: float, radius_m: float, bounds: Sequence[float]) -> bool:
+    """Whether (lat, lon) lies within radius_m of a (min_lon, min_lat, max_lon, max_lat) box (approximate)."""
+    min_lon, min_lat, max_lon, max_lat = bounds
+    d_lat = radius_m / METERS_PER_DEGREE
+    d_lon = radius_m / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return (min_lat - d_lat <= lat <= max_lat + d_lat) and (min_lon - d_lon <= lon <= max_lon + d_lon)
@@ -0,0 +1,115 @@
+# scripts/api/generations.py
+"""
+Keeps a ResultCache in step with audit.cache_generation.
+
+Import batches call audit.bump_cache_generation() (DatabaseConnection.
+bump_cache_generation) with the entities they touched. GenerationWatcher
+LISTENs on the 'cache_generation' channel, polling every `poll_interval`
+seconds as a fallback, and on each new generation invalidates only the
+cached results those entities can affect. If a batch did not record its
+entities, or the watcher fell behind the retained invalidation log, the
+cache is flushed.
+"""
+
+import asyncio
+from typing import List, Optional
+
+import psycopg
+
+from scripts.api.cache import ResultCache
+from scripts.utils.config import setup_logging
+
+logger = setup_logging(__name__)
+
+SQL_CURRENT_GENERATION = "SELECT generation FROM audit.cache_generation;"
+
+SQL_INVALIDATIONS_SINCE = """
+SELECT generation, entity_ids::text[]
+FROM audit.cache_invalidations
+WHERE generation > %s
+ORDER BY generation;
+"""
+
+SQL_CHANGED_NAMES = """
+SELECT DISTINCT normalized_name
+FROM toponyms.names
+WHERE entity_id = ANY(%s::uuid[])
+  AND normalized_name IS NOT NULL;
+"""
+
+SQL_CHANGED_BOUNDS = """
+SELECT ST_XMin(geometry), ST_YMin(geometry), ST_XMax(geometry), ST_YMax(geometry)
+FROM toponyms.entities
+WHERE entity_id = ANY(%s::uuid[])
+  AND geometry IS NOT NULL;
+"""
+
+CHANNEL = 'cache_generation'
+
+
+class GenerationWatcher:
+    def __init__(self, adb, cache: ResultCache, poll_interval: float = 5.0):
+        self.adb = adb
+        self.cache = cache
+        self.poll_interval = poll_interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        async with self.adb.get_connection() as conn:
+            cur = await conn.execute(SQL_CURRENT_GENERATION)
+            row = await cur.fetchone()
+        self.cache.advance(row[0] if row else 0)
+        logger.info(f"Result cache starting at generation {self.cache.generation}")
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sync(self) -> int:
+        """Apply all invalidations newer than the cache's generation; returns entries removed."""
+        since = self.cache.generation
+        async with self.adb.get_connection() as conn:
+            cur = await conn.execute(SQL_INVALIDATIONS_SINCE, (since,))
+            batches = await cur.fetchall()
+            if not batches:
+                return 0
+            latest = batches[-1][0]
+
+            # Pruned log (gap after our generation) or a batch without entity ids: flush
+            if batches[0][0] != since + 1 or any(entity_ids is None for _, entity_ids in batches):
+                removed = self.cache.flush(latest)
+                logger.info(f"Result cache flushed at generation {latest} ({removed} entries).")
+                return removed
+
+            entity_ids: List[str] = sorted({e for _, ids in batches for e in ids})
+            cur = await conn.execute(SQL_CHANGED_NAMES, (entity_ids,))
+            names = [row[0] for row in await cur.fetchall()]
+            cur = await conn.execute(SQL_CHANGED_BOUNDS, (entity_ids,))
+            bounds = await cur.fetchall()
+
+        removed = self.cache.invalidate_changes(entity_ids, names, bounds, latest)
+        logger.info(f"Result cache at generation {latest}: {len(entity_ids)} changed entities, "
+                    f"{removed} entries invalidated.")
+        return removed
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.adb.conninfo(), autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL};")
+                    while True:
+                        # Wake on the first notification or after poll_interval, whichever comes first
+                        async for _ in conn.notifies(timeout=self.poll_interval, stop_after=1):
+                            pass
+                        await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Cache generation listener error: {e}; retrying in {self.poll_interval}s")
+                await asyncio.sleep(self.poll_interval)
@@ -0,0 +1,135 @@
+# scripts/api/queries.py
+"""
+Read-only name queries served by the lookup service (scripts/api/server.py):
+prefix search, as-of entity lookup and reverse geocoding, over the asyncio
+database layer.
+"""
+
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from psycopg.rows import dict_row
+
+SEARCH_LIMIT_MAX = 100
+REVERSE_CANDIDATES = 50  # nearest entities considered before the radius filter
+
+# Optional validity filter on an alias; %(as_of)s is NULL for "any time"
+_VALID_AT = """
+  AND ({alias}.valid_start <= %(as_of)s::timestamptz OR %(as_of)s::timestamptz IS NULL)
+  AND ({alias}.valid_end IS NULL OR {alias}.valid_end > %(as_of)s::timestamptz OR %(as_of)s::timestamptz IS NULL)
+"""
+
+SQL_SEARCH = """
+SELECT n.entity_id::text AS entity_id, e.entity_type, n.name_text, n.language_code, n.name_type,
+       n.valid_start, n.valid_end,
+       ST_X(e.centroid) AS lon, ST_Y(e.centroid) AS lat
+FROM toponyms.names n
+JOIN toponyms.entities e ON e.entity_id = n.entity_id
+WHERE n.normalized_name LIKE toponyms.normalize_name(%(q)s) || '%%'
+  AND n.txn_end IS NULL
+  AND e.txn_end IS NULL
+  AND (%(lang)s::text IS NULL OR n.language_code = %(lang)s::text)
+""" + _VALID_AT.format(alias='n') + """
+ORDER BY (n.normalized_name = toponyms.normalize_name(%(q)s)) DESC, n.name_text, n.entity_id
+LIMIT %(limit)s;
+"""
+
+SQL_ENTITY = """
+SELECT e.entity_id::text AS entity_id, e.entity_type, e.source_authority, e.verification_status,
+       e.valid_start, e.valid_end, ST_X(e.centroid) AS lon, ST_Y(e.centroid) AS lat
+FROM toponyms.entities e
+WHERE e.entity_id = %(entity_id)s::uuid
+  AND e.txn_end IS NULL;
+"""
+
+SQL_ENTITY_NAMES = """
+SELECT n.name_text, n.language_code, n.script_code, n.name_type, n.name_status,
+       n.valid_start, n.valid_end, COALESCE(n.source_type, r.source_type) AS source_type
+FROM toponyms.names n
+LEFT JOIN toponyms.import_runs r ON r.run_id = n.run_id
+WHERE n.entity_id = %(entity_id)s::uuid
+  AND n.txn_end IS NULL
+""" + _VALID_AT.format(alias='n') + """
+ORDER BY n.valid_start, n.language_code;
+"""
+
+SQL_REVERSE = """
+WITH p AS (
+    SELECT ST_SetSRID(ST_MakePoint(%(lon)s, %(lat)s), 4326) AS geom
+),
+candidates AS (
+    SELECT e.entity_id, e.entity_type, e.geometry
+    FROM toponyms.entities e, p
+    WHERE e.txn_end IS NULL
+""" + _VALID_AT.format(alias='e') + """
+    ORDER BY e.geometry <-> p.geom
+    LIMIT %(candidates)s
+)
+SELECT c.entity_id::text AS entity_id, c.entity_type, nm.name_text, nm.language_code,
+       round(ST_Distance(c.geometry::geography, p.geom::geography)::numeric, 1)::float AS distance_m
+FROM candidates c
+CROSS JOIN p
+JOIN LATERAL (
+    SELECT n.name_text, n.language_code
+    FROM toponyms.names n
+    WHERE n.entity_id = c.entity_id
+      AND n.txn_end IS NULL
+""" + _VALID_AT.format(alias='n') + """
+    ORDER BY (n.language_code = %(lang)s) DESC, n.valid_start DESC
+    LIMIT 1
+) nm ON TRUE
+WHERE ST_DWithin(c.geometry::geography, p.geom::geography, %(radius)s)
+ORDER BY distance_m
+LIMIT %(limit)s;
+"""
+
+
+def normalize_query(text: str) -> str:
+    """Python mirror of toponyms.normalize_name(), used to key cached search results."""
+    text = ''.join(c for c in text.lower() if not unicodedata.category(c).startswith('P'))
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.replace('і', 'и').replace('ї', 'и').replace('є', 'е')
+
+
+def _check_limit(limit: int) -> None:
+    if limit < 1:
+        raise ValueError(f"limit must be a positive integer, got {limit}")
+
+
+class NameQueries:
+    """Query methods over an AsyncDatabaseConnection; every method returns JSON-ready data."""
+
+    def __init__(self, adb):
+        self.adb = adb
+
+    async def _fetch(self, sql: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        async with self.adb.get_connection() as conn:
+            async with conn.cursor(row_factory=dict_row) as cur:
+                await cur.execute(sql, params)
+                return await cur.fetchall()
+
+    async def search(self, q: str, as_of: Optional[str] = None, lang: Optional[str] = None,
+                     limit: int = 20) -> List[Dict[str, Any]]:
+        _check_limit(limit)
+        return await self._fetch(SQL_SEARCH, {
+            'q': q, 'as_of': as_of, 'lang': lang, 'limit': min(limit, SEARCH_LIMIT_MAX),
+        })
+
+    async def entity(self, entity_id: str, as_of: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The entity with its names valid at `as_of` (its full name history when None)."""
+        params = {'entity_id': entity_id, 'as_of': as_of}
+        rows = await self._fetch(SQL_ENTITY, params)
+        if not rows:
+            return None
+        entity = rows[0]
+        entity['names'] = await self._fetch(SQL_ENTITY_NAMES, params)
+        return entity
+
+    async def reverse(self, lat: float, lon: float, as_of: Optional[str] = None, radius: float = 100.0,
+                      lang: str = 'ukr', limit: int = 10) -> List[Dict[str, Any]]:
+        _check_limit(limit)
+        return await self._fetch(SQL_REVERSE, {
+            'lat': lat, 'lon': lon, 'as_of': as_of, 'radius': radius, 'lang': lang,
+            'limit': min(limit, SEARCH_LIMIT_MAX), 'candidates': REVERSE_CANDIDATES,
+        })
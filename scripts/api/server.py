@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# scripts/api/server.py
+"""
+Lightweight HTTP lookup service for toponym names (stdlib asyncio, HTTP/1.1 keep-alive).
+
+Endpoints (all GET, JSON responses; `date` is YYYY-MM-DD and optional):
+    /search?q=<prefix>[&date=][&lang=ukr|rus|eng][&limit=20]
+    /entities/<entity_id>[?date=]              names valid at date, or full history
+    /reverse?lat=<lat>&lon=<lon>[&date=][&radius=100][&lang=ukr][&limit=10]
+    /health, /stats
+
+Responses are cached in-process keyed by endpoint, normalized query and date,
+and carry an ETag; requests with a matching If-None-Match get a 304. Cached
+results are invalidated by import batches through the database cache generation
+(scripts/api/generations.py); the TTL only bounds staleness if that fails.
+
+Usage:
+    python scripts/api/server.py --port 8080
+"""
+
+import asyncio
+import hashlib
+import json
+import sys
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.api.cache import ResultCache
+from scripts.api.generations import GenerationWatcher
+from scripts.api.queries import NameQueries, normalize_query
+from scripts.utils.async_database import AsyncDatabaseConnection
+from scripts.utils.config import setup_logging
+
+logger = setup_logging(__name__)
+
+LANGUAGES = ('ukr', 'rus', 'eng')
+
+
+class BadRequest(Exception):
+    pass
+
+
+class NotFound(Exception):
+    pass
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _param(params: Dict[str, list], name: str, default=None, convert: Callable = str):
+    values = params.get(name)
+    if not values or values[0] == '':
+        return default
+    try:
+        return convert(values[0])
+    except ValueError:
+        raise BadRequest(f"Invalid value for '{name}': {values[0]!r}")
+
+
+def _as_of(params: Dict[str, list]) -> Optional[str]:
+    day = _param(params, 'date', convert=date.fromisoformat)
+    return f"{day.isoformat()}T00:00:00Z" if day else None
+
+
+def _lang(params: Dict[str, list], default: Optional[str]) -> Optional[str]:
+    lang = _param(params, 'lang', default)
+    if lang is not None and lang not in LANGUAGES:
+        raise BadRequest(f"Unsupported lang {lang!r}; expected one of {', '.join(LANGUAGES)}")
+    return lang
+
+
+def _limit(params: Dict[str, list], default: int) -> int:
+    limit = _param(params, 'limit', default, int)
+    if limit < 1:
+        raise BadRequest(f"Invalid value for 'limit': {limit}; expected a positive integer")
+    return limit
+
+
+class LookupService:
+    def __init__(self, adb: AsyncDatabaseConnection, cache: ResultCache):
+        self.adb = adb
+        self.queries = NameQueries(adb)
+        self.cache = cache
+
+    # --- Routing ---
+
+    def route(self, path: str, params: Dict[str, list]) -> Tuple[Optional[tuple], Callable[[], Awaitable[Any]]]:
+        """Return (cache key or None, coroutine factory producing the JSON payload)."""
+        if path == '/search':
+            q = _param(params, 'q')
+            if not q or not normalize_query(q):
+                raise BadRequest("Parameter 'q' is required")
+            as_of, lang, limit = _as_of(params), _lang(params, None), _limit(params, 20)
+            return (('search', normalize_query(q), as_of, lang, limit),
+                    lambda: self.queries.search(q, as_of, lang, limit))
+
+        if path.startswith('/entities/'):
+            try:
+                entity_id = str(uuid.UUID(path[len('/entities/'):]))
+            except ValueError:
+                raise BadRequest("Malformed entity id")
+            as_of = _as_of(params)
+
+            async def lookup():
+                entity = await self.queries.entity(entity_id, as_of)
+                if entity is None:
+                    raise NotFound(f"Entity {entity_id} not found")
+                return entity
+            return ('entity', entity_id, as_of), lookup
+
+        if path == '/reverse':
+            lat, lon = _param(params, 'lat', convert=float), _param(params, 'lon', convert=float)
+            if lat is None or lon is None:
+                raise BadRequest("Parameters 'lat' and 'lon' are required")
+            as_of, lang = _as_of(params), _lang(params, 'ukr')
+            radius, limit = _param(params, 'radius', 100.0, float), _limit(params, 10)
+            # ~1 m grid so nearby clicks share cache entries
+            key = ('reverse', round(lat, 5), round(lon, 5), as_of, radius, lang, limit)
+            return key, lambda: self.queries.reverse(round(lat, 5), round(lon, 5), as_of, radius, lang, limit)
+
+        if path == '/health':
+            async def health():
+                return {'status': 'ok' if await self.adb.test_connection() else 'degraded'}
+            return None, health
+
+        if path == '/stats':
+            async def stats():
+                return {'cache': self.cache.stats(),
+                        'pool': self.adb.pool.get_stats() if self.adb.pool else None}
+            return None, stats
+
+        raise NotFound(f"No route for {path}")
+
+    async def dispatch(self, method: str, target: str, headers: Dict[str, str]) -> Tuple[int, bytes, Dict[str, str]]:
+        if method not in ('GET', 'HEAD'):
+            return HTTPStatus.METHOD_NOT_ALLOWED, b'', {'Allow': 'GET, HEAD'}
+        url = urlsplit(target)
+        try:
+            key, produce = self.route(url.path.rstrip('/') or '/', parse_qs(url.query))
+            cached = self.cache.get(key) if key is not None else None
+            if cached is None:
+                generation = self.cache.generation
+                payload = await produce()
+                body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode('utf-8')
+                cached = (body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"')
+                if key is not None:
+                    self.cache.put(key, cached, _entity_ids(payload), generation)
+        except BadRequest as e:
+            return HTTPStatus.BAD_REQUEST, _error_body(e), {}
+        except NotFound as e:
+            return HTTPStatus.NOT_FOUND, _error_body(e), {}
+        except Exception as e:
+            logger.error(f"❌ Error handling {target}: {e}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, _error_body('internal error'), {}
+
+        body, etag = cached
+        response_headers = {'ETag': etag}
+        if key is not None:
+            # Imports can change results at any time: clients revalidate via the ETag
+            response_headers['Cache-Control'] = 'no-cache'
+        if etag in (t.strip() for t in headers.get('if-none-match', '').split(',')):
+            return HTTPStatus.NOT_MODIFIED, b'', response_headers
+        return HTTPStatus.OK, body, response_headers
+
+    # --- HTTP/1.1 ---
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, b'', {}, False, False)
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))  # bodies are ignored
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                status, body, extra = await self.dispatch(method, target, headers)
+                await self._respond(writer, status, body, extra, keep_alive, method == 'HEAD')
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status: int, body: bytes, headers: Dict[str, str], keep_alive: bool,
+                       head_only: bool) -> None:
+        status = HTTPStatus(status)
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if body:
+            lines.append("Content-Type: application/json; charset=utf-8")
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (b'' if head_only else body))
+        await writer.drain()
+
+
+def _entity_ids(payload) -> set:
+    """Entity ids a result depends on (for cache invalidation)."""
+    rows = payload if isinstance(payload, list) else [payload]
+    return {row['entity_id'] for row in rows if isinstance(row, dict) and row.get('entity_id')}
+
+
+def _error_body(error) -> bytes:
+    return json.dumps({'error': str(error)}, ensure_ascii=False).encode('utf-8')
+
+
+async def serve(host: str, port: int, cache_size: int, cache_ttl: float, pool_size: int,
+                poll_interval: float) -> None:
+    async with AsyncDatabaseConnection(min_size=min(2, pool_size), max_size=pool_size) as adb:
+        cache = ResultCache(cache_size, cache_ttl)
+        watcher = GenerationWatcher(adb, cache, poll_interval)
+        await watcher.start()
+        service = LookupService(adb, cache)
+        server = await asyncio.start_server(service.handle_client, host, port)
+        logger.info(f"🌐 Lookup service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await watcher.stop()
+
+
+# --- Command Line Interface ---
+@click.command()
+@click.option('--host', default='127.0.0.1', show_default=True)
+@click.option('--port', default=8080, show_default=True, type=int)
+@click.option('--cache-size', default=10000, show_default=True, type=int, help='Maximum cached responses.')
+@click.option('--cache-ttl', default=3600.0, show_default=True, type=float,
+              help='Upper bound on how long a cached response is served (imports invalidate earlier).')
+@click.option('--pool-size', default=10, show_default=True, type=int, help='Maximum database connections.')
+@click.option('--poll-interval', default=5.0, show_default=True, type=float,
+              help='Seconds between cache generation checks when no notification arrives.')
+def main(host: str, port: int, cache_size: int, cache_ttl: float, pool_size: int, poll_interval: float):
+    """
+    Serves name search, as-of lookup and reverse geocoding over HTTP.
+    """
+    try:
+        asyncio.run(serve(host, port, cache_size, cache_ttl, pool_size, poll_interval))
+    except KeyboardInterrupt:
+        logger.info("Lookup service stopped.")
+
+
+if __name__ == "__main__":
+    main()
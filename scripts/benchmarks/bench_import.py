@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# scripts/benchmarks/bench_import.py
+"""
+Benchmark harness for the PBF import pipeline.
+
+Generates a synthetic OSM PBF file of configurable size around MARIUPOL_BBOX,
+runs each stage of PBFImporter / DataLoader (parse, clean, classify, load, and the
+--bulk load as 'bulk') against a local Postgres and appends wall time, rows/s and
+peak RSS per stage to a JSON results file keyed by git commit, so runs can be
+compared across commits.
+
+Usage:
+    python scripts/benchmarks/bench_import.py run --size medium --importer both
+    python scripts/benchmarks/bench_import.py run --ways 50000 --stages parse,clean,classify
+    python scripts/benchmarks/bench_import.py run --size large --importer pbf --stages load,bulk
+    python scripts/benchmarks/bench_import.py compare <base-commit> <head-commit>
+
+The load stage writes into the configured database (override with --database to use
+a scratch copy); rows it inserts are tagged with a per-run source_authority and
+deleted afterwards unless --keep-rows is given.
+The bulk stage needs toponyms.names partitioned (scripts/maintenance/partition_names.py).
+"""
+
+import importlib
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import click
+import osmium
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.config import setup_logging, DATA_DIR, DB_CONFIG, MARIUPOL_BBOX, PROJECT_ROOT
+
+logger = setup_logging(__name__)
+
+BENCHMARK_DIR = DATA_DIR / 'benchmarks'
+RESULTS_FILE = BENCHMARK_DIR / 'import_results.json'
+
+# 'bulk' loads the same features as 'load' through load_features_bulk (--bulk);
+# neither feeds the other, and the rows of 'load' are removed before 'bulk' runs
+STAGES = ['parse', 'clean', 'classify', 'load', 'bulk']
+IMPORTERS = {
+    'pbf': ('scripts.import.import_osm_pbf', 'PBFImporter'),
+    'loader': ('scripts.import.process_osm_data', 'DataLoader'),
+}
+
+# Named ways per preset; every named way is accompanied by one unnamed way as parse noise
+SIZE_PRESETS = {
+    'small': 1000,
+    'medium': 10000,
+    'large': 100000,
+}
+
+STREET_KINDS = [
+    ('вулиця', 'улица', 'Street', 'residential'),
+    ('проспект', 'проспект', 'Avenue', 'primary'),
+    ('провулок', 'переулок', 'Lane', 'service'),
+    ('бульвар', 'бульвар', 'Boulevard', 'secondary'),
+]
+PLACE_TYPES = ['suburb', 'neighbourhood', 'village', 'hamlet']
+
+
+# --- Synthetic fixtures ---
+
+def generate_synthetic_pbf(path: Path, named_ways: int, nodes_per_way: int = 12, places: int = 200,
+                           relations: int = 20, seed: int = 42) -> Dict[str, int]:
+    """
+    Write a PBF with `named_ways` named streets (plus as many unnamed service ways),
+    named place nodes and administrative relations, all inside MARIUPOL_BBOX.
+    Returns the number of objects written per type.
+    """
+    rng = random.Random(seed)
+    min_lat, min_lon, max_lat, max_lon = (float(p) for p in MARIUPOL_BBOX.split(','))
+    step = 0.0004  # ~40 m between consecutive way nodes
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        path.unlink()
+
+    # Node coordinates first: osmium expects nodes, ways, relations in that order
+    way_nodes: List[List[int]] = []
+    node_id = 1
+    writer = osmium.SimpleWriter(str(path))
+    try:
+        for _ in range(named_ways * 2):
+            lat = rng.uniform(min_lat, max_lat)
+            lon = rng.uniform(min_lon, max_lon)
+            d_lat, d_lon = rng.choice([(step, 0.0), (0.0, step), (step, step), (step, -step)])
+            refs = []
+            for _ in range(nodes_per_way):
+                writer.add_node(osmium.osm.mutable.Node(id=node_id, location=(lon, lat)))
+                refs.append(node_id)
+                node_id += 1
+                lat = min(max(lat + d_lat, min_lat), max_lat)
+                lon = min(max(lon + d_lon, min_lon), max_lon)
+            way_nodes.append(refs)
+
+        for i in range(places):
+            place = rng.choice(PLACE_TYPES)
+            writer.add_node(osmium.osm.mutable.Node(
+                id=node_id,
+                location=(rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)),
+                tags={'place': place, 'name': f"Мікрорайон {i}", 'name:ru': f"Микрорайон {i}"},
+            ))
+            node_id += 1
+
+        for way_id, refs in enumerate(way_nodes, start=1):
+            if way_id % 2:
+                uk, ru, en, highway = rng.choice(STREET_KINDS)
+                n = way_id // 2
+                tags = {'highway': highway, 'name': f"{uk} Синтетична {n}",
+                        'name:uk': f"{uk} Синтетична {n}", 'name:ru': f"{ru} Синтетическая {n}",
+                        'name:en': f"Synthetic {en} {n}"}
+            else:
+                tags = {'highway': 'service'}
+            writer.add_way(osmium.osm.mutable.Way(id=way_id, nodes=refs, tags=tags))
+
+        for rel_id in range(1, relations + 1):
+            members = [('w', rng.randint(1, len(way_nodes)), 'outer') for _ in range(4)]
+            writer.add_relation(osmium.osm.mutable.Relation(
+                id=rel_id, members=members,
+                tags={'type': 'boundary', 'boundary': 'administrative', 'admin_level': '9',
+                      'name': f"Синтетичний район {rel_id}"},
+            ))
+    finally:
+        writer.close()
+
+    return {'nodes': node_id - 1, 'ways': len(way_nodes), 'relations': relations}
+
+
+# --- Measurement ---
+
+def _reset_peak_rss() -> None:
+    """Reset the kernel's peak RSS (VmHWM) counter so each stage reports its own peak."""
+    try:
+        Path('/proc/self/clear_refs').write_text('5')
+    except OSError:
+        pass  # not Linux / not permitted: peaks become cumulative
+
+
+def _peak_rss_mb() -> float:
+    try:
+        for line in Path('/proc/self/status').read_text().splitlines():
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def measure_stage(name: str, func: Callable[[], Any], count: Callable[[Any], int] = len) -> Tuple[Any, Dict[str, float]]:
+    """Run one stage and return (result, {seconds, rows, rows_per_s, peak_rss_mb})."""
+    _reset_peak_rss()
+    started = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - started
+    rows = count(result)
+    metrics = {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_s': round(rows / seconds, 1) if seconds > 0 else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+    logger.info(f"   {name:<9} {seconds:8.3f}s  {rows:>8} rows  {metrics['rows_per_s'] or 0:>10.1f} rows/s  "
+                f"{metrics['peak_rss_mb']:.1f} MB peak")
+    return result, metrics
+
+
+def run_importer_stages(importer, pbf_path: Path, stages: List[str], source_authority: str,
+                        valid_start: str, cleanup: Callable[[], Any] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Run the requested stages in pipeline order; earlier stages run (unmeasured) when
+    needed as input. `cleanup` removes the rows of 'load' before 'bulk' runs.
+    """
+    results = {}
+    last_needed = max(STAGES.index(s) for s in stages)
+
+    def stage(name, func, count=len):
+        if name in stages:
+            value, results[name] = measure_stage(name, func, count)
+            return value
+        return func()
+
+    features = stage('parse', lambda: importer.extract_features(pbf_path))
+    if last_needed >= 1:
+        gdf = stage('clean', lambda: importer.clean_geometries(features))
+    if last_needed >= 2:
+        gdf = stage('classify', lambda: importer.classify_features(gdf))
+    if 'load' in stages:
+        stage('load', lambda: importer.load_features(gdf, valid_start, source_authority),
+              count=lambda inserted: len(gdf))
+    if 'bulk' in stages:
+        if 'load' in stages and cleanup:
+            cleanup()  # the bulk path only rebuilds an empty year partition
+        stage('bulk', lambda: importer.load_features_bulk(gdf, valid_start, source_authority),
+              count=lambda inserted: len(gdf))
+        if 'load' in results:
+            load_s, bulk_s = results['load']['seconds'], results['bulk']['seconds']
+            logger.info(f"   bulk load {bulk_s:.3f}s vs constraint-checked load {load_s:.3f}s "
+                        f"({(bulk_s - load_s) / load_s * 100 if load_s else 0.0:+.1f}%)")
+    return results
+
+
+def cleanup_benchmark_rows(db_connection, source_authority: str) -> int:
+    """Delete entities written by a benchmark run (names and derived rows cascade) and its import runs."""
+    with db_connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM toponyms.entities WHERE source_authority = %s;", (source_authority,))
+            removed = cur.rowcount
+            cur.execute("DELETE FROM toponyms.import_runs WHERE source_authority = %s;", (source_authority,))
+            return removed
+
+
+# --- Results file ---
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_results(path: Path = RESULTS_FILE) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def append_result(run: Dict[str, Any], path: Path = RESULTS_FILE) -> None:
+    runs = load_results(path)
+    runs.append(run)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(runs, f, indent=2, ensure_ascii=False)
+
+
+def latest_run(runs: List[Dict[str, Any]], commit: str) -> Optional[Dict[str, Any]]:
+    matching = [r for r in runs if r.get('commit') and r['commit'].startswith(commit)]
+    return matching[-1] if matching else None
+
+
+# --- Command Line Interface ---
+@click.group()
+def cli():
+    """Import pipeline benchmarks."""
+
+
+@cli.command()
+@click.option('--size', type=click.Choice(list(SIZE_PRESETS)), default='small', show_default=True,
+              help='Preset number of named ways in the synthetic PBF.')
+@click.option('--ways', type=int, default=None, help='Number of named ways (overrides --size).')
+@click.option('--nodes-per-way', type=int, default=12, show_default=True)
+@click.option('--places', type=int, default=200, show_default=True, help='Named place nodes.')
+@click.option('--seed', type=int, default=42, show_default=True)
+@click.option('--importer', 'importer_name', type=click.Choice(list(IMPORTERS) + ['both']), default='both',
+              show_default=True, help='pbf = PBFImporter, loader = DataLoader.')
+@click.option('--stages', default=','.join(STAGES), show_default=True, help='Comma-separated stages to time.')
+@click.option('--database', default=None, help='Database to load into (default: DB_CONFIG database).')
+@click.option('--keep-rows', is_flag=True, help='Keep rows written by the load stage.')
+@click.option('--results', type=click.Path(dir_okay=False), default=str(RESULTS_FILE), show_default=True)
+def run(size, ways, nodes_per_way, places, seed, importer_name, stages, database, keep_rows, results):
+    """Generate a synthetic PBF and time each import stage."""
+    from scripts.utils.database import DatabaseConnection
+
+    stage_list = [s.strip() for s in stages.split(',') if s.strip()]
+    unknown = set(stage_list) - set(STAGES)
+    if unknown:
+        raise click.BadParameter(f"Unknown stages: {', '.join(sorted(unknown))}", param_hint='--stages')
+
+    named_ways = ways or SIZE_PRESETS[size]
+    pbf_path = BENCHMARK_DIR / f"synthetic_{named_ways}w_{nodes_per_way}n_{seed}.osm.pbf"
+    if not pbf_path.exists():
+        logger.info(f"Generating synthetic PBF with {named_ways} named ways: {pbf_path}")
+        generate_synthetic_pbf(pbf_path, named_ways, nodes_per_way, places, seed=seed)
+
+    config = dict(DB_CONFIG, database=database) if database else DB_CONFIG
+    db_connection = DatabaseConnection(config)
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    source_authority = f"benchmark:{run_id}"
+
+    record = {
+        'commit': git_commit(),
+        'run_id': run_id,
+        'python': platform.python_version(),
+        'params': {'named_ways': named_ways, 'nodes_per_way': nodes_per_way, 'places': places,
+                   'seed': seed, 'pbf_bytes': pbf_path.stat().st_size},
+        'importers': {},
+    }
+
+    names = list(IMPORTERS) if importer_name == 'both' else [importer_name]
+    try:
+        for name in names:
+            module_name, class_name = IMPORTERS[name]
+            # Time the parse itself, not a reload of features cached by an earlier run
+            importer = getattr(importlib.import_module(module_name), class_name)(db_connection, feature_cache=False)
+            logger.info(f"⏱  {class_name} ({', '.join(stage_list)})")
+            record['importers'][name] = run_importer_stages(
+                importer, pbf_path, stage_list, source_authority, '2022-02-23T00:00:00Z',
+                cleanup=lambda: cleanup_benchmark_rows(db_connection, source_authority))
+    finally:
+        if {'load', 'bulk'} & set(stage_list) and not keep_rows:
+            removed = cleanup_benchmark_rows(db_connection, source_authority)
+            logger.info(f"Removed {removed} benchmark entities.")
+
+    append_result(record, Path(results))
+    logger.info(f"✅ Results appended to {results}")
+
+
+@cli.command()
+@click.argument('base')
+@click.argument('head')
+@click.option('--results', type=click.Path(dir_okay=False), default=str(RESULTS_FILE), show_default=True)
+def compare(base, head, results):
+    """Compare the latest runs recorded for two commits."""
+    runs = load_results(Path(results))
+    base_run, head_run = latest_run(runs, base), latest_run(runs, head)
+    for commit, found in ((base, base_run), (head, head_run)):
+        if found is None:
+            raise click.ClickException(f"No benchmark run recorded for commit {commit}")
+    if base_run['params'] != head_run['params']:
+        logger.warning("Runs used different fixture parameters; numbers are not directly comparable.")
+
+    click.echo(f"{'importer':<8} {'stage':<9} {'base s':>9} {'head s':>9} {'change':>8} {'head MB':>8}")
+    for importer, stages in head_run['importers'].items():
+        for stage_name, metrics in stages.items():
+            base_metrics = base_run['importers'].get(importer, {}).get(stage_name)
+            if not base_metrics:
+                continue
+            change = (metrics['seconds'] - base_metrics['seconds']) / base_metrics['seconds'] * 100 \
+                if base_metrics['seconds'] else 0.0
+            click.echo(f"{importer:<8} {stage_name:<9} {base_metrics['seconds']:>9.3f} {metrics['seconds']:>9.3f} "
+                       f"{change:>+7.1f}% {metrics['peak_rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# scripts/benchmarks/bench_partitions.py
+"""
+Shows partition pruning on temporal name queries.
+
+Runs EXPLAIN (ANALYZE, BUFFERS) for an as-of query (names valid at a date) and
+a snapshot query (names whose validity starts in a given month) against
+toponyms.names, and against toponyms.names_unpartitioned while it still exists
+after scripts/maintenance/partition_names.py, and reports how many partitions
+each plan touched, buffers and execution time.
+
+An as-of query can only skip partitions starting after the date; the snapshot
+query should touch a single partition.
+
+Usage:
+    python scripts/benchmarks/bench_partitions.py
+    python scripts/benchmarks/bench_partitions.py --date 2015-06-01 --date 2022-02-23
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Set
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.database import db
+from scripts.utils.config import setup_logging, PRE_WAR_DATE
+
+logger = setup_logging(__name__)
+
+TABLES = ['toponyms.names', 'toponyms.names_unpartitioned']
+
+QUERIES = {
+    'as_of': """
+        SELECT count(*) FROM {table} n
+        WHERE n.txn_end IS NULL
+          AND n.valid_start <= %(day)s::timestamptz
+          AND (n.valid_end IS NULL OR n.valid_end > %(day)s::timestamptz)
+    """,
+    'snapshot': """
+        SELECT count(*) FROM {table} n
+        WHERE n.valid_start >= date_trunc('month', %(day)s::timestamptz)
+          AND n.valid_start < date_trunc('month', %(day)s::timestamptz) + INTERVAL '1 month'
+    """,
+}
+
+SQL_PARTITION_COUNT = "SELECT count(*) FROM pg_inherits WHERE inhparent = to_regclass(%s);"
+
+
+def _scanned_relations(plan: Dict[str, Any], found: Set[str]) -> Set[str]:
+    if 'Relation Name' in plan:
+        found.add(plan['Relation Name'])
+    for child in plan.get('Plans', []):
+        _scanned_relations(child, found)
+    return found
+
+
+def explain(cur, table: str, query: str, day: str) -> Dict[str, Any]:
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + QUERIES[query].format(table=table), {'day': day})
+    result = cur.fetchone()[0]
+    result = (json.loads(result) if isinstance(result, str) else result)[0]
+    plan = result['Plan']
+    return {
+        'relations': sorted(_scanned_relations(plan, set())),
+        'buffers': plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0),
+        'ms': result['Execution Time'],
+    }
+
+
+# --- Command Line Interface ---
+@click.command()
+@click.option('--date', 'dates', multiple=True, default=['2015-06-01', PRE_WAR_DATE], show_default=True,
+              help='Dates (YYYY-MM-DD) to query; repeatable.')
+def main(dates: List[str]):
+    """
+    Reports partitions scanned, buffers and time for as-of and snapshot name queries.
+    """
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            tables = []
+            for table in TABLES:
+                cur.execute("SELECT to_regclass(%s) IS NOT NULL", (table,))
+                if cur.fetchone()[0]:
+                    cur.execute(SQL_PARTITION_COUNT, (table,))
+                    tables.append((table, cur.fetchone()[0]))
+            if not tables or tables[0][1] == 0:
+                logger.warning("toponyms.names is not partitioned; run scripts/maintenance/partition_names.py migrate")
+
+            click.echo(f"{'query':<9} {'date':<11} {'table':<29} {'partitions':>10} {'buffers':>9} {'ms':>9}")
+            for query in QUERIES:
+                for day in dates:
+                    for table, partitions in tables:
+                        stats = explain(cur, table, query, day)
+                        scanned = f"{len(stats['relations'])}/{partitions}" if partitions else '-'
+                        click.echo(f"{query:<9} {day:<11} {table:<29} {scanned:>10} "
+                                   f"{stats['buffers']:>9} {stats['ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
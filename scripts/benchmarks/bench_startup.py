@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# scripts/benchmarks/bench_startup.py
+"""
+Startup-time check for the command line scripts.
+
+Runs `python <script> --help` for each CLI in a fresh interpreter, reports the
+best wall time over --repeat runs, and exits non-zero if any exceeds --max-ms,
+so heavy imports creeping back into module level fail the check. With
+--importtime the slowest imports of each script are listed as well
+(`python -X importtime`).
+
+Usage:
+    python scripts/benchmarks/bench_startup.py
+    python scripts/benchmarks/bench_startup.py --max-ms 300 --importtime
+    python scripts/benchmarks/bench_startup.py scripts/import/import_osm_pbf.py
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.config import setup_logging, PROJECT_ROOT
+
+logger = setup_logging(__name__)
+
+DEFAULT_SCRIPTS = [
+    'scripts/import/import_osm_pbf.py',
+    'scripts/import/process_osm_data.py',
+    'scripts/import/import_osm_historical.py',
+    'scripts/import/import_addresses.py',
+    'scripts/import/link_addresses.py',
+    'scripts/export/export_geoparquet.py',
+    'scripts/export/vector_tiles.py',
+    'scripts/analysis/address_stats.py',
+    'scripts/api/server.py',
+]
+
+
+def _env() -> Dict[str, str]:
+    # Not every script puts the project root on sys.path itself
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get('PYTHONPATH')]))
+    return env
+
+
+def _interpreter_ms() -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'pass'], check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def time_help(script: str, repeat: int) -> float:
+    """Best wall time in ms of `python <script> --help` over `repeat` runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = subprocess.run([sys.executable, script, '--help'], cwd=PROJECT_ROOT, env=_env(),
+                                capture_output=True, text=True)
+        elapsed = (time.perf_counter() - started) * 1000
+        if result.returncode != 0:
+            raise click.ClickException(f"{script} --help failed:\n{result.stderr.strip()}")
+        best = min(best, elapsed)
+    return best
+
+
+def slowest_imports(script: str, top: int) -> List[Tuple[float, str]]:
+    """(cumulative ms, module) for the slowest top-level imports of a script, from -X importtime."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', script, '--help'], cwd=PROJECT_ROOT,
+                            env=_env(), capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        if module.startswith(' ' * 2):  # nested import, already counted in its parent
+            continue
+        imports.append((int(cumulative) / 1000, module.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+@click.command()
+@click.argument('scripts', nargs=-1)
+@click.option('--repeat', default=5, show_default=True, type=int, help='Runs per script; the best is reported.')
+@click.option('--max-ms', default=400.0, show_default=True, type=float,
+              help='Fail if any script takes longer than this to print its help.')
+@click.option('--importtime', is_flag=True, help='Also list the slowest top-level imports per script.')
+@click.option('--top', default=5, show_default=True, type=int, help='Imports listed with --importtime.')
+def main(scripts, repeat: int, max_ms: float, importtime: bool, top: int):
+    """
+    Times `--help` of the command line scripts against a startup budget.
+    """
+    baseline = min(_interpreter_ms() for _ in range(repeat))
+    click.echo(f"{'script':<45} {'help ms':>8}   (bare interpreter: {baseline:.0f} ms)")
+
+    too_slow = []
+    for script in scripts or DEFAULT_SCRIPTS:
+        elapsed = time_help(script, repeat)
+        flag = '' if elapsed <= max_ms else '  > budget'
+        click.echo(f"{script:<45} {elapsed:>8.0f}{flag}")
+        if elapsed > max_ms:
+            too_slow.append(script)
+        if importtime:
+            for cumulative, module in slowest_imports(script, top):
+                click.echo(f"    {cumulative:>8.1f} ms  {module}")
+
+    if too_slow:
+        raise click.ClickException(f"{len(too_slow)} script(s) over the {max_ms:.0f} ms startup budget: "
+                                   f"{', '.join(too_slow)}")
+
+
+if __name__ == "__main__":
+    main()
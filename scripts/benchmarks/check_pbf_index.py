@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# scripts/benchmarks/check_pbf_index.py
+"""
+Correctness check for the PBF block index (scripts/utils/pbf_index.py).
+
+The block index decodes PBF blocks with its own minimal protobuf reader rather
+than through osmium, so this compares the two. It writes synthetic PBF files
+with osmium.SimpleWriter in each encoding the index has to understand (dense
+and plain nodes, zlib, uncompressed and lz4 blobs, nodes without a location,
+a history file with deleted node versions), builds the index of each with a dense and a sparse node
+location cache, and checks that
+
+- every block's kind, id range and bbox match what osmium reads from a file
+  holding only that block;
+- every node and way inside a bbox is in the blocks the index selects for it.
+
+Nothing outside a temporary directory is read or written. Exits non-zero on
+any mismatch.
+
+Usage:
+    python scripts/benchmarks/check_pbf_index.py
+    python scripts/benchmarks/check_pbf_index.py --nodes 500000 --bboxes 20 --seed 7
+"""
+
+import random
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import click
+import osmium
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.config import setup_logging, MARIUPOL_BBOX
+from scripts.utils.node_index import NodeIndexChoice
+from scripts.utils.pbf_index import Bbox, BlockIndex
+
+logger = setup_logging(__name__)
+
+# name -> (osmium file format, whether the file holds several versions per object)
+ENCODINGS = {
+    'dense': ('pbf', False),
+    'plain-nodes': ('pbf,pbf_dense_nodes=false', False),
+    'uncompressed': ('pbf,pbf_compression=none', False),
+    'lz4': ('pbf,pbf_compression=lz4', False),  # not decoded: blocks must be kept as 'unknown'
+    'history': ('osh.pbf', True),               # with visible flags, as in full-history dumps
+}
+CACHE_TYPES = ('dense_file_array', 'sparse_file_array')
+TOLERANCE = 1e-7  # one unit of osmium::Location
+WALK_NODES = 500
+
+
+# --- Synthetic input ---
+
+def generate_pbf(path: Path, fmt: str, history: bool, nodes: int, seed: int) -> None:
+    """
+    Write `nodes` nodes as random walks around MARIUPOL_BBOX, started row by
+    row over a grid (so consecutive ids are close together, as in real
+    extracts), ways over runs of them and over scattered nodes, and a few
+    relations. Some nodes have no location; in history files they get a
+    location and then a deleted version instead, and some ways a second version.
+    """
+    rng = random.Random(seed)
+    min_lat, min_lon, max_lat, max_lon = (float(p) for p in MARIUPOL_BBOX.split(','))
+    # Twice the city in each direction, so some blocks lie outside any check bbox
+    d_lat, d_lon = max_lat - min_lat, max_lon - min_lon
+    area = (min_lon - d_lon, min_lat - d_lat, max_lon + d_lon, max_lat + d_lat)
+    walks = (nodes + WALK_NODES - 1) // WALK_NODES
+    columns = max(int(walks ** 0.5), 1)
+    cell_lon, cell_lat = (area[2] - area[0]) / columns, (area[3] - area[1]) / ((walks + columns - 1) // columns)
+
+    header = osmium.io.Header()
+    header.has_multiple_object_versions = history
+    writer = osmium.SimpleWriter(osmium.io.File(str(path), fmt), header=header, overwrite=True)
+    try:
+        lon = lat = 0.0
+        for node_id in range(1, nodes + 1):
+            walk, step = divmod(node_id - 1, WALK_NODES)
+            if not step:  # walks start in grid cells row by row
+                lon = area[0] + cell_lon * (walk % columns + rng.random())
+                lat = area[1] + cell_lat * (walk // columns + rng.random())
+            lon = min(max(lon + rng.uniform(-0.0005, 0.0005), area[0]), area[2])
+            lat = min(max(lat + rng.uniform(-0.0005, 0.0005), area[1]), area[3])
+            if node_id % 97:
+                writer.add_node(osmium.osm.mutable.Node(id=node_id, version=1, location=(lon, lat)))
+            elif history:
+                writer.add_node(osmium.osm.mutable.Node(id=node_id, version=1, location=(lon, lat)))
+                writer.add_node(osmium.osm.mutable.Node(id=node_id, version=2, visible=False))
+            else:
+                writer.add_node(osmium.osm.mutable.Node(id=node_id, version=1))  # no location
+
+        way_id = 0
+        for start in range(1, nodes - 10, 10):
+            way_id += 1
+            refs = list(range(start, start + 10))
+            if way_id % 7 == 0:  # ways reaching into other node blocks
+                refs += [rng.randint(1, nodes) for _ in range(3)]
+            versions = (1, 2) if history and way_id % 11 == 0 else (1,)
+            for version in versions:
+                writer.add_way(osmium.osm.mutable.Way(id=way_id, version=version, nodes=refs[:len(refs) - version + 1],
+                                                      tags={'highway': 'residential'}))
+
+        for rel_id in range(1, 21):
+            members = [('w', rng.randint(1, way_id), 'outer') for _ in range(4)]
+            writer.add_relation(osmium.osm.mutable.Relation(id=rel_id, version=1, members=members,
+                                                            tags={'type': 'boundary'}))
+    finally:
+        writer.close()
+
+
+# --- What osmium reads ---
+
+class _Collector(osmium.SimpleHandler):
+    """Ids per object type, node locations and way node refs of everything read."""
+
+    def __init__(self):
+        super().__init__()
+        self.ids: Dict[str, Set[int]] = {'node': set(), 'way': set(), 'relation': set()}
+        self.node_locations: Dict[int, List[Tuple[float, float]]] = {}  # all visible locations
+        self.last_location: Dict[int, Optional[Tuple[float, float]]] = {}  # what the location cache holds
+        self.way_refs: Dict[int, Set[int]] = {}
+
+    def node(self, n):
+        self.ids['node'].add(n.id)
+        location = (n.location.lon, n.location.lat) if n.location.valid() else None
+        self.last_location[n.id] = location
+        if location is not None:
+            self.node_locations.setdefault(n.id, []).append(location)
+
+    def way(self, w):
+        self.ids['way'].add(w.id)
+        self.way_refs.setdefault(w.id, set()).update(r.ref for r in w.nodes)
+
+    def relation(self, r):
+        self.ids['relation'].add(r.id)
+
+
+def read_blocks(index: BlockIndex, workdir: Path) -> List[Optional[_Collector]]:
+    """What osmium reads from a file holding only the header and each block (None for the header)."""
+    header = [block for block in index.blocks if block.kind == 'header']
+    block_path = workdir / 'block.osm.pbf'
+    seen = []
+    for block in index.blocks:
+        if block.kind == 'header':
+            seen.append(None)
+            continue
+        index.write_blocks(header + [block], block_path)
+        collector = _Collector()
+        collector.apply_file(str(block_path))
+        seen.append(collector)
+    return seen
+
+
+def merged(seen: List[Optional[_Collector]]) -> _Collector:
+    """The blocks read one by one, as one read of the whole file."""
+    full = _Collector()
+    for collector in filter(None, seen):
+        for kind, ids in collector.ids.items():
+            full.ids[kind] |= ids
+        for node_id, locations in collector.node_locations.items():
+            full.node_locations.setdefault(node_id, []).extend(locations)
+        full.last_location.update(collector.last_location)
+        for way_id, refs in collector.way_refs.items():
+            full.way_refs.setdefault(way_id, set()).update(refs)
+    return full
+
+
+def build_location_cache(pbf_path: Path, choice: NodeIndexChoice) -> None:
+    """Fill the node location cache file of `choice`, as apply_with_node_index does on a first run."""
+    locations = osmium.NodeLocationsForWays(osmium.index.create_map(choice.idx))
+    locations.ignore_errors()  # as apply_file: ways may reference deleted nodes
+    osmium.apply(str(pbf_path), locations)
+
+
+def _inside(location: Tuple[float, float], bbox: Bbox) -> bool:
+    return bbox[0] <= location[0] <= bbox[2] and bbox[1] <= location[1] <= bbox[3]
+
+
+def _bounds(locations: List[Tuple[float, float]]) -> Optional[Bbox]:
+    if not locations:
+        return None
+    lons, lats = [loc[0] for loc in locations], [loc[1] for loc in locations]
+    return min(lons), min(lats), max(lons), max(lats)
+
+
+def _same_bbox(a: Optional[Bbox], b: Optional[Bbox]) -> bool:
+    if a is None or b is None:
+        return a is b
+    return all(abs(x - y) <= TOLERANCE for x, y in zip(a, b))
+
+
+# --- Checks ---
+
+def check_blocks(index: BlockIndex, seen: List[Optional[_Collector]], full: _Collector) -> List[str]:
+    """Compare each block's entry with what osmium reads from that block alone."""
+    errors = []
+    for number, (block, collector) in enumerate(zip(index.blocks, seen)):
+        if collector is None or block.kind == 'unknown':
+            continue  # header, or not decoded (always selected)
+        kinds = [kind for kind, ids in collector.ids.items() if ids]
+        expected_kind = kinds[0] if len(kinds) == 1 else 'mixed'
+        if block.kind != expected_kind:
+            errors.append(f"block {number}: kind {block.kind}, osmium reads {expected_kind}")
+            continue
+        if block.kind == 'mixed':
+            continue
+        ids = collector.ids[block.kind]
+        if (block.min_id, block.max_id) != (min(ids), max(ids)):
+            errors.append(f"block {number}: ids {block.min_id}-{block.max_id}, osmium reads {min(ids)}-{max(ids)}")
+
+        if block.kind == 'node':
+            expected = _bounds([loc for locations in collector.node_locations.values() for loc in locations])
+        elif block.kind == 'way':
+            refs = set().union(*collector.way_refs.values())
+            expected = _bounds([full.last_location[ref] for ref in refs if full.last_location.get(ref)])
+        else:
+            continue
+        if not _same_bbox(block.bbox, expected):
+            errors.append(f"block {number} ({block.kind}): bbox {block.bbox}, expected {expected}")
+    return errors
+
+
+def check_bbox(index: BlockIndex, seen: List[Optional[_Collector]], full: _Collector,
+               bbox: Bbox) -> Tuple[List[str], int]:
+    """Every node and way inside `bbox` must be in the selected blocks; returns (errors, blocks selected)."""
+    selected = {id(block) for block in index.select(bbox)}
+    found = {'node': set(), 'way': set()}
+    for block, collector in zip(index.blocks, seen):
+        if collector is not None and id(block) in selected:
+            for kind in found:
+                found[kind] |= collector.ids[kind]
+
+    expected = {
+        'node': {node_id for node_id, locations in full.node_locations.items()
+                 if any(_inside(loc, bbox) for loc in locations)},
+        'way': {way_id for way_id, refs in full.way_refs.items()
+                if any(full.last_location.get(ref) and _inside(full.last_location[ref], bbox) for ref in refs)},
+    }
+    errors = []
+    for kind in found:
+        missing = expected[kind] - found[kind]
+        if missing:
+            errors.append(f"bbox {bbox}: {len(missing)} of {len(expected[kind])} {kind}s missing "
+                          f"(e.g. {sorted(missing)[:5]})")
+    return errors, len(selected)
+
+
+def random_bboxes(count: int, seed: int) -> List[Bbox]:
+    """MARIUPOL_BBOX and `count` random boxes from a few hundred metres to city size around it."""
+    rng = random.Random(seed)
+    min_lat, min_lon, max_lat, max_lon = (float(p) for p in MARIUPOL_BBOX.split(','))
+    bboxes = [(min_lon, min_lat, max_lon, max_lat)]
+    for _ in range(count):
+        width, height = rng.uniform(0.005, max_lon - min_lon), rng.uniform(0.005, max_lat - min_lat)
+        lon, lat = rng.uniform(min_lon - width, max_lon), rng.uniform(min_lat - height, max_lat)
+        bboxes.append((lon, lat, lon + width, lat + height))
+    return bboxes
+
+
+@click.command()
+@click.option('--nodes', default=200000, show_default=True, type=int, help='Nodes per synthetic file.')
+@click.option('--bboxes', default=10, show_default=True, type=int,
+              help='Random bboxes checked per file (MARIUPOL_BBOX is always checked).')
+@click.option('--seed', default=42, show_default=True, type=int)
+@click.option('--encoding', 'encodings', multiple=True, type=click.Choice(list(ENCODINGS)),
+              help='Encodings to check (default: all).')
+def main(nodes: int, bboxes: int, seed: int, encodings: Tuple[str, ...]):
+    """
+    Checks the PBF block index against osmium on synthetic files.
+    """
+    failures = 0
+    with tempfile.TemporaryDirectory(prefix='check_pbf_index_') as tmp:
+        workdir = Path(tmp)
+        for name in encodings or ENCODINGS:
+            fmt, history = ENCODINGS[name]
+            pbf_path = workdir / (f"{name}.osh.pbf" if history else f"{name}.osm.pbf")
+            generate_pbf(pbf_path, fmt, history, nodes, seed)
+            seen = read_blocks(BlockIndex.build(pbf_path), workdir)
+            full = merged(seen)
+
+            for cache_type in CACHE_TYPES:
+                choice = NodeIndexChoice(cache_type, 'check', path=workdir / f"{name}.{cache_type}")
+                build_location_cache(pbf_path, choice)
+                index = BlockIndex.build(pbf_path, choice)
+                kinds = {}
+                for block in index.blocks:
+                    kinds[block.kind] = kinds.get(block.kind, 0) + 1
+
+                errors = check_blocks(index, seen, full)
+                selected = []
+                for bbox in random_bboxes(bboxes, seed):
+                    bbox_errors, count = check_bbox(index, seen, full, bbox)
+                    errors += bbox_errors
+                    selected.append(count)
+
+                status = 'ok' if not errors else f"{len(errors)} error(s)"
+                click.echo(f"{name:<13} {cache_type:<18} {len(index.blocks):>4} blocks "
+                           f"({', '.join(f'{k} {v}' for k, v in sorted(kinds.items()))}), "
+                           f"{min(selected)}-{max(selected)} selected per bbox: {status}")
+                for error in errors[:20]:
+                    click.echo(f"    {error}")
+                failures += len(errors)
+                choice.path.unlink()
+
+    if failures:
+        raise click.ClickException(f"{failures} mismatch(es) between the block index and osmium")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# scripts/benchmarks/load_test_api.py
+"""
+Load test for the HTTP lookup service (scripts/api/server.py).
+
+Opens `--concurrency` keep-alive connections and replays a mix of search,
+as-of and reverse-geocode requests for `--duration` seconds, then reports
+throughput, latency percentiles, status codes and the service's cache stats.
+
+Usage:
+    make up && python scripts/api/server.py --port 8080 &
+    python scripts/benchmarks/load_test_api.py --url http://127.0.0.1:8080 --concurrency 50 --duration 30
+"""
+
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.config import setup_logging, MARIUPOL_BBOX, PRE_WAR_DATE
+
+logger = setup_logging(__name__)
+
+DEFAULT_QUERIES = [
+    'Миру', 'Металургів', 'Будівельників', 'Нахімова', 'Пушкіна', 'Гречишкіна', 'Київська',
+    'Торгова', 'Незалежності', 'Морський', 'Лівобережний', 'Центральний', 'Приморський',
+    'Кальміуський', 'Проспект', 'вулиця', 'Ленина', 'Артема', 'Азовстальська', 'Запорізьке',
+]
+DATES = [None, PRE_WAR_DATE, '2015-01-01', '2023-06-01']
+
+
+def build_requests(queries: List[str], count: int, seed: int) -> List[str]:
+    """Weighted mix of request targets: 60% search, 30% reverse geocode, 10% health."""
+    rng = random.Random(seed)
+    min_lat, min_lon, max_lat, max_lon = (float(p) for p in MARIUPOL_BBOX.split(','))
+    targets = []
+    for _ in range(count):
+        roll = rng.random()
+        day = rng.choice(DATES)
+        date_param = f"&date={day}" if day else ''
+        if roll < 0.6:
+            targets.append(f"/search?q={quote(rng.choice(queries))}{date_param}")
+        elif roll < 0.9:
+            lat = round(rng.uniform(min_lat, max_lat), 4)
+            lon = round(rng.uniform(min_lon, max_lon), 4)
+            targets.append(f"/reverse?lat={lat}&lon={lon}&radius=200{date_param}")
+        else:
+            targets.append("/health")
+    return targets
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed by server")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value.strip())
+    body = await reader.readexactly(length) if length else b''
+    return status, body
+
+
+async def _worker(host: str, port: int, targets: List[str], deadline: float,
+                  latencies: List[float], statuses: Counter, offset: int) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < deadline:
+            target = targets[i % len(targets)]
+            i += 1
+            started = time.perf_counter()
+            writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode('utf-8'))
+            await writer.drain()
+            try:
+                status, _ = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                statuses['connection_error'] += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[status] += 1
+    finally:
+        writer.close()
+
+
+async def _get_json(host: str, port: int, path: str) -> Optional[Dict]:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode('utf-8'))
+        await writer.drain()
+        status, body = await _read_response(reader)
+        return json.loads(body) if status == 200 else None
+    finally:
+        writer.close()
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_load_test(url: str, concurrency: int, duration: float, queries: List[str], seed: int) -> Dict:
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    targets = build_requests(queries, 5000, seed)
+
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(host, port, targets, deadline, latencies, statuses, offset=i * 97)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 2),
+        'requests': len(latencies),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'latency_ms': {f"p{p}": round(_percentile(latencies, p) * 1000, 2) for p in (50, 90, 95, 99)},
+        'statuses': {str(k): v for k, v in statuses.items()},
+        'service_stats': await _get_json(host, port, '/stats'),
+    }
+
+
+# --- Command Line Interface ---
+@click.command()
+@click.option('--url', default='http://127.0.0.1:8080', show_default=True, help='Base URL of the lookup service.')
+@click.option('--concurrency', default=20, show_default=True, type=int, help='Parallel keep-alive connections.')
+@click.option('--duration', default=15.0, show_default=True, type=float, help='Seconds to run.')
+@click.option('--queries', 'queries_file', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='File with one search term per line (default: built-in list of Mariupol names).')
+@click.option('--seed', default=42, show_default=True, type=int)
+@click.option('--output', type=click.Path(dir_okay=False), default=None, help='Also write the report as JSON.')
+def main(url: str, concurrency: int, duration: float, queries_file: str, seed: int, output: str):
+    """
+    Measures lookup service throughput and latency.
+    """
+    queries = DEFAULT_QUERIES
+    if queries_file:
+        queries = [line.strip() for line in Path(queries_file).read_text(encoding='utf-8').splitlines() if line.strip()]
+
+    logger.info(f"🚀 Load testing {url} with {concurrency} connections for {duration:.0f}s")
+    report = asyncio.run(run_load_test(url, concurrency, duration, queries, seed))
+
+    logger.info(f"✅ {report['requests']} requests, {report['requests_per_s']} req/s, "
+                f"latency p50 {report['latency_ms']['p50']} ms / p99 {report['latency_ms']['p99']} ms, "
+                f"statuses {report['statuses']}")
+    if report['service_stats']:
+        logger.info(f"   Cache: {report['service_stats']['cache']}")
+    if output:
+        Path(output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
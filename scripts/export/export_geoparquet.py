@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# scripts/export/export_geoparquet.py
+"""
+Script to export toponyms.entities and toponyms.names as GeoParquet snapshots.
+
+Rows are streamed from server-side (named) cursors in chunks and written one row
+group per chunk. Both tables are ordered by (district, geohash of the entity
+centroid), so each row group covers a compact area and its min/max statistics let
+readers skip everything outside the district or area they ask for, e.g.:
+
+    import pyarrow.parquet as pq
+    pq.read_table('entities.parquet', filters=[('district_name', '=', 'Центральний район')])
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import click
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.database import db
+from scripts.utils.config import setup_logging, EXPORT_DIR
+
+logger = setup_logging(__name__)
+
+DEFAULT_CHUNK_SIZE = 50000
+GEOHASH_PRECISION = 8
+
+# Shared FROM clause: active entities (optionally as of a date) with their district and spatial key
+SQL_ENTITY_SOURCE = """
+FROM toponyms.entities e
+{names_join}
+LEFT JOIN LATERAL (
+    SELECT dist.entity_id,
+           (SELECT dn.name_text FROM toponyms.names dn
+            WHERE dn.entity_id = dist.entity_id AND dn.txn_end IS NULL
+            ORDER BY (dn.language_code = 'ukr') DESC, dn.valid_start DESC
+            LIMIT 1) AS name_text
+    FROM toponyms.entities dist
+    WHERE dist.entity_type = 'district'
+      AND dist.txn_end IS NULL
+      AND ST_GeometryType(dist.geometry) IN ('ST_Polygon', 'ST_MultiPolygon')
+      AND ST_Contains(dist.geometry, COALESCE(e.centroid, ST_PointOnSurface(e.geometry)))
+    ORDER BY ST_Area(dist.geometry)
+    LIMIT 1
+) d ON TRUE
+CROSS JOIN LATERAL (
+    SELECT ST_GeoHash(COALESCE(e.centroid, ST_PointOnSurface(e.geometry)), {precision}) AS geohash
+) k
+WHERE e.txn_end IS NULL
+  AND (%(as_of)s::timestamptz IS NULL
+       OR (e.valid_start <= %(as_of)s::timestamptz
+           AND (e.valid_end IS NULL OR e.valid_end > %(as_of)s::timestamptz)))
+"""
+
+SQL_EXPORT_ENTITIES = """
+SELECT e.entity_id::text, e.entity_type, d.entity_id::text AS district_entity_id, d.name_text AS district_name,
+       k.geohash, e.source_authority, e.verification_status, e.valid_start, e.valid_end,
+       ST_XMin(e.geometry), ST_YMin(e.geometry), ST_XMax(e.geometry), ST_YMax(e.geometry),
+       ST_AsBinary(e.geometry)
+""" + SQL_ENTITY_SOURCE.format(precision=GEOHASH_PRECISION, names_join='') + """
+ORDER BY d.name_text NULLS LAST, k.geohash, e.entity_id;
+"""
+
+SQL_EXPORT_NAMES = """
+SELECT n.name_id::text, n.entity_id::text, n.name_text, n.normalized_name, n.language_code, n.script_code,
+       n.name_type, n.name_status, n.valid_start, n.valid_end,
+       COALESCE(n.source_type, r.source_type), COALESCE(n.source_reliability, r.source_reliability),
+       d.entity_id::text AS district_entity_id, d.name_text AS district_name, k.geohash
+""" + SQL_ENTITY_SOURCE.format(
+    precision=GEOHASH_PRECISION, names_join='JOIN toponyms.names n ON n.entity_id = e.entity_id '
+                                     'LEFT JOIN toponyms.import_runs r ON r.run_id = n.run_id') + """
+  AND n.txn_end IS NULL
+  AND (%(as_of)s::timestamptz IS NULL
+       OR (n.valid_start <= %(as_of)s::timestamptz
+           AND (n.valid_end IS NULL OR n.valid_end > %(as_of)s::timestamptz)))
+ORDER BY d.name_text NULLS LAST, k.geohash, n.entity_id, n.valid_start;
+"""
+
+BBOX_TYPE = pa.struct([
+    ('xmin', pa.float64()), ('ymin', pa.float64()), ('xmax', pa.float64()), ('ymax', pa.float64()),
+])
+
+ENTITIES_SCHEMA = pa.schema([
+    ('entity_id', pa.string()),
+    ('entity_type', pa.string()),
+    ('district_entity_id', pa.string()),
+    ('district_name', pa.string()),
+    ('geohash', pa.string()),
+    ('source_authority', pa.string()),
+    ('verification_status', pa.string()),
+    ('valid_start', pa.timestamp('us', tz='UTC')),
+    ('valid_end', pa.timestamp('us', tz='UTC')),
+    ('bbox', BBOX_TYPE),
+    ('geometry', pa.binary()),
+])
+
+NAMES_SCHEMA = pa.schema([
+    ('name_id', pa.string()),
+    ('entity_id', pa.string()),
+    ('name_text', pa.string()),
+    ('normalized_name', pa.string()),
+    ('language_code', pa.string()),
+    ('script_code', pa.string()),
+    ('name_type', pa.string()),
+    ('name_status', pa.string()),
+    ('valid_start', pa.timestamp('us', tz='UTC')),
+    ('valid_end', pa.timestamp('us', tz='UTC')),
+    ('source_type', pa.string()),
+    ('source_reliability', pa.string()),
+    ('district_entity_id', pa.string()),
+    ('district_name', pa.string()),
+    ('geohash', pa.string()),
+])
+
+
+def _geoparquet_schema(schema: pa.Schema) -> pa.Schema:
+    """Attach GeoParquet 1.1 metadata (WKB geometry in OGC:CRS84 with a bbox covering column)."""
+    geo = {
+        'version': '1.1.0',
+        'primary_column': 'geometry',
+        'columns': {
+            'geometry': {
+                'encoding': 'WKB',
+                'geometry_types': [],
+                'covering': {
+                    'bbox': {
+                        'xmin': ['bbox', 'xmin'], 'ymin': ['bbox', 'ymin'],
+                        'xmax': ['bbox', 'xmax'], 'ymax': ['bbox', 'ymax'],
+                    }
+                },
+            }
+        },
+    }
+    return schema.with_metadata({b'geo': json.dumps(geo).encode('utf-8')})
+
+
+def _entity_rows_to_columns(rows):
+    columns = [list(col) for col in zip(*rows)]
+    (entity_id, entity_type, district_id, district_name, geohash, authority, status,
+     valid_start, valid_end, xmin, ymin, xmax, ymax, wkb) = columns
+    bbox = [
+        None if x0 is None else {'xmin': x0, 'ymin': y0, 'xmax': x1, 'ymax': y1}
+        for x0, y0, x1, y1 in zip(xmin, ymin, xmax, ymax)
+    ]
+    wkb = [None if g is None else bytes(g) for g in wkb]
+    return [entity_id, entity_type, district_id, district_name, geohash, authority, status,
+            valid_start, valid_end, bbox, wkb]
+
+
+def _stream_to_parquet(conn, sql: str, params: dict, schema: pa.Schema, output: Path,
+                       chunk_size: int, to_columns=None) -> int:
+    """Stream a query through a named cursor into a Parquet file, one row group per chunk."""
+    written = 0
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with conn.cursor(name=f"export_{output.stem}") as cur:
+        cur.itersize = chunk_size
+        cur.execute(sql, params)
+        with pq.ParquetWriter(output, schema, compression='zstd') as writer:
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                columns = to_columns(rows) if to_columns else [list(col) for col in zip(*rows)]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=chunk_size)
+                written += len(rows)
+                logger.debug(f"Wrote {written} rows to {output}")
+    return written
+
+
+def export_snapshot(db_connection, output_dir: Path, as_of: Optional[str] = None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Export entities and names (optionally valid as of a date) to GeoParquet/Parquet files."""
+    params = {'as_of': as_of}
+    counts = {}
+    with db_connection.get_connection() as conn:
+        counts['entities'] = _stream_to_parquet(
+            conn, SQL_EXPORT_ENTITIES, params, _geoparquet_schema(ENTITIES_SCHEMA),
+            output_dir / 'entities.parquet', chunk_size, _entity_rows_to_columns)
+        counts['names'] = _stream_to_parquet(
+            conn, SQL_EXPORT_NAMES, params, NAMES_SCHEMA, output_dir / 'names.parquet', chunk_size)
+    return counts
+
+
+# --- Command Line Interface ---
+@click.command()
+@click.option('--as-of', default=None, help='Only export rows valid on this date (YYYY-MM-DD). Default: all active rows.')
+@click.option('--output-dir', type=click.Path(file_okay=False), default=None,
+              help='Output directory (default: data/exports/<as-of date or "current">).')
+@click.option('--chunk-size', default=DEFAULT_CHUNK_SIZE, show_default=True, type=int,
+              help='Rows fetched per round trip and written per Parquet row group.')
+def main(as_of: str, output_dir: str, chunk_size: int):
+    """
+    Exports entities and names to GeoParquet for analysts.
+    """
+    output_path = Path(output_dir) if output_dir else EXPORT_DIR / (as_of or 'current')
+    full_as_of = f"{as_of}T00:00:00Z" if as_of else None
+
+    logger.info(f"📦 Exporting snapshot{f' as of {as_of}' if as_of else ''} to {output_path}")
+    started = time.perf_counter()
+    try:
+        counts = export_snapshot(db, output_path, full_as_of, chunk_size)
+    except Exception as e:
+        logger.error(f"❌ GeoParquet export failed: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        sys.exit(1)
+    logger.info(
+        f"✅ Exported {counts['entities']} entities and {counts['names']} names "
+        f"in {time.perf_counter() - started:.1f}s."
+    )
+
+
+if __name__ == "__main__":
+    main()
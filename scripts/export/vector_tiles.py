@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# scripts/export/vector_tiles.py
+"""
+Mapbox Vector Tile (MVT) generation for name layers as of a date.
+
+Tiles are rendered in PostGIS with ST_AsMVT and cached on disk under
+data/tiles/<date>/<z>/<x>/<y>.mvt. Importers call invalidate_bounds() with the
+bounds of the features they wrote so only the affected cached tiles are dropped.
+
+Usage:
+    python scripts/export/vector_tiles.py tile --date 2022-02-23 --z 14 --x 9900 --y 5756 -o tile.mvt
+    python scripts/export/vector_tiles.py seed --date 2022-02-23 --min-zoom 10 --max-zoom 16 --workers 4
+    python scripts/export/vector_tiles.py invalidate --bbox 37.50,47.08,37.56,47.12
+"""
+
+import math
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.config import setup_logging, MARIUPOL_BBOX, TILE_CACHE_DIR
+
+logger = setup_logging(__name__)
+
+MVT_EXTENT = 4096
+MVT_BUFFER = 64
+MVT_MARGIN = MVT_BUFFER / MVT_EXTENT  # the buffer as a share of the tile width
+BUILDING_MIN_ZOOM = 14  # buildings are only rendered from this zoom upwards
+SEED_BATCH_SIZE = 200   # tiles rendered per connection by one seeding task
+
+SQL_RENDER_TILE = """
+WITH bounds AS (
+    SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom_3857,
+           -- features in the tile buffer too, so ST_AsMVTGeom can draw them across the edge
+           ST_Transform(ST_TileEnvelope(%(z)s, %(x)s, %(y)s, margin => %(margin)s), 4326) AS geom_4326
+),
+features AS (
+    SELECT ST_AsMVTGeom(ST_Transform(e.geometry, 3857), b.geom_3857, %(extent)s, %(buffer)s, true) AS geom,
+           e.entity_id::text AS entity_id,
+           e.entity_type,
+           COALESCE(nm.name_uk, nm.name_ru, nm.name_en) AS name,
+           nm.name_uk, nm.name_ru, nm.name_en,
+           nm.name_type,
+           to_char(nm.valid_start, 'YYYY-MM-DD') AS name_valid_start
+    FROM toponyms.entities e
+    CROSS JOIN bounds b
+    JOIN LATERAL (
+        SELECT MAX(n.name_text) FILTER (WHERE n.language_code = 'ukr') AS name_uk,
+               MAX(n.name_text) FILTER (WHERE n.language_code = 'rus') AS name_ru,
+               MAX(n.name_text) FILTER (WHERE n.language_code = 'eng') AS name_en,
+               MAX(n.name_type) AS name_type,
+               MAX(n.valid_start) AS valid_start
+        FROM toponyms.names n
+        WHERE n.entity_id = e.entity_id
+          AND n.txn_end IS NULL
+          AND n.valid_start <= %(as_of)s::timestamptz
+          AND (n.valid_end IS NULL OR n.valid_end > %(as_of)s::timestamptz)
+    ) nm ON nm.valid_start IS NOT NULL
+    WHERE e.geometry && b.geom_4326
+      AND e.txn_end IS NULL
+      AND e.valid_start <= %(as_of)s::timestamptz
+      AND (e.valid_end IS NULL OR e.valid_end > %(as_of)s::timestamptz)
+      AND (%(z)s >= %(building_min_zoom)s OR e.entity_type <> 'building')
+)
+SELECT ST_AsMVT(features, 'names', %(extent)s, 'geom')
+FROM features
+WHERE geom IS NOT NULL;
+"""
+
+
+# --- Tile math (XYZ / slippy map scheme) ---
+
+def _tile_xy(lon: float, lat: float, z: int) -> Tuple[float, float]:
+    """Fractional tile coordinates of (lon, lat) at zoom `z`."""
+    n = 2 ** z
+    lat = max(min(lat, 85.0511287798), -85.0511287798)
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return x, y
+
+
+def _clamp_tile(value: float, z: int) -> int:
+    return min(max(math.floor(value), 0), 2 ** z - 1)
+
+
+def lonlat_to_tile(lon: float, lat: float, z: int) -> Tuple[int, int]:
+    x, y = _tile_xy(lon, lat, z)
+    return _clamp_tile(x, z), _clamp_tile(y, z)
+
+
+def tile_range(bounds: Sequence[float], z: int, margin: float = 0.0) -> Tuple[int, int, int, int]:
+    """
+    Inclusive (min_x, min_y, max_x, max_y) tile range covering (min_lon, min_lat, max_lon, max_lat),
+    grown by `margin` (a share of the tile width) on every side.
+    """
+    min_lon, min_lat, max_lon, max_lat = bounds
+    min_x, min_y = _tile_xy(min_lon, max_lat, z)
+    max_x, max_y = _tile_xy(max_lon, min_lat, z)
+    return (_clamp_tile(min_x - margin, z), _clamp_tile(min_y - margin, z),
+            _clamp_tile(max_x + margin, z), _clamp_tile(max_y + margin, z))
+
+
+def tiles_for_bounds(bounds: Sequence[float], zooms: Iterable[int]) -> Iterator[Tuple[int, int, int]]:
+    for z in zooms:
+        min_x, min_y, max_x, max_y = tile_range(bounds, z)
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                yield z, x, y
+
+
+def mariupol_bounds() -> Tuple[float, float, float, float]:
+    """MARIUPOL_BBOX (min_lat, min_lon, max_lat, max_lon) as (min_lon, min_lat, max_lon, max_lat)."""
+    min_lat, min_lon, max_lat, max_lon = (float(p) for p in MARIUPOL_BBOX.split(','))
+    return min_lon, min_lat, max_lon, max_lat
+
+
+# --- Disk cache ---
+
+class TileCache:
+    """On-disk tile cache keyed by (date, z, x, y)."""
+
+    def __init__(self, root: Path = TILE_CACHE_DIR):
+        self.root = Path(root)
+
+    def path(self, date: str, z: int, x: int, y: int) -> Path:
+        return self.root / date / str(z) / str(x) / f"{y}.mvt"
+
+    def get(self, date: str, z: int, x: int, y: int) -> Optional[bytes]:
+        try:
+            return self.path(date, z, x, y).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, date: str, z: int, x: int, y: int, data: bytes) -> None:
+        path = self.path(date, z, x, y)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)  # atomic, readers never see partial tiles
+
+    def invalidate_bounds(self, bounds_list: Iterable[Sequence[float]], dates: Optional[List[str]] = None) -> int:
+        """
+        Delete cached tiles whose buffered area intersects any of the given (min_lon, min_lat,
+        max_lon, max_lat) bounds, for every cached zoom level and date (or only `dates`), since
+        a feature also shows in the MVT_BUFFER of its neighbouring tiles. Returns tiles removed.
+        """
+        if not self.root.exists():
+            return 0
+        bounds_list = list(bounds_list)
+        date_dirs = [self.root / d for d in dates] if dates else [p for p in self.root.iterdir() if p.is_dir()]
+        removed = 0
+        for date_dir in date_dirs:
+            if not date_dir.is_dir():
+                continue
+            for zoom_dir in (p for p in date_dir.iterdir() if p.is_dir() and p.name.isdigit()):
+                z = int(zoom_dir.name)
+                stale = set()
+                for bounds in bounds_list:
+                    min_x, min_y, max_x, max_y = tile_range(bounds, z, MVT_MARGIN)
+                    stale.update((x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1))
+                for x, y in stale:
+                    tile_path = zoom_dir / str(x) / f"{y}.mvt"
+                    if tile_path.exists():
+                        tile_path.unlink()
+                        removed += 1
+        if removed:
+            logger.info(f"Invalidated {removed} cached tiles.")
+        return removed
+
+    def clear(self, date: Optional[str] = None) -> None:
+        target = self.root / date if date else self.root
+        if target.exists():
+            shutil.rmtree(target)
+
+
+def invalidate_bounds(bounds_list: Iterable[Sequence[float]]) -> int:
+    """Drop cached tiles touched by features with the given bounds (called by importers)."""
+    return TileCache().invalidate_bounds(bounds_list)
+
+
+# --- Rendering ---
+
+def render_tile(conn, z: int, x: int, y: int, as_of: str) -> bytes:
+    with conn.cursor() as cur:
+        cur.execute(SQL_RENDER_TILE, {
+            'z': z, 'x': x, 'y': y,
+            'as_of': f"{as_of}T00:00:00Z",
+            'extent': MVT_EXTENT,
+            'buffer': MVT_BUFFER,
+            'margin': MVT_MARGIN,
+            'building_min_zoom': BUILDING_MIN_ZOOM,
+        })
+        tile = cur.fetchone()[0]
+    return bytes(tile) if tile is not None else b''
+
+
+def get_tile(db_connection, z: int, x: int, y: int, as_of: str, cache: Optional[TileCache] = None) -> bytes:
+    """Return a tile from the cache, rendering and caching it on a miss."""
+    cache = cache or TileCache()
+    data = cache.get(as_of, z, x, y)
+    if data is None:
+        with db_connection.get_connection() as conn:
+            data = render_tile(conn, z, x, y, as_of)
+        cache.put(as_of, z, x, y, data)
+    return data
+
+
+def _seed_batch(db_connection, cache: TileCache, tiles: List[Tuple[int, int, int]], as_of: str, force: bool) -> int:
+    rendered = 0
+    with db_connection.get_connection() as conn:
+        for z, x, y in tiles:
+            if not force and cache.path(as_of, z, x, y).exists():
+                continue
+            cache.put(as_of, z, x, y, render_tile(conn, z, x, y, as_of))
+            rendered += 1
+    return rendered
+
+
+def seed_tiles(db_connection, as_of: str, zooms: Iterable[int], bounds: Sequence[float],
+               workers: int = 4, force: bool = False) -> int:
+    """Render all tiles covering `bounds` at the given zooms in parallel; returns tiles rendered."""
+    cache = TileCache()
+    tiles = list(tiles_for_bounds(bounds, zooms))
+    batches = [tiles[i:i + SEED_BATCH_SIZE] for i in range(0, len(tiles), SEED_BATCH_SIZE)]
+    logger.info(f"Seeding {len(tiles)} tiles in {len(batches)} batches with {workers} workers.")
+
+    rendered = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_seed_batch, db_connection, cache, batch, as_of, force) for batch in batches]
+        for future in as_completed(futures):
+            rendered += future.result()
+    return rendered
+
+
+# --- Command Line Interface ---
+@click.group()
+def cli():
+    """Vector tile generation for the toponymic name layers."""
+
+
+@cli.command()
+@click.option('--date', 'as_of', required=True, help='Show names valid on this date (YYYY-MM-DD).')
+@click.option('--z', type=int, required=True)
+@click.option('--x', type=int, required=True)
+@click.option('--y', type=int, required=True)
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=None, help='Write the tile to this file.')
+def tile(as_of: str, z: int, x: int, y: int, output: str):
+    """Render (or fetch from cache) a single tile."""
+    from scripts.utils.database import db
+    data = get_tile(db, z, x, y, as_of)
+    if output:
+        Path(output).write_bytes(data)
+    logger.info(f"Tile {as_of}/{z}/{x}/{y}: {len(data)} bytes")
+
+
+@cli.command()
+@click.option('--date', 'as_of', required=True, help='Show names valid on this date (YYYY-MM-DD).')
+@click.option('--min-zoom', default=10, show_default=True, type=int)
+@click.option('--max-zoom', default=16, show_default=True, type=int)
+@click.option('--workers', default=4, show_default=True, type=int, help='Parallel rendering threads (one DB connection each).')
+@click.option('--force', is_flag=True, help='Re-render tiles that are already cached.')
+def seed(as_of: str, min_zoom: int, max_zoom: int, workers: int, force: bool):
+    """Pre-render tiles for the Mariupol bounding box."""
+    from scripts.utils.database import db
+    started = time.perf_counter()
+    rendered = seed_tiles(db, as_of, range(min_zoom, max_zoom + 1), mariupol_bounds(), workers, force)
+    logger.info(f"✅ Rendered {rendered} tiles in {time.perf_counter() - started:.1f}s.")
+
+
+@cli.command()
+@click.option('--bbox', required=True, help='min_lon,min_lat,max_lon,max_lat of the changed area.')
+@click.option('--date', 'dates', multiple=True, help='Only invalidate these dates (default: all cached dates).')
+def invalidate(bbox: str, dates: Tuple[str, ...]):
+    """Drop cached tiles intersecting a bounding box."""
+    bounds = [float(p) for p in bbox.split(',')]
+    removed = TileCache().invalidate_bounds([bounds], list(dates) or None)
+    logger.info(f"Removed {removed} cached tiles.")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# scripts/import/import_addresses.py
+"""
+Script to load the bundled Mariupol address dataset (GeoJSON inside a zip archive)
+into the toponymic database.
+
+Each address becomes a 'building' entity with its footprint geometry, a row in
+toponyms.addresses (housenumber, street, postcode, ...) and an official name
+"<street>, <housenumber>". Features are streamed straight out of the archive and
+bulk-loaded with COPY into a temporary table, then merged with set-based SQL keyed
+on (source_dataset, osm_id), so the load can be re-run without creating duplicates.
+"""
+
+import csv
+import io
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.database import db
+from scripts.utils.config import setup_logging, PROJECT_ROOT
+from scripts.utils.geojson_stream import open_geojson, iter_geojson_features
+from scripts.utils.import_runs import ImportRun
+from scripts.analysis.address_stats import refresh_address_summary
+from scripts.export.vector_tiles import invalidate_bounds
+
+logger = setup_logging(__name__)
+
+DEFAULT_ADDRESS_ZIP = PROJECT_ROOT / 'mariupol_address_database_20250629.zip'
+SOURCE_AUTHORITY = 'OpenStreetMap - Mariupol address extract'
+COPY_BATCH_SIZE = 5000
+
+LOAD_COLUMNS = ('osm_id', 'housenumber', 'street', 'city', 'postcode', 'building_type', 'amenity', 'geometry_json')
+
+SQL_CREATE_LOAD_TABLE = """
+CREATE TEMP TABLE address_load (
+    osm_id BIGINT PRIMARY KEY,
+    housenumber TEXT,
+    street TEXT,
+    city TEXT,
+    postcode TEXT,
+    building_type TEXT,
+    amenity TEXT,
+    geometry_json TEXT NOT NULL,
+    entity_id UUID,
+    is_new BOOLEAN NOT NULL DEFAULT FALSE
+) ON COMMIT DROP;
+"""
+
+SQL_COPY_LOAD_TABLE = f"COPY address_load ({', '.join(LOAD_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+SQL_ASSIGN_ENTITIES = """
+UPDATE address_load l
+SET entity_id = a.entity_id
+FROM toponyms.addresses a
+WHERE a.source_dataset = %(dataset)s AND a.osm_id = l.osm_id;
+
+UPDATE address_load
+SET entity_id = toponyms.uuid_generate_v7(), is_new = TRUE
+WHERE entity_id IS NULL;
+"""
+
+SQL_INSERT_ENTITIES = """
+INSERT INTO toponyms.entities (entity_id, entity_type, geometry, centroid, source_authority, valid_start, run_id)
+SELECT l.entity_id, 'building', g.geom, ST_Centroid(g.geom), %(source_authority)s, %(valid_start)s::timestamptz,
+       %(run_id)s::uuid
+FROM address_load l
+CROSS JOIN LATERAL (SELECT ST_SetSRID(ST_GeomFromGeoJSON(l.geometry_json), 4326) AS geom) g
+WHERE l.is_new
+ORDER BY toponyms.spatial_key(g.geom, ST_Centroid(g.geom));  -- written in clustering order
+"""
+
+SQL_UPSERT_ADDRESSES = """
+INSERT INTO toponyms.addresses
+(entity_id, source_dataset, osm_id, housenumber, street_text, normalized_street,
+ city, postcode, building_type, amenity, valid_start)
+SELECT entity_id, %(dataset)s, osm_id, housenumber, street, toponyms.normalize_name(street),
+       city, postcode, building_type, amenity, %(valid_start)s::timestamptz
+FROM address_load
+ON CONFLICT ON CONSTRAINT addresses_dataset_osm_id_key DO UPDATE SET
+    housenumber = EXCLUDED.housenumber,
+    street_text = EXCLUDED.street_text,
+    normalized_street = EXCLUDED.normalized_street,
+    city = EXCLUDED.city,
+    postcode = EXCLUDED.postcode,
+    building_type = EXCLUDED.building_type,
+    amenity = EXCLUDED.amenity,
+    loaded_at = NOW()
+WHERE (toponyms.addresses.housenumber, toponyms.addresses.street_text, toponyms.addresses.city,
+       toponyms.addresses.postcode, toponyms.addresses.building_type, toponyms.addresses.amenity)
+      IS DISTINCT FROM
+      (EXCLUDED.housenumber, EXCLUDED.street_text, EXCLUDED.city,
+       EXCLUDED.postcode, EXCLUDED.building_type, EXCLUDED.amenity);
+"""
+
+SQL_INSERT_NAMES = """
+INSERT INTO toponyms.names
+(entity_id, name_text, normalized_name, language_code, script_code, name_type, valid_start,
+ run_id, osm_tag_key_id)
+SELECT entity_id, label, toponyms.normalize_name(label), 'ukr', 'Cyrl', 'official', %(valid_start)s::timestamptz,
+       %(run_id)s::uuid, %(tag_key_id)s
+FROM (
+    SELECT entity_id, concat_ws(', ', street, housenumber) AS label
+    FROM address_load
+    WHERE is_new AND street IS NOT NULL
+) labelled;
+"""
+
+SQL_NEW_ENTITIES = """
+SELECT e.entity_id::text, ST_XMin(e.geometry), ST_YMin(e.geometry), ST_XMax(e.geometry), ST_YMax(e.geometry)
+FROM address_load l
+JOIN toponyms.entities e ON e.entity_id = l.entity_id
+WHERE l.is_new;
+"""
+
+
+def dataset_date_from_filename(path: Path) -> str:
+    """Extract the YYYYMMDD snapshot date embedded in the dataset filename."""
+    match = re.search(r'(\d{4})(\d{2})(\d{2})', path.stem)
+    if not match:
+        raise click.BadParameter(f"Cannot infer snapshot date from '{path.name}', pass --valid-date.")
+    return '-'.join(match.groups())
+
+
+def _feature_to_row(feature):
+    props = feature.get('properties') or {}
+    geometry = feature.get('geometry')
+    if geometry is None or props.get('osm_id') is None:
+        return None
+    return (
+        props['osm_id'],
+        props.get('housenumber'),
+        props.get('street'),
+        props.get('city'),
+        props.get('postcode'),
+        props.get('building_type'),
+        props.get('amenity'),
+        json.dumps(geometry, separators=(',', ':')),
+    )
+
+
+class AddressLoader:
+    """Streams address features into the database with COPY and set-based merges."""
+
+    def __init__(self, db_connection):
+        self.db = db_connection
+
+    def _copy_batch(self, cur, rows) -> None:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        cur.copy_expert(SQL_COPY_LOAD_TABLE, buffer)
+
+    def load(self, source: Path, dataset: str, valid_start: str, member: str = None,
+             run: Optional[ImportRun] = None) -> dict:
+        """Load the dataset; new rows are stamped with `run` (started here when not given)."""
+        started = time.perf_counter()
+        run = run or ImportRun.start(self.db, 'import_addresses', source, valid_start, SOURCE_AUTHORITY,
+                                     source_type='address_dataset')
+        params = {'dataset': dataset, 'valid_start': valid_start, 'source_authority': SOURCE_AUTHORITY,
+                  'run_id': run.run_id, 'tag_key_id': run.tag_key_id('addr:street')}
+        stats = {'features': 0, 'skipped': 0}
+
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT NOW()")
+                stats['loaded_at'] = cur.fetchone()[0]
+                cur.execute(SQL_CREATE_LOAD_TABLE)
+
+                batch = []
+                with open_geojson(source, member) as stream:
+                    for feature in iter_geojson_features(stream):
+                        row = _feature_to_row(feature)
+                        if row is None:
+                            stats['skipped'] += 1
+                            continue
+                        batch.append(row)
+                        if len(batch) >= COPY_BATCH_SIZE:
+                            self._copy_batch(cur, batch)
+                            stats['features'] += len(batch)
+                            batch = []
+                if batch:
+                    self._copy_batch(cur, batch)
+                    stats['features'] += len(batch)
+                logger.info(f"Copied {stats['features']} address features into staging ({stats['skipped']} skipped).")
+
+                cur.execute(SQL_ASSIGN_ENTITIES, params)
+                cur.execute(SQL_INSERT_ENTITIES, params)
+                stats['new_entities'] = cur.rowcount
+                cur.execute(SQL_UPSERT_ADDRESSES, params)
+                stats['upserted_addresses'] = cur.rowcount
+                cur.execute(SQL_INSERT_NAMES, params)
+                stats['new_names'] = cur.rowcount
+                cur.execute(SQL_NEW_ENTITIES)
+                new_entities = cur.fetchall()
+                stats['new_entity_ids'] = [row[0] for row in new_entities]
+                stats['new_bounds'] = [row[1:] for row in new_entities]
+
+        stats['seconds'] = round(time.perf_counter() - started, 2)
+        return stats
+
+
+# --- Command Line Interface ---
+@click.command()
+@click.option('--source',
+              type=click.Path(exists=True, dir_okay=False, readable=True),
+              default=str(DEFAULT_ADDRESS_ZIP),
+              show_default=True,
+              help='Address GeoJSON file or zip archive containing it.')
+@click.option('--member', default=None, help='GeoJSON member inside the zip (default: first *.geojson).')
+@click.option('--dataset', default=None, help='Dataset identifier used for idempotent reloads (default: file stem).')
+@click.option('--valid-date', default=None, help='valid_start date (YYYY-MM-DD), default: date in the filename.')
+def main(source: str, member: str, dataset: str, valid_date: str):
+    """
+    Loads the Mariupol address dataset into toponyms.entities, toponyms.addresses and toponyms.names.
+    """
+    source_path = Path(source)
+    dataset = dataset or source_path.stem
+    valid_date = valid_date or dataset_date_from_filename(source_path)
+    full_valid_date = f"{valid_date}T00:00:00Z"
+
+    logger.info(f"📦 Loading addresses from {source_path} as dataset '{dataset}' (valid_start {valid_date}).")
+    run = ImportRun.start(db, 'import_addresses', source_path, full_valid_date, SOURCE_AUTHORITY,
+                          source_type='address_dataset')
+    try:
+        stats = AddressLoader(db).load(source_path, dataset, full_valid_date, member, run)
+        run.finish(entities=stats['new_entities'], names=stats['new_names'])
+        logger.info(
+            f"✅ Address load complete in {stats['seconds']}s: {stats['features']} features, "
+            f"{stats['new_entities']} new entities, {stats['upserted_addresses']} addresses inserted/updated, "
+            f"{stats['new_names']} new names."
+        )
+        refresh_address_summary(db, since=stats['loaded_at'])
+        invalidate_bounds(stats['new_bounds'])
+        if stats['new_entity_ids']:
+            db.bump_cache_generation(stats['new_entity_ids'], 'import_addresses')
+    except Exception as e:
+        run.finish('failed')
+        logger.error(f"❌ Failed to load addresses: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
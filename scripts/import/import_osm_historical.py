@@ -7,17 +7,22 @@ Script to import OpenStreetMap data from a local PBF file into the toponymic dat
 import sys
 from pathlib import Path
 import osmium as osm
-import geopandas as gpd
-from shapely.geometry import Point, LineString, Polygon, MultiLineString, MultiPolygon
+# geopandas, shapely and the PBF block index (numpy) are imported where used, so `--help`
+# does not pay for them
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import click
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from scripts.utils.database import db
-from scripts.utils.config import setup_logging, PRE_WAR_DATE, MARIUPOL_BBOX
+from scripts.utils.database import db, SQL_INSERT_ENTITY, tags_json
+from scripts.utils.config import setup_logging, PRE_WAR_DATE, MARIUPOL_BBOX, NODE_CACHE
+from scripts.utils.ids import new_id
+from scripts.utils.import_runs import ImportRun, OSM_TYPE_CODES
+from scripts.utils.node_index import INDEX_TYPES
+from scripts.utils.quarantine import ErrorQuarantine, feature_payload, write_in_batches
+from scripts.export.vector_tiles import invalidate_bounds
 
 logger = setup_logging(__name__)
 
@@ -39,6 +44,7 @@ class OSMDataHandler(osm.SimpleHandler):
         tags = dict(n.tags)
         if any(tag.startswith('name') for tag in tags) and 'place' in tags and tags['place'] in ["city", "town", "village", "hamlet", "suburb", "borough", "district", "neighbourhood"]:
             if self._is_within_bbox(n.location.lat, n.location.lon):
+                from shapely.geometry import Point
                 self._add_feature(n.id, "node", Point(n.location.lon, n.location.lat), tags)
 
     def way(self, w):
@@ -56,6 +62,7 @@ class OSMDataHandler(osm.SimpleHandler):
                         pass 
                 
                 if len(coords) > 1:
+                    from shapely.geometry import LineString
                     geom = LineString(coords)
                     if self._is_within_bbox(geom.centroid.y, geom.centroid.x): # Check if way centroid is in bbox
                         self._add_feature(w.id, "way", geom, tags)
@@ -90,6 +97,7 @@ class OSMDataHandler(osm.SimpleHandler):
                     if self._is_within_bbox_coords(self.target_bbox[0], self.target_bbox[1], self.target_bbox[2], self.target_bbox[3]):
                         center_lat = (self.target_bbox[0] + self.target_bbox[2]) / 2
                         center_lon = (self.target_bbox[1] + self.target_bbox[3]) / 2
+                        from shapely.geometry import Point
                         geom = Point(center_lon, center_lat)
                         self._add_feature(r.id, "relation", geom, tags)
                 except Exception as e:
@@ -122,33 +130,139 @@ class OSMDataHandler(osm.SimpleHandler):
         return not (max_lon < t_min_lon or min_lon > t_max_lon or max_lat < t_min_lat or min_lat > t_max_lat)
 
 
+SQL_INSERT_NAME = """
+INSERT INTO toponyms.names 
+(entity_id, name_text, normalized_name, language_code, script_code, name_type, valid_start,
+ run_id, osm_tag_key_id)
+VALUES (
+    %(entity_id)s, %(name_text)s, toponyms.normalize_name(%(name_text)s),
+    %(language_code)s, %(script_code)s, %(name_type)s, %(valid_start)s::timestamptz,
+    %(run_id)s::uuid, %(osm_tag_key_id)s
+)
+ON CONFLICT DO NOTHING;
+"""
+
 class PBFImporter:
-    def __init__(self, db_connection):
+    def __init__(self, db_connection, node_index: Optional[str] = None, node_cache: bool = NODE_CACHE):
         self.db = db_connection
-        # Temporarily hardcode valid types until db.get_valid_entity_types is implemented
-        self.valid_db_entity_types = ['region', 'district', 'street', 'square', 'park', 'building', 'city', 'waterway', 'point_of_interest', 'area', 'path', 'unknown']
-        
+        self.node_index = node_index
+        self.node_cache = node_cache
+        self.valid_db_entity_types = self.db.get_valid_entity_types()
+        self.quarantine = ErrorQuarantine(db_connection, 'import_osm_historical')
+        self.run: Optional[ImportRun] = None
+
+    def begin_run(self, source_file: Optional[Path], query_date: str, source_authority: str) -> ImportRun:
+        """Register an import run; rows written and errors quarantined from now on carry its id."""
+        self.run = ImportRun.start(self.db, 'import_osm_historical', source_file, query_date, source_authority)
+        self.quarantine.run_id = self.run.run_id
+        return self.run
+
+    def classify(self, row) -> str:
+        """Entity type for a feature row, from its OSM tags and geometry."""
+        mapped_entity_type = 'unknown' 
+
+        # Map OSM tags to your database entity types
+        if row['osm_type'] == 'way':
+            if 'highway' in row['properties']: mapped_entity_type = 'street'
+            elif 'waterway' in row['properties']: mapped_entity_type = 'waterway'
+            elif 'footway' in row['properties'] or 'path' in row['properties']: mapped_entity_type = 'path'
+        elif row['osm_type'] == 'relation':
+            if 'admin_level' in row['properties'] and row['properties']['admin_level'] in ['8', '9', '10']: mapped_entity_type = 'district'
+            elif 'boundary' in row['properties'] and row['properties']['boundary'] == 'administrative': mapped_entity_type = 'region'
+            elif row['properties'].get('type') == 'multipolygon':
+                if 'landuse' in row['properties'] and row['properties']['landuse'] == 'park': mapped_entity_type = 'park'
+                elif 'building' in row['properties'] or 'amenity' in row['properties']: mapped_entity_type = 'building'
+                else: mapped_entity_type = 'area'
+        elif row['osm_type'] == 'node':
+            if 'place' in row['properties'] and row['properties']['place'] == 'city': mapped_entity_type = 'city'
+            elif 'building' in row['properties']: mapped_entity_type = 'building'
+            elif 'amenity' in row['properties'] or 'shop' in row['properties'] or 'leisure' in row['properties']: mapped_entity_type = 'point_of_interest'
+            elif 'place' in row['properties'] and row['properties']['place'] in ['town', 'village', 'hamlet', 'suburb', 'borough', 'neighbourhood']: mapped_entity_type = 'district'
+
+        if mapped_entity_type == 'unknown':
+            if row['geometry'].geom_type == 'Point': mapped_entity_type = 'point_of_interest'
+            elif row['geometry'].geom_type == 'LineString' or row['geometry'].geom_type == 'MultiLineString': mapped_entity_type = 'path'
+            elif row['geometry'].geom_type == 'Polygon' or row['geometry'].geom_type == 'MultiPolygon': mapped_entity_type = 'area'
+
+        # Check if mapped type exists in your predefined entity_types
+        if mapped_entity_type not in self.valid_db_entity_types:
+            logger.warning(f"Calculated entity type '{mapped_entity_type}' for OSM ID {row['osm_id']} is not in current `entity_types` table. Defaulting to 'point_of_interest'. Please extend `entity_types` if this is a common type.")
+            mapped_entity_type = 'point_of_interest'
+        return mapped_entity_type
+
+    def write_feature(self, cur, row, query_date: str, source_authority: str) -> Tuple[str, int]:
+        """Insert one classified feature and its names on `cur`; returns (entity_id, names inserted)."""
+        run = self.run or self.begin_run(None, query_date, source_authority)
+        entity_id = new_id()
+        cur.execute(SQL_INSERT_ENTITY, {
+            'entity_id': entity_id,
+            'entity_type': row['entity_type'],
+            'geometry': row['geometry'].wkt,
+            'source_authority': source_authority,
+            'valid_start': query_date,
+            'run_id': run.run_id,
+            'osm_type': OSM_TYPE_CODES.get(row['osm_type']),
+            'osm_id': row['osm_id'],
+            'tags': tags_json(row.get('properties'))
+        })
+
+        # Insert into toponyms.names for each language name found
+        inserted = 0
+        for name_tag, name_value in row['name_tags'].items():
+            if not name_value or not name_value.strip(): continue
+
+            language_code = 'und'
+            script_code = 'Latn'
+
+            if name_tag == 'name':
+                if any(c in name_value for c in 'іїєґІЇЄҐ'): language_code = 'ukr'
+                elif any(c in name_value for c in 'ыЭЫ'): language_code = 'rus'
+                else: language_code = 'ukr'
+                script_code = 'Cyrl'
+            elif name_tag == 'name:uk': language_code = 'ukr'; script_code = 'Cyrl'
+            elif name_tag == 'name:ru': language_code = 'rus'; script_code = 'Cyrl'
+            elif name_tag == 'name:en': language_code = 'eng'; script_code = 'Latn'
+
+            cur.execute(SQL_INSERT_NAME, {
+                'entity_id': entity_id,
+                'name_text': name_value,
+                'language_code': language_code,
+                'script_code': script_code,
+                'name_type': 'official',
+                'valid_start': query_date,
+                'run_id': run.run_id,
+                'osm_tag_key_id': run.tag_key_id(name_tag)
+            })
+            inserted += cur.rowcount
+        return entity_id, inserted
+
     def import_pbf_to_db(self, pbf_filepath: Path, query_date: str, source_authority: str):
         logger.info(f"Starting import from PBF file: {pbf_filepath}")
+        run = self.begin_run(pbf_filepath, query_date, source_authority)
         
         # Parse the BBOX string from config into a list of floats
         bbox_parts = MARIUPOL_BBOX.split(',')
         target_bbox = [float(p) for p in bbox_parts] # [minlat, minlon, maxlat, maxlon]
 
+        from scripts.utils.pbf_index import apply_in_bbox
         handler = OSMDataHandler(target_bbox)
         try:
             logger.info(f"Applying OSM handler to PBF file {pbf_filepath}...")
-            # Use NodeLocationIndex to ensure nodes are available for ways
-            handler.apply_file(str(pbf_filepath), locations=True, idx='sparse_mem_array')
+            # Node locations are needed to build ways; the index is chosen from the file size
+            apply_in_bbox(handler, pbf_filepath, (target_bbox[1], target_bbox[0], target_bbox[3], target_bbox[2]),
+                          self.node_index, self.node_cache)
             logger.info(f"Finished applying handler. Extracted {len(handler.features)} features.")
         except Exception as e:
             logger.error(f"Error applying Osmium handler to PBF: {e}")
+            run.finish('failed')
             return
 
         if not handler.features:
             logger.warning("No features extracted from PBF data within the specified bounding box.")
+            run.finish()
             return
 
+        import geopandas as gpd
         gdf = gpd.GeoDataFrame(handler.features, crs="EPSG:4326")
         
         # Ensure geometries are valid for PostGIS
@@ -158,97 +272,30 @@ class PBFImporter:
         
         logger.info(f"Processed {len(gdf)} valid geospatial features from PBF after cleaning.")
 
-        inserted_count = 0
-        for index, row in gdf.iterrows():
-            try:
-                mapped_entity_type = 'unknown' 
-
-                # Map OSM tags to your database entity types
-                if row['osm_type'] == 'way':
-                    if 'highway' in row['properties']: mapped_entity_type = 'street'
-                    elif 'waterway' in row['properties']: mapped_entity_type = 'waterway'
-                    elif 'footway' in row['properties'] or 'path' in row['properties']: mapped_entity_type = 'path'
-                elif row['osm_type'] == 'relation':
-                    if 'admin_level' in row['properties'] and row['properties']['admin_level'] in ['8', '9', '10']: mapped_entity_type = 'district'
-                    elif 'boundary' in row['properties'] and row['properties']['boundary'] == 'administrative': mapped_entity_type = 'region'
-                    elif row['properties'].get('type') == 'multipolygon':
-                        if 'landuse' in row['properties'] and row['properties']['landuse'] == 'park': mapped_entity_type = 'park'
-                        elif 'building' in row['properties'] or 'amenity' in row['properties']: mapped_entity_type = 'building'
-                        else: mapped_entity_type = 'area'
-                elif row['osm_type'] == 'node':
-                    if 'place' in row['properties'] and row['properties']['place'] == 'city': mapped_entity_type = 'city'
-                    elif 'building' in row['properties']: mapped_entity_type = 'building'
-                    elif 'amenity' in row['properties'] or 'shop' in row['properties'] or 'leisure' in row['properties']: mapped_entity_type = 'point_of_interest'
-                    elif 'place' in row['properties'] and row['properties']['place'] in ['town', 'village', 'hamlet', 'suburb', 'borough', 'neighbourhood']: mapped_entity_type = 'district'
-
-                if mapped_entity_type == 'unknown':
-                    if row['geometry'].geom_type == 'Point': mapped_entity_type = 'point_of_interest'
-                    elif row['geometry'].geom_type == 'LineString' or row['geometry'].geom_type == 'MultiLineString': mapped_entity_type = 'path'
-                    elif row['geometry'].geom_type == 'Polygon' or row['geometry'].geom_type == 'MultiPolygon': mapped_entity_type = 'area'
-
-                # Check if mapped type exists in your predefined entity_types
-                if mapped_entity_type not in self.valid_db_entity_types:
-                    logger.warning(f"Calculated entity type '{mapped_entity_type}' for OSM ID {row['osm_id']} is not in current `entity_types` table. Defaulting to 'point_of_interest'. Please extend `entity_types` if this is a common type.")
-                    mapped_entity_type = 'point_of_interest'
-
-                # Insert into toponyms.entities
-                entity_id = self.db.insert_entity( # Use self.db for consistency
-                    entity_type=mapped_entity_type,
-                    geometry_wkt=row['geometry'].wkt,
-                    source_authority=source_authority,
-                    valid_start=query_date 
-                )
-
-                # Insert into toponyms.names for each language name found
-                for name_tag, name_value in row['name_tags'].items():
-                    if not name_value or not name_value.strip(): continue
-
-                    language_code = 'und'
-                    script_code = 'Latn'
-
-                    if name_tag == 'name':
-                        if any(c in name_value for c in 'іїєґІЇЄҐ'): language_code = 'ukr'
-                        elif any(c in name_value for c in 'ыЭЫ'): language_code = 'rus'
-                        else: language_code = 'ukr'
-                        script_code = 'Cyrl'
-                    elif name_tag == 'name:uk': language_code = 'ukr'; script_code = 'Cyrl'
-                    elif name_tag == 'name:ru': language_code = 'rus'; script_code = 'Cyrl'
-                    elif name_tag == 'name:en': language_code = 'eng'; script_code = 'Latn'
-
-                    sql_name = """
-                    INSERT INTO toponyms.names 
-                    (entity_id, name_text, normalized_name, language_code, script_code, name_type, valid_start,
-                     decree_authority, source_type, source_reliability, notes)
-                    VALUES (
-                        %(entity_id)s, %(name_text)s, toponyms.normalize_name(%(name_text)s),
-                        %(language_code)s, %(script_code)s, %(name_type)s, %(valid_start)s::timestamptz,
-                        %(decree_authority)s, %(source_type)s, %(source_reliability)s, %(notes)s
-                    )
-                    ON CONFLICT (entity_id, language_code, name_type, tstzrange(valid_start, valid_end)) WHERE txn_end IS NULL DO NOTHING;
-                    """
-
-                    with self.db.get_connection() as conn: # Use self.db for consistency
-                        with conn.cursor() as cur:
-                            cur.execute(sql_name, {
-                                'entity_id': entity_id,
-                                'name_text': name_value,
-                                'language_code': language_code,
-                                'script_code': script_code,
-                                'name_type': 'official',
-                                'valid_start': query_date,
-                                'decree_authority': source_authority,
-                                'source_type': 'osm_data',
-                                'source_reliability': 'high',
-                                'notes': f"Imported from OpenStreetMap (OSM ID: {row['osm_id']}, Type: {row['osm_type']}, Name Tag: {name_tag})"
-                            })
-                    inserted_count += 1
-
-            except Exception as e:
-                import traceback
-                logger.error(f"Error importing OSM ID {row.get('osm_id', 'N/A')} (Name: {row['name_tags'].get('name', 'N/A')}, Type: {row.get('osm_type', 'N/A')}): {e}\n{traceback.format_exc()}")
-            
+        gdf = gdf.copy()
+        gdf['entity_type'] = [self.classify(row) for _, row in gdf.iterrows()]
+        rows = [row for _, row in gdf.iterrows()]
+        try:
+            with self.db.get_connection() as conn:
+                written = write_in_batches(conn, rows,
+                                           lambda cur, row: self.write_feature(cur, row, query_date, source_authority),
+                                           lambda row, e: self.quarantine.add('load', feature_payload(row, query_date, source_authority), e))
+        except Exception:
+            self.quarantine.flush()
+            run.finish('failed', errors=len(self.quarantine))
+            raise
+        self.quarantine.flush()
+
+        touched_entity_ids = [entity_id for entity_id, _ in written]
+        inserted_count = sum(names for _, names in written)
+        run.finish(entities=len(touched_entity_ids), names=inserted_count, errors=len(self.quarantine))
         logger.info(f"Completed import. Successfully inserted {inserted_count} records.")
 
+        if touched_entity_ids:
+            self.db.refresh_name_history(touched_entity_ids)
+            self.db.bump_cache_generation(touched_entity_ids, 'import_osm_historical')
+            invalidate_bounds(gdf.bounds.itertuples(index=False))
+
 # --- Command Line Interface ---
 @click.command()
 @click.option('--pbf-file', 
@@ -258,14 +305,18 @@ class PBFImporter:
 @click.option('--query-date', 
               default=PRE_WAR_DATE, 
               help=f'Date to assign as valid_start for imported data (YYYY-MM-DD), default: {PRE_WAR_DATE}.')
-def main(pbf_file: str, query_date: str): 
+@click.option('--node-index', type=click.Choice(('auto',) + INDEX_TYPES), default='auto', show_default=True,
+              help='osmium node location index; auto picks one from the file size and free memory.')
+@click.option('--no-node-cache', is_flag=True,
+              help='Do not reuse or keep the on-disk node location cache for this file.')
+def main(pbf_file: str, query_date: str, node_index: str, no_node_cache: bool):
     """
     Imports historical OpenStreetMap data from a PBF file into the toponymic database.
     """
     logger.info(f"Starting OSM PBF data import from {pbf_file} for valid_start date {query_date}.")
     
     full_query_date = f"{query_date}T00:00:00Z"
-    pbf_importer = PBFImporter(db) # Pass the database connection instance
+    pbf_importer = PBFImporter(db, node_index, not no_node_cache) # Pass the database connection instance
 
     try:
         pbf_filepath = Path(pbf_file)
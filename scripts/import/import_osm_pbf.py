@@ -5,43 +5,83 @@ Script to import OpenStreetMap data from a local PBF file into the toponymic dat
 """
 
 import sys
+import time
 from pathlib import Path
 import osmium as osm
-import geopandas as gpd
-from shapely.geometry import Point, LineString, Polygon, MultiLineString, MultiPolygon
+# geopandas, shapely, the PBF block index (numpy) and the feature cache (pyarrow) are imported
+# where used, so `--help` does not pay for them
 from datetime import datetime, timezone
-from typing import Dict, Any, List
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Sequence, Tuple
 import click
+from psycopg2.extras import execute_values
 
 # Add project root to Python path
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-from scripts.utils.database import db
-from scripts.utils.config import setup_logging, PRE_WAR_DATE, MARIUPOL_BBOX
+from scripts.utils.database import db, SQL_INSERT_ENTITIES, ENTITY_VALUES, tags_json
+from scripts.utils.config import setup_logging, PRE_WAR_DATE, MARIUPOL_BBOX, NODE_CACHE, FEATURE_CACHE
+from scripts.utils.osm_mapping import classify_entity_type, detect_language
+from scripts.utils.metrics import metrics, profiled
+from scripts.utils.spatial_key import sort_by_spatial_key
+from scripts.utils.bulk_load import BulkLoader, write_conflicts
+from scripts.utils.ids import new_id
+from scripts.utils.import_runs import ImportRun, OSM_TYPE_CODES
+from scripts.utils.node_index import INDEX_TYPES
+from scripts.utils.quarantine import ErrorQuarantine, feature_payload, write_in_batches
+from scripts.export.vector_tiles import invalidate_bounds
+
+if TYPE_CHECKING:
+    import geopandas as gpd
 
 logger = setup_logging(__name__)
 
+# Names of a whole load batch in one statement (execute_values with NAME_VALUES);
+# RETURNING tells which names were not skipped, per entity
+SQL_INSERT_NAMES = """
+INSERT INTO toponyms.names 
+(entity_id, name_text, normalized_name, language_code, script_code, name_type, valid_start,
+ run_id, osm_tag_key_id)
+VALUES %s
+ON CONFLICT DO NOTHING  -- arbiter: the name_temporal_uniqueness exclusion constraint
+RETURNING entity_id::text;
+"""
+
+NAME_VALUES = """(
+    %(entity_id)s::uuid, %(name_text)s, toponyms.normalize_name(%(name_text)s),
+    %(language_code)s, %(script_code)s, %(name_type)s, %(valid_start)s::timestamptz,
+    %(run_id)s::uuid, %(osm_tag_key_id)s
+)"""
+
 class OSMDataHandler(osm.SimpleHandler):
     """
     Osmium handler to extract named ways, relations, and nodes from OSM PBF data.
     """
+    version = 1  # bump when the features it extracts change: cached features of other versions are not reused
+
     def __init__(self, target_bbox: List[float]):
         super(OSMDataHandler, self).__init__()
         self.features = []
         self.target_bbox = target_bbox # [minlat, minlon, maxlat, maxlon]
         self.nodes = {} # Store nodes to build ways
+        self.object_counts = {'node': 0, 'way': 0, 'relation': 0} # Published to metrics after apply_file
+        self.incomplete_ways = 0
+        self.errors = [] # (payload, exception) per object that failed, quarantined by the importer
         logger.info(f"Initialized OSM Data Handler for BBOX: {self.target_bbox}")
 
     def node(self, n):
+        self.object_counts['node'] += 1
         if self._is_within_bbox(n.location.lat, n.location.lon):
             self.nodes[n.id] = (n.location.lon, n.location.lat) # Store (lon, lat)
 
         tags = dict(n.tags)
         if any(tag.startswith('name') for tag in tags) and 'place' in tags and tags['place'] in ["city", "town", "village", "hamlet", "suburb", "borough", "district", "neighbourhood"]:
             if self._is_within_bbox(n.location.lat, n.location.lon):
+                from shapely.geometry import Point
                 self._add_feature(n.id, "node", Point(n.location.lon, n.location.lat), tags)
 
     def way(self, w):
+        self.object_counts['way'] += 1
         tags = dict(w.tags)
         if any(tag.startswith('name') for tag in tags): # Only interested in named ways
             try:
@@ -53,16 +93,19 @@ class OSMDataHandler(osm.SimpleHandler):
                         pass 
 
                 if len(coords) > 1:
+                    from shapely.geometry import LineString
                     geom = LineString(coords)
                     if self._is_within_bbox(geom.centroid.y, geom.centroid.x): # Check if way centroid is in bbox
                         self._add_feature(w.id, "way", geom, tags)
                 else:
+                    self.incomplete_ways += 1
                     logger.debug(f"Skipping way {w.id} with insufficient coordinates ({len(coords)}).")
 
             except Exception as e:
-                logger.warning(f"Error processing way {w.id}: {e}")
+                self.errors.append(({'osm_id': w.id, 'osm_type': 'way', 'tags': tags}, e))
 
     def relation(self, r):
+        self.object_counts['relation'] += 1
         tags = dict(r.tags)
         if any(tag.startswith('name') for tag in tags) and ('boundary' in tags or 'type' in tags and tags['type'] == 'multipolygon'):
             logger.debug(f"Processing relation {r.id} without direct full geometry from PBF for now. Tags: {tags}")
@@ -70,10 +113,11 @@ class OSMDataHandler(osm.SimpleHandler):
                 if self._is_within_bbox_coords(self.target_bbox[0], self.target_bbox[1], self.target_bbox[2], self.target_bbox[3]):
                     center_lat = (self.target_bbox[0] + self.target_bbox[2]) / 2
                     center_lon = (self.target_bbox[1] + self.target_bbox[3]) / 2
+                    from shapely.geometry import Point
                     geom = Point(center_lon, center_lat)
                     self._add_feature(r.id, "relation", geom, tags)
             except Exception as e:
-                 logger.warning(f"Could not add placeholder geometry for relation {r.id}: {e}")
+                self.errors.append(({'osm_id': r.id, 'osm_type': 'relation', 'tags': tags}, e))
 
     def _add_feature(self, osm_id, osm_type, geometry, tags):
         name_tags = {k: v for k, v in tags.items() if k.startswith('name:') or k == 'name'}
@@ -102,363 +146,233 @@ class OSMDataHandler(osm.SimpleHandler):
 
 
 class PBFImporter:
-    def __init__(self, db_connection):
+    """
+    Imports a PBF file in four stages, each callable on its own (see
+    scripts/benchmarks/bench_import.py): extract_features (parse),
+    clean_geometries, classify_features and load_features (DB load).
+    """
+    def __init__(self, db_connection, node_index: Optional[str] = None, node_cache: bool = NODE_CACHE,
+                 feature_cache: bool = FEATURE_CACHE):
         self.db = db_connection
+        self.node_index = node_index  # osmium location index, chosen per file when None (scripts/utils/node_index.py)
+        self.node_cache = node_cache  # reuse/keep the on-disk location index keyed by file hash
+        self.feature_cache = feature_cache  # reuse/keep parsed features as Arrow files (scripts/utils/feature_cache.py)
         # Pro Iteration: Dynamically fetch valid entity types
         self.valid_db_entity_types = self.db.get_valid_entity_types() # Calls the new method in database.py
+        self.quarantine = ErrorQuarantine(db_connection, 'import_osm_pbf')
+        self.run: Optional[ImportRun] = None
 
-    def import_pbf_to_db(self, pbf_filepath: Path, query_date: str, source_authority: str):
-        # ... (code for handler, gdf creation, etc.) ...
-
-        inserted_count = 0
-        for index, row in gdf.iterrows():
-            try:
-                mapped_entity_type = 'unknown' 
-
-                # Prioritize based on common OSM tags
-                if row['osm_type'] == 'way':
-                    if 'highway' in row['properties']: mapped_entity_type = 'street'
-                    elif 'waterway' in row['properties']: mapped_entity_type = 'waterway'
-                    elif 'footway' in row['properties'] or 'path' in row['properties']: mapped_entity_type = 'path'
-                elif row['osm_type'] == 'relation':
-                    if 'admin_level' in row['properties'] and row['properties']['admin_level'] in ['8', '9', '10']: mapped_entity_type = 'district'
-                    elif 'boundary' in row['properties'] and row['properties']['boundary'] == 'administrative': mapped_entity_type = 'region'
-                    elif row['properties'].get('type') == 'multipolygon':
-                        if 'landuse' in row['properties'] and row['properties']['landuse'] == 'park': mapped_entity_type = 'park'
-                        elif 'building' in row['properties'] or 'amenity' in row['properties']: mapped_entity_type = 'building'
-                        else: mapped_entity_type = 'area'
-                elif row['osm_type'] == 'node':
-                    if 'place' in row['properties'] and row['properties']['place'] == 'city': mapped_entity_type = 'city'
-                    elif 'building' in row['properties']: mapped_entity_type = 'building'
-                    elif 'amenity' in row['properties'] or 'shop' in row['properties'] or 'leisure' in row['properties']: mapped_entity_type = 'point_of_interest'
-                    elif 'place' in row['properties'] and row['properties']['place'] in ['town', 'village', 'hamlet', 'suburb', 'borough', 'neighbourhood']: mapped_entity_type = 'district'
-
-                # Fallback: if after all specific checks, it's still 'unknown', use geometry type
-                if mapped_entity_type == 'unknown':
-                    if row['geometry'].geom_type == 'Point':
-                        mapped_entity_type = 'point_of_interest'
-                    elif row['geometry'].geom_type == 'LineString' or row['geometry'].geom_type == 'MultiLineString':
-                        mapped_entity_type = 'path'
-                    elif row['geometry'].geom_type == 'Polygon' or row['geometry'].geom_type == 'MultiPolygon':
-                        mapped_entity_type = 'area'
-
-                # Pro Iteration: Use dynamically fetched valid types
-                if mapped_entity_type not in self.valid_db_entity_types: # Uses the types fetched by PBFImporter's __init__
-                    logger.warning(f"Calculated entity type '{mapped_entity_type}' for OSM ID {row['osm_id']} is not in current `entity_types` table. Defaulting to 'point_of_interest'. Please extend `entity_types` if this is a common type.")
-                    mapped_entity_type = 'point_of_interest'
-
-                entity_id = self.db.insert_entity(
-                    entity_type=mapped_entity_type,
-                    geometry_wkt=row['geometry'].wkt,
-                    source_authority=source_authority,
-                    valid_start=query_date 
-                )
-
-                for name_tag, name_value in row['name_tags'].items():
-                    if not name_value or not name_value.strip(): continue
-
-                    language_code = 'und'
-                    script_code = 'Latn'
-
-                    if name_tag == 'name':
-                        if any(c in name_value for c in 'іїєґІЇЄҐ'): language_code = 'ukr'
-                        elif any(c in name_value for c in 'ыЭЫ'): language_code = 'rus'
-                        else: language_code = 'ukr'
-                        script_code = 'Cyrl'
-                    elif name_tag == 'name:uk': language_code = 'ukr'; script_code = 'Cyrl'
-                    elif name_tag == 'name:ru': language_code = 'rus'; script_code = 'Cyrl'
-                    elif name_tag == 'name:en': language_code = 'eng'; script_code = 'Latn'
-
-                    sql_name = """
-                    INSERT INTO toponyms.names 
-                    (entity_id, name_text, normalized_name, language_code, script_code, name_type, valid_start,
-                     decree_authority, source_type, source_reliability, notes)
-                    VALUES (
-                        %(entity_id)s, %(name_text)s, toponyms.normalize_name(%(name_text)s),
-                        %(language_code)s, %(script_code)s, %(name_type)s, %(valid_start)s::timestamptz,
-                        %(decree_authority)s, %(source_type)s, %(source_reliability)s, %(notes)s
-                    )
-                    ON CONFLICT (entity_id, language_code, name_type, tstzrange(valid_start, valid_end)) WHERE txn_end IS NULL DO NOTHING;
-                    """
-
-                    with self.db.get_connection() as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(sql_name, {
-                                'entity_id': entity_id,
-                                'name_text': name_value,
-                                'language_code': language_code,
-                                'script_code': script_code,
-                                'name_type': 'official',
-                                'valid_start': query_date,
-                                'decree_authority': source_authority,
-                                'source_type': 'osm_data',
-                                'source_reliability': 'high',
-                                'notes': f"Imported from OpenStreetMap (OSM ID: {row['osm_id']}, Type: {row['osm_type']}, Name Tag: {name_tag})"
-                            })
-                    inserted_count += 1
-
-            except Exception as e:
-                import traceback
-                logger.error(f"Error importing OSM ID {row.get('osm_id', 'N/A')} (Name: {row['name_tags'].get('name', 'N/A')}, Type: {row.get('osm_type', 'N/A')}): {e}\n{traceback.format_exc()}")
-
-        logger.info(f"Completed import. Successfully inserted {inserted_count} records.")
-
-# --- Command Line Interface ---
-@click.command()
-@click.option('--pbf-file', 
-              type=click.Path(exists=True, dir_okay=False, readable=True),
-              required=True,
-              help='Path to the OpenStreetMap PBF file to import (e.g., data/raw/ukraine-latest.osm.pbf).') # Corrected help text
-@click.option('--query-date', 
-              default=PRE_WAR_DATE, 
-              help=f'Date to assign as valid_start for imported data (YYYY-MM-DD), default: {PRE_WAR_DATE}.')
-def main(pbf_file: str, query_date: str): 
-    """
-    Imports historical OpenStreetMap data from a PBF file into the toponymic database.
-    """
-    logger.info(f"Starting OSM PBF data import from {pbf_file} for valid_start date {query_date}.")
-
-    full_query_date = f"{query_date}T00:00:00Z"
-    pbf_importer = PBFImporter(db)
-
-    try:
-        pbf_filepath = Path(pbf_file)
-        pbf_importer.import_pbf_to_db(pbf_filepath, full_query_date, "OpenStreetMap - Geofabrik PBF")
-        logger.info("OSM PBF data import process completed.")
-    except Exception as e:
-        logger.error(f"Failed to import PBF data: {e}")
-        import traceback
-        logger.error(f"{traceback.format_exc()}")
-
-
-if __name__ == "__main__":
-    main()
-cat > import_osm_pbf.py << 'EOF'
-# PASTE THE ENTIRE CONTENT OF scripts/import/import_osm_pbf.py HERE
-#!/usr/bin/env python3
-# scripts/import/import_osm_pbf.py
-"""
-Script to import OpenStreetMap data from a local PBF file into the toponymic database.
-"""
-
-import sys
-from pathlib import Path
-import osmium as osm
-import geopandas as gpd
-from shapely.geometry import Point, LineString, Polygon, MultiLineString, MultiPolygon
-from datetime import datetime, timezone
-from typing import Dict, Any, List
-import click
-
-# Add project root to Python path
-sys.path.append(str(Path(__file__).parent.parent.parent))
-
-from scripts.utils.database import db
-from scripts.utils.config import setup_logging, PRE_WAR_DATE, MARIUPOL_BBOX
-
-logger = setup_logging(__name__)
-
-class OSMDataHandler(osm.SimpleHandler):
-    """
-    Osmium handler to extract named ways, relations, and nodes from OSM PBF data.
-    """
-    def __init__(self, target_bbox: List[float]):
-        super(OSMDataHandler, self).__init__()
-        self.features = []
-        self.target_bbox = target_bbox # [minlat, minlon, maxlat, maxlon]
-        self.nodes = {} # Store nodes to build ways
-        logger.info(f"Initialized OSM Data Handler for BBOX: {self.target_bbox}")
-
-    def node(self, n):
-        if self._is_within_bbox(n.location.lat, n.location.lon):
-            self.nodes[n.id] = (n.location.lon, n.location.lat) # Store (lon, lat)
-
-        tags = dict(n.tags)
-        if any(tag.startswith('name') for tag in tags) and 'place' in tags and tags['place'] in ["city", "town", "village", "hamlet", "suburb", "borough", "district", "neighbourhood"]:
-            if self._is_within_bbox(n.location.lat, n.location.lon):
-                self._add_feature(n.id, "node", Point(n.location.lon, n.location.lat), tags)
+    def begin_run(self, source_file: Optional[Path], query_date: str, source_authority: str) -> ImportRun:
+        """Register an import run; rows written and errors quarantined from now on carry its id."""
+        self.run = ImportRun.start(self.db, 'import_osm_pbf', source_file, query_date, source_authority)
+        self.quarantine.run_id = self.run.run_id
+        return self.run
 
-    def way(self, w):
-        tags = dict(w.tags)
-        if any(tag.startswith('name') for tag in tags): # Only interested in named ways
-            try:
-                coords = []
-                for node_ref in w.nodes:
-                    if node_ref.ref in self.nodes:
-                        coords.append(self.nodes[node_ref.ref])
-                    else:
-                        pass 
-
-                if len(coords) > 1:
-                    geom = LineString(coords)
-                    if self._is_within_bbox(geom.centroid.y, geom.centroid.x): # Check if way centroid is in bbox
-                        self._add_feature(w.id, "way", geom, tags)
-                else:
-                    logger.debug(f"Skipping way {w.id} with insufficient coordinates ({len(coords)}).")
-
-            except Exception as e:
-                logger.warning(f"Error processing way {w.id}: {e}")
-
-    def relation(self, r):
-        tags = dict(r.tags)
-        if any(tag.startswith('name') for tag in tags) and ('boundary' in tags or 'type' in tags and tags['type'] == 'multipolygon'):
-            logger.debug(f"Processing relation {r.id} without direct full geometry from PBF for now. Tags: {tags}")
-            try:
-                if self._is_within_bbox_coords(self.target_bbox[0], self.target_bbox[1], self.target_bbox[2], self.target_bbox[3]):
-                    center_lat = (self.target_bbox[0] + self.target_bbox[2]) / 2
-                    center_lon = (self.target_bbox[1] + self.target_bbox[3]) / 2
-                    geom = Point(center_lon, center_lat)
-                    self._add_feature(r.id, "relation", geom, tags)
-            except Exception as e:
-                 logger.warning(f"Could not add placeholder geometry for relation {r.id}: {e}")
-
-    def _add_feature(self, osm_id, osm_type, geometry, tags):
-        name_tags = {k: v for k, v in tags.items() if k.startswith('name:') or k == 'name'}
-        if not name_tags: # Ensure it has at least one name tag
-            return
-
-        properties = {k: v for k, v in tags.items() if not k.startswith('name')}
-        properties['osm_type'] = osm_type
-        properties['osm_id'] = osm_id
-
-        self.features.append({
-            'osm_id': osm_id,
-            'osm_type': osm_type,
-            'name_tags': name_tags,
-            'geometry': geometry,
-            'properties': properties
-        })
-
-    def _is_within_bbox(self, lat, lon):
-        min_lat, min_lon, max_lat, max_lon = self.target_bbox
-        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+    def extract_features(self, pbf_filepath: Path) -> List[Dict[str, Any]]:
+        """Parse the PBF file and return the named features inside MARIUPOL_BBOX."""
+        bbox_parts = MARIUPOL_BBOX.split(',')
+        target_bbox = [float(p) for p in bbox_parts]
 
-    def _is_within_bbox_coords(self, min_lat, min_lon, max_lat, max_lon):
-        t_min_lat, t_min_lon, t_max_lat, t_max_lon = self.target_bbox
-        return not (max_lon < t_min_lon or min_lon > t_max_lon or max_lat < t_min_lat or min_lat > t_max_lat)
+        from scripts.utils.feature_cache import feature_cache_path, read_features, write_features
+        cache_path = feature_cache_path(pbf_filepath, target_bbox, OSMDataHandler) if self.feature_cache else None
+        if cache_path is not None and cache_path.exists():
+            with metrics.timer('import_stage_seconds', stage='parse'):
+                features = read_features(cache_path)
+            logger.info(f"Loaded {len(features)} parsed features from {cache_path.name} instead of parsing the PBF.")
+            metrics.inc('feature_cache_hits_total')
+            return features
 
+        from scripts.utils.pbf_index import apply_in_bbox
+        handler = OSMDataHandler(target_bbox)
+        logger.info(f"Applying OSM handler to PBF file {pbf_filepath}...")
+        with metrics.timer('import_stage_seconds', stage='parse'):
+            apply_in_bbox(handler, pbf_filepath, (target_bbox[1], target_bbox[0], target_bbox[3], target_bbox[2]),
+                          self.node_index, self.node_cache)
+        logger.info(f"Finished applying handler. Extracted {len(handler.features)} features.")
+
+        for osm_type, count in handler.object_counts.items():
+            metrics.inc('osm_objects_read_total', count, osm_type=osm_type)
+        if metrics.enabled:
+            for feature in handler.features:
+                metrics.inc('osm_features_extracted_total', osm_type=feature['osm_type'])
+        metrics.inc('osm_ways_incomplete_total', handler.incomplete_ways)
+        for payload, error in handler.errors:
+            self.quarantine.add('parse', payload, error)
+        self.quarantine.flush()
+        if cache_path is not None:
+            write_features(cache_path, handler.features, handler.object_counts)
+        return handler.features
+
+    def clean_geometries(self, features: List[Dict[str, Any]]) -> 'gpd.GeoDataFrame':
+        """Build a GeoDataFrame and repair geometries so PostGIS accepts them."""
+        with metrics.timer('import_stage_seconds', stage='clean'):
+            import geopandas as gpd
+            gdf = gpd.GeoDataFrame(features, crs="EPSG:4326")
+
+            gdf['geometry'] = gdf['geometry'].buffer(0)
+            gdf = gdf[gdf['geometry'].is_valid]
+
+        metrics.inc('geometries_dropped_total', len(features) - len(gdf))
 
-class PBFImporter:
-    def __init__(self, db_connection):
-        self.db = db_connection
-        self.valid_db_entity_types = ['region', 'district', 'street', 'square', 'park', 'building', 'city', 'waterway', 'point_of_interest', 'area', 'path', 'unknown']
+        logger.info(f"Processed {len(gdf)} valid geospatial features from PBF after cleaning.")
+        return gdf
+
+    def classify_features(self, gdf: 'gpd.GeoDataFrame') -> 'gpd.GeoDataFrame':
+        """Add an `entity_type` column mapped from OSM tags onto the entity_types table."""
+        entity_types = []
+        started = time.perf_counter()
+        for row in gdf.itertuples(index=False):
+            mapped_entity_type = classify_entity_type(row.osm_type, row.properties, row.geometry.geom_type)
+
+            # Pro Iteration: Use dynamically fetched valid types
+            if mapped_entity_type not in self.valid_db_entity_types: # Uses the types fetched by PBFImporter's __init__
+                logger.warning(f"Calculated entity type '{mapped_entity_type}' for OSM ID {row.osm_id} is not in current `entity_types` table. Defaulting to 'point_of_interest'. Please extend `entity_types` if this is a common type.")
+                metrics.inc('classification_fallback_total', entity_type=mapped_entity_type)
+                mapped_entity_type = 'point_of_interest'
+            entity_types.append(mapped_entity_type)
+        metrics.observe('import_stage_seconds', time.perf_counter() - started, stage='classify')
+        if metrics.enabled:
+            for entity_type in entity_types:
+                metrics.inc('features_classified_total', entity_type=entity_type)
+
+        gdf = gdf.copy()
+        gdf['entity_type'] = entity_types
+        return gdf
+
+    def write_feature(self, cur, row, query_date: str, source_authority: str) -> Tuple[str, int]:
+        """Insert one feature and its names on `cur`, stamped with the current run; returns (entity_id, names inserted)."""
+        return self.write_feature_batch(cur, [row], query_date, source_authority)[0]
+
+    def write_feature_batch(self, cur, rows: Sequence[Any], query_date: str, source_authority: str) -> List[Tuple[str, int]]:
+        """
+        Insert features and their names on `cur`, stamped with the current run:
+        one statement for the entities and one for all of their names. Returns
+        (entity_id, names inserted) per row.
+        """
+        run = self.run or self.begin_run(None, query_date, source_authority)
+        tag_keys = run.tag_key_ids(name_tag for row in rows for name_tag in row['name_tags'])
+        entities, names = [], []
+        for row in rows:
+            entity_id = new_id()
+            entities.append({
+                'entity_id': entity_id,
+                'entity_type': row['entity_type'],
+                'geometry': row['geometry'].wkt,
+                'source_authority': source_authority,
+                'valid_start': query_date,
+                'run_id': run.run_id,
+                'osm_type': OSM_TYPE_CODES.get(row['osm_type']),
+                'osm_id': row['osm_id'],
+                'tags': tags_json(row.get('properties'))
+            })
+
+            for name_tag, name_value in row['name_tags'].items():
+                if not name_value or not name_value.strip(): continue
+
+                language_code, script_code = detect_language(name_tag, name_value)
+
+                names.append({
+                    'entity_id': entity_id,
+                    'name_text': name_value,
+                    'language_code': language_code,
+                    'script_code': script_code,
+                    'name_type': 'official',
+                    'valid_start': query_date,
+                    'run_id': run.run_id,
+                    'osm_tag_key_id': tag_keys[name_tag]
+                })
+        if not entities:
+            return []
+
+        with metrics.timer('db_write_seconds', table='entities'):
+            execute_values(cur, SQL_INSERT_ENTITIES, entities, template=ENTITY_VALUES, page_size=len(entities))
+        inserted = Counter()
+        if names:
+            with metrics.timer('db_write_seconds', table='names'):
+                inserted.update(entity_id for entity_id, in execute_values(
+                    cur, SQL_INSERT_NAMES, names, template=NAME_VALUES, page_size=len(names), fetch=True))
+        return [(entity['entity_id'], inserted[entity['entity_id']]) for entity in entities]
+
+    def load_features(self, gdf: 'gpd.GeoDataFrame', query_date: str, source_authority: str) -> int:
+        """Insert classified features and their names; returns the number of names inserted."""
+        started = time.perf_counter()
+        run = self.run or self.begin_run(None, query_date, source_authority)
+        gdf = sort_by_spatial_key(gdf)  # neighbouring entities end up on neighbouring heap pages
+        rows = [row for _, row in gdf.iterrows()]
+        with self.db.get_connection() as conn:
+            written = write_in_batches(conn, rows,
+                                       lambda cur, row: self.write_feature(cur, row, query_date, source_authority),
+                                       lambda row, e: self.quarantine.add('load', feature_payload(row, query_date, source_authority), e),
+                                       write_batch=lambda cur, batch: self.write_feature_batch(cur, batch, query_date, source_authority))
+        self.quarantine.flush()
+
+        touched_entity_ids = [entity_id for entity_id, _ in written]
+        inserted_count = sum(names for _, names in written)
+        metrics.inc('db_rows_written_total', len(touched_entity_ids), table='entities')
+        metrics.inc('db_rows_written_total', inserted_count, table='names')
+        run.record(entities=len(touched_entity_ids), names=inserted_count)
+        logger.info(f"Completed import. Successfully inserted {inserted_count} records.")
 
-    def import_pbf_to_db(self, pbf_filepath: Path, query_date: str, source_authority: str):
+        if touched_entity_ids:
+            self.db.refresh_name_history(touched_entity_ids)
+            self.db.bump_cache_generation(touched_entity_ids, 'import_osm_pbf')
+            invalidate_bounds(gdf.bounds.itertuples(index=False))
+        metrics.observe('import_stage_seconds', time.perf_counter() - started, stage='load')
+        return inserted_count
+
+    def load_features_bulk(self, gdf: 'gpd.GeoDataFrame', query_date: str, source_authority: str,
+                           conflicts_out: Path = None) -> int:
+        """
+        Same rows as load_features, loaded through scripts/utils/bulk_load.py: COPY into
+        unindexed temp tables, set-based overlap check, indexes built once. Overlapping
+        names are reported (and written to conflicts_out) instead of silently skipped.
+        """
+        started = time.perf_counter()
+        run = self.run or self.begin_run(None, query_date, source_authority)
+        gdf = sort_by_spatial_key(gdf)  # neighbouring entities end up on neighbouring heap pages
+        stats = BulkLoader(self.db).load(gdf, query_date, source_authority, run)
+        run.record(entities=stats['entities'], names=stats['names'])
+        if conflicts_out and stats['conflicts']:
+            write_conflicts(stats['conflicts'], conflicts_out)
+            logger.info(f"Overlapping names written to {conflicts_out}")
+
+        if stats['entity_ids']:
+            self.db.refresh_name_history(stats['entity_ids'])
+            self.db.bump_cache_generation(stats['entity_ids'], 'import_osm_pbf')
+            invalidate_bounds(gdf.bounds.itertuples(index=False))
+        metrics.observe('import_stage_seconds', time.perf_counter() - started, stage='load')
+        return stats['names']
+
+    def import_pbf_to_db(self, pbf_filepath: Path, query_date: str, source_authority: str,
+                         bulk: bool = False, conflicts_out: Path = None):
         logger.info(f"Starting import from PBF file: {pbf_filepath}")
+        if bulk:
+            BulkLoader(self.db).require_partitioned_names()  # fail before the parse, not after
+        run = self.begin_run(pbf_filepath, query_date, source_authority)
 
-        bbox_parts = MARIUPOL_BBOX.split(',')
-        target_bbox = [float(p) for p in bbox_parts]
-
-        handler = OSMDataHandler(target_bbox)
         try:
-            logger.info(f"Applying OSM handler to PBF file {pbf_filepath}...")
-            handler.apply_file(str(pbf_filepath), locations=True, idx='sparse_mem_array')
-            logger.info(f"Finished applying handler. Extracted {len(handler.features)} features.")
+            features = self.extract_features(pbf_filepath)
         except Exception as e:
             logger.error(f"Error applying Osmium handler to PBF: {e}")
+            run.finish('failed', errors=len(self.quarantine))
             return
 
-        if not handler.features:
+        if not features:
             logger.warning("No features extracted from PBF data within the specified bounding box.")
+            run.finish(errors=len(self.quarantine))
             return
 
-        gdf = gpd.GeoDataFrame(handler.features, crs="EPSG:4326")
-
-        gdf['geometry'] = gdf['geometry'].buffer(0)
-        gdf = gdf[gdf['geometry'].is_valid]
-
-        logger.info(f"Processed {len(gdf)} valid geospatial features from PBF after cleaning.")
-
-        inserted_count = 0
-        for index, row in gdf.iterrows():
-            try:
-                mapped_entity_type = 'unknown' 
-
-                if row['osm_type'] == 'way':
-                    if 'highway' in row['properties']: mapped_entity_type = 'street'
-                    elif 'waterway' in row['properties']: mapped_entity_type = 'waterway'
-                    elif 'footway' in row['properties'] or 'path' in row['properties']: mapped_entity_type = 'path'
-                elif row['osm_type'] == 'relation':
-                    if 'admin_level' in row['properties'] and row['properties']['admin_level'] in ['8', '9', '10']: mapped_entity_type = 'district'
-                    elif 'boundary' in row['properties'] and row['properties']['boundary'] == 'administrative': mapped_entity_type = 'region'
-                    elif row['properties'].get('type') == 'multipolygon':
-                        if 'landuse' in row['properties'] and row['properties']['landuse'] == 'park': mapped_entity_type = 'park'
-                        elif 'building' in row['properties'] or 'amenity' in row['properties']: mapped_entity_type = 'building'
-                        else: mapped_entity_type = 'area'
-                elif row['osm_type'] == 'node':
-                    if 'place' in row['properties'] and row['properties']['place'] == 'city': mapped_entity_type = 'city'
-                    elif 'building' in row['properties']: mapped_entity_type = 'building'
-                    elif 'amenity' in row['properties'] or 'shop' in row['properties'] or 'leisure' in row['properties']: mapped_entity_type = 'point_of_interest'
-                    elif 'place' in row['properties'] and row['properties']['place'] in ['town', 'village', 'hamlet', 'suburb', 'borough', 'neighbourhood']: mapped_entity_type = 'district'
-
-                if mapped_entity_type == 'unknown':
-                    if row['geometry'].geom_type == 'Point':
-                        mapped_entity_type = 'point_of_interest'
-                    elif row['geometry'].geom_type == 'LineString' or row['geometry'].geom_type == 'MultiLineString':
-                        mapped_entity_type = 'path'
-                    elif row['geometry'].geom_type == 'Polygon' or row['geometry'].geom_type == 'MultiPolygon':
-                        mapped_entity_type = 'area'
-
-                valid_predefined_types = ['region', 'district', 'street', 'square', 'park', 'building', 'city']
-                if mapped_entity_type not in valid_predefined_types:
-                    logger.warning(f"Calculated entity type '{mapped_entity_type}' for OSM ID {row['osm_id']} is not in current `entity_types` table. Defaulting to 'point_of_interest'. Please extend `entity_types` if this is a common type.")
-                    mapped_entity_type = 'point_of_interest'
-
-                entity_id = self.db.insert_entity(
-                    entity_type=mapped_entity_type,
-                    geometry_wkt=row['geometry'].wkt,
-                    source_authority=source_authority,
-                    valid_start=query_date 
-                )
-
-                for name_tag, name_value in row['name_tags'].items():
-                    if not name_value or not name_value.strip(): continue
-
-                    language_code = 'und'
-                    script_code = 'Latn'
-
-                    if name_tag == 'name':
-                        if any(c in name_value for c in 'іїєґІЇЄҐ'): language_code = 'ukr'
-                        elif any(c in name_value for c in 'ыЭЫ'): language_code = 'rus'
-                        else: language_code = 'ukr'
-                        script_code = 'Cyrl'
-                    elif name_tag == 'name:uk': language_code = 'ukr'; script_code = 'Cyrl'
-                    elif name_tag == 'name:ru': language_code = 'rus'; script_code = 'Cyrl'
-                    elif name_tag == 'name:en': language_code = 'eng'; script_code = 'Latn'
-
-                    sql_name = """
-                    INSERT INTO toponyms.names 
-                    (entity_id, name_text, normalized_name, language_code, script_code, name_type, valid_start,
-                     decree_authority, source_type, source_reliability, notes)
-                    VALUES (
-                        %(entity_id)s, %(name_text)s, toponyms.normalize_name(%(name_text)s),
-                        %(language_code)s, %(script_code)s, %(name_type)s, %(valid_start)s::timestamptz,
-                        %(decree_authority)s, %(source_type)s, %(source_reliability)s, %(notes)s
-                    )
-                    ON CONFLICT (entity_id, language_code, name_type, tstzrange(valid_start, valid_end)) WHERE txn_end IS NULL DO NOTHING;
-                    """
-
-                    with self.db.get_connection() as conn:
-                        with conn.cursor() as cur:
-                            cur.execute(sql_name, {
-                                'entity_id': entity_id,
-                                'name_text': name_value,
-                                'language_code': language_code,
-                                'script_code': script_code,
-                                'name_type': 'official',
-                                'valid_start': query_date,
-                                'decree_authority': source_authority,
-                                'source_type': 'osm_data',
-                                'source_reliability': 'high',
-                                'notes': f"Imported from OpenStreetMap (OSM ID: {row['osm_id']}, Type: {row['osm_type']}, Name Tag: {name_tag})"
-                            })
-                    inserted_count += 1
-
-            except Exception as e:
-                import traceback
-                logger.error(f"Error importing OSM ID {row.get('osm_id', 'N/A')} (Name: {row['name_tags'].get('name', 'N/A')}, Type: {row.get('osm_type', 'N/A')}): {e}\n{traceback.format_exc()}")
-
-        logger.info(f"Completed import. Successfully inserted {inserted_count} records.")
+        try:
+            gdf = self.clean_geometries(features)
+            gdf = self.classify_features(gdf)
+            if bulk:
+                self.load_features_bulk(gdf, query_date, source_authority, conflicts_out)
+            else:
+                self.load_features(gdf, query_date, source_authority)
+        except Exception:
+            run.finish('failed', errors=len(self.quarantine))
+            raise
+        run.finish(errors=len(self.quarantine))
 
 # --- Command Line Interface ---
 @click.command()
@@ -469,23 +383,45 @@ class PBFImporter:
 @click.option('--query-date', 
               default=PRE_WAR_DATE, 
               help=f'Date to assign as valid_start for imported data (YYYY-MM-DD), default: {PRE_WAR_DATE}.')
-def main(pbf_file: str, query_date: str): 
+@click.option('--bulk', is_flag=True,
+              help='Initial snapshot load: COPY into unindexed staging, set-based overlap check, indexes built '
+                   'once. Needs toponyms.names partitioned (scripts/maintenance/partition_names.py).')
+@click.option('--conflicts-out', type=click.Path(dir_okay=False), default=None,
+              help='With --bulk, write names skipped as overlapping to this CSV file.')
+@click.option('--metrics-out', type=click.Path(dir_okay=False), default=None,
+              help='Collect run metrics and write them here (.json, otherwise Prometheus text format).')
+@click.option('--node-index', type=click.Choice(('auto',) + INDEX_TYPES), default='auto', show_default=True,
+              help='osmium node location index; auto picks one from the file size and free memory.')
+@click.option('--no-node-cache', is_flag=True,
+              help='Do not reuse or keep the on-disk node location cache for this file.')
+@click.option('--no-feature-cache', is_flag=True,
+              help='Parse the PBF even if its features are cached, and do not cache them.')
+@click.option('--profile', is_flag=True, help='Run under cProfile/tracemalloc and log the top hot spots.')
+def main(pbf_file: str, query_date: str, bulk: bool, conflicts_out: str, node_index: str, no_node_cache: bool,
+         no_feature_cache: bool, metrics_out: str, profile: bool):
     """
     Imports historical OpenStreetMap data from a PBF file into the toponymic database.
     """
     logger.info(f"Starting OSM PBF data import from {pbf_file} for valid_start date {query_date}.")
 
     full_query_date = f"{query_date}T00:00:00Z"
-    pbf_importer = PBFImporter(db)
+    if metrics_out:
+        metrics.enable()
+    pbf_importer = PBFImporter(db, node_index, not no_node_cache, not no_feature_cache)
 
     try:
         pbf_filepath = Path(pbf_file)
-        pbf_importer.import_pbf_to_db(pbf_filepath, full_query_date, "OpenStreetMap - Geofabrik PBF")
+        with profiled(profile):
+            pbf_importer.import_pbf_to_db(pbf_filepath, full_query_date, "OpenStreetMap - Geofabrik PBF",
+                                          bulk=bulk, conflicts_out=Path(conflicts_out) if conflicts_out else None)
         logger.info("OSM PBF data import process completed.")
     except Exception as e:
         logger.error(f"Failed to import PBF data: {e}")
         import traceback
         logger.error(f"{traceback.format_exc()}")
+    finally:
+        if metrics_out:
+            metrics.write(Path(metrics_out))
 
 
 if __name__ == "__main__":
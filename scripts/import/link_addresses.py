@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# scripts/import/link_addresses.py
+"""
+Script to link addresses to the street entities their street text refers to.
+
+For every address the street text (normalized with toponyms.normalize_name at load
+time) is matched against active street names, and the nearest matching street
+geometry within --max-distance metres wins. Addresses whose text matches nothing
+fall back to the nearest street of any name within the same radius, with a lower
+confidence. Everything runs as one set-based PostGIS statement into
+toponyms.address_street_links.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.database import db
+from scripts.utils.config import setup_logging
+
+logger = setup_logging(__name__)
+
+DEFAULT_MAX_DISTANCE_M = 150
+
+SQL_LINK_ADDRESSES = """
+WITH addr AS (
+    SELECT a.address_id, a.normalized_street, e.centroid AS pt
+    FROM toponyms.addresses a
+    JOIN toponyms.entities e ON e.entity_id = a.entity_id
+    WHERE %(dataset)s::text IS NULL OR a.source_dataset = %(dataset)s::text
+),
+named AS (
+    SELECT addr.address_id, s.entity_id, s.name_id, s.distance_m
+    FROM addr
+    JOIN LATERAL (
+        SELECT n.entity_id, n.name_id, ST_Distance(e.geometry::geography, addr.pt::geography) AS distance_m
+        FROM toponyms.names n
+        JOIN toponyms.entities e ON e.entity_id = n.entity_id
+        WHERE n.normalized_name = addr.normalized_street
+          AND n.txn_end IS NULL
+          AND e.txn_end IS NULL
+          AND e.entity_type = 'street'
+          AND ST_DWithin(e.geometry::geography, addr.pt::geography, %(max_distance)s)
+        ORDER BY distance_m
+        LIMIT 1
+    ) s ON TRUE
+),
+nearest AS (
+    SELECT addr.address_id, s.entity_id, s.distance_m
+    FROM addr
+    JOIN LATERAL (
+        SELECT e.entity_id, ST_Distance(e.geometry::geography, addr.pt::geography) AS distance_m
+        FROM toponyms.entities e
+        WHERE e.entity_type = 'street' AND e.txn_end IS NULL
+        ORDER BY e.geometry <-> addr.pt
+        LIMIT 1
+    ) s ON TRUE
+    WHERE NOT EXISTS (SELECT 1 FROM named WHERE named.address_id = addr.address_id)
+      AND s.distance_m <= %(max_distance)s
+),
+links AS (
+    SELECT address_id, entity_id, name_id, 'name_and_distance' AS match_method,
+           1.0 - 0.5 * distance_m / %(max_distance)s AS confidence, distance_m
+    FROM named
+    UNION ALL
+    SELECT address_id, entity_id, NULL::uuid, 'distance_only',
+           0.4 * (1.0 - distance_m / %(max_distance)s), distance_m
+    FROM nearest
+    UNION ALL
+    SELECT addr.address_id, NULL::uuid, NULL::uuid, 'unmatched', 0, NULL::double precision
+    FROM addr
+    WHERE NOT EXISTS (SELECT 1 FROM named WHERE named.address_id = addr.address_id)
+      AND NOT EXISTS (SELECT 1 FROM nearest WHERE nearest.address_id = addr.address_id)
+)
+INSERT INTO toponyms.address_street_links
+(address_id, street_entity_id, matched_name_id, match_method, confidence, distance_m, linked_at)
+SELECT address_id, entity_id, name_id, match_method, round(confidence::numeric, 3), distance_m, NOW()
+FROM links
+ON CONFLICT (address_id) DO UPDATE SET
+    street_entity_id = EXCLUDED.street_entity_id,
+    matched_name_id = EXCLUDED.matched_name_id,
+    match_method = EXCLUDED.match_method,
+    confidence = EXCLUDED.confidence,
+    distance_m = EXCLUDED.distance_m,
+    linked_at = EXCLUDED.linked_at;
+"""
+
+SQL_LINK_SUMMARY = """
+SELECT l.match_method, COUNT(*), ROUND(AVG(l.confidence), 3)
+FROM toponyms.address_street_links l
+JOIN toponyms.addresses a ON a.address_id = l.address_id
+WHERE %(dataset)s::text IS NULL OR a.source_dataset = %(dataset)s::text
+GROUP BY l.match_method
+ORDER BY l.match_method;
+"""
+
+
+def link_addresses(db_connection, max_distance: float, dataset: str = None) -> dict:
+    """Rebuild address-to-street links; returns {match_method: (count, avg_confidence)}."""
+    params = {'max_distance': float(max_distance), 'dataset': dataset}
+    with db_connection.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_LINK_ADDRESSES, params)
+            logger.info(f"Linked {cur.rowcount} addresses.")
+            cur.execute(SQL_LINK_SUMMARY, params)
+            return {method: (count, avg) for method, count, avg in cur.fetchall()}
+
+
+# --- Command Line Interface ---
+@click.command()
+@click.option('--max-distance', default=DEFAULT_MAX_DISTANCE_M, show_default=True, type=float,
+              help='Maximum distance in metres between an address and its street.')
+@click.option('--dataset', default=None, help='Only link addresses from this source dataset.')
+def main(max_distance: float, dataset: str):
+    """
+    Links addresses to street entities by normalized name and spatial proximity.
+    """
+    logger.info(f"🔗 Linking addresses to streets (max distance {max_distance} m).")
+    started = time.perf_counter()
+    try:
+        summary = link_addresses(db, max_distance, dataset)
+    except Exception as e:
+        logger.error(f"❌ Address linking failed: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
+        sys.exit(1)
+
+    for method, (count, avg_confidence) in summary.items():
+        logger.info(f"   {method}: {count} addresses (avg confidence {avg_confidence})")
+    logger.info(f"✅ Address linking complete in {time.perf_counter() - started:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
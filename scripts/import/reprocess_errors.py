@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# scripts/import/reprocess_errors.py
+"""
+Retries features quarantined in staging.import_errors by the PBF importers.
+
+Only the quarantined rows are written again, using the payload stored with
+each error (geometry, entity type, name tags, query date, source authority)
+and the importer that failed on it, in savepointed batches like the original
+load, and added to the import run the error came from (a new run when that run
+is not registered in toponyms.import_runs). Rows that now load are marked
+resolved; rows that fail again keep their entry with the new error and one
+more attempt counted. Both are recorded in the transaction of the batch that
+retried them, so an interrupted run never leaves a loaded row's error open to
+be retried (and loaded) twice. Parse-stage errors (objects osmium handed over
+but the handler could not build) are listed but not retried: they need the
+PBF, so re-run the import for those with --no-feature-cache (a cached parse
+would skip the objects again).
+
+Usage:
+    python scripts/import/reprocess_errors.py --summary
+    python scripts/import/reprocess_errors.py --run-id <uuid>
+    python scripts/import/reprocess_errors.py --error-class InvalidTextRepresentation --limit 100
+"""
+
+import importlib
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+import click
+from psycopg2.extras import execute_values
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.database import db
+from scripts.utils.config import setup_logging
+from scripts.utils.quarantine import write_in_batches
+from scripts.utils.import_runs import ImportRun
+from scripts.export.vector_tiles import invalidate_bounds
+
+logger = setup_logging(__name__)
+
+IMPORTERS = {
+    'import_osm_pbf': ('scripts.import.import_osm_pbf', 'PBFImporter'),
+    'process_osm_data': ('scripts.import.process_osm_data', 'DataLoader'),
+    'import_osm_historical': ('scripts.import.import_osm_historical', 'PBFImporter'),
+}
+
+SQL_SUMMARY = """
+SELECT run_id, importer, stage, error_class, count(*), min(created_at), max(attempts)
+FROM staging.import_errors
+WHERE resolved_at IS NULL
+  AND (%(run_id)s::uuid IS NULL OR run_id = %(run_id)s::uuid)
+GROUP BY run_id, importer, stage, error_class
+ORDER BY min(created_at), stage, error_class;
+"""
+
+SQL_OPEN_ERRORS = """
+SELECT error_id, importer, run_id::text, feature
+FROM staging.import_errors
+WHERE resolved_at IS NULL
+  AND stage = 'load'
+  AND (%(run_id)s::uuid IS NULL OR run_id = %(run_id)s::uuid)
+  AND (%(error_class)s::text IS NULL OR error_class = %(error_class)s)
+ORDER BY error_id
+LIMIT %(limit)s;
+"""
+
+SQL_RESOLVE = """
+UPDATE staging.import_errors
+SET resolved_at = NOW(), attempts = attempts + 1
+WHERE error_id = ANY(%s);
+"""
+
+SQL_FAILED_AGAIN = """
+UPDATE staging.import_errors e
+SET attempts = e.attempts + 1, error_class = v.error_class, message = v.message
+FROM (VALUES %s) AS v(error_id, error_class, message)
+WHERE e.error_id = v.error_id;
+"""
+
+
+def feature_row(payload):
+    """Rebuild the row write_feature expects from a quarantined payload."""
+    from shapely import wkt
+    row = dict(payload)
+    row['geometry'] = wkt.loads(payload['geometry'])
+    return row
+
+
+def retry(errors):
+    """
+    Retry (error_id, importer, run_id, payload) rows; returns (resolved ids,
+    [(error_id, class, message)], entity ids, bounds). Each batch marks its error
+    rows resolved or failed again before it commits.
+    """
+    groups = defaultdict(list)
+    for error_id, importer_name, run_id, payload in errors:
+        groups[(importer_name, run_id, payload.get('query_date'), payload.get('source_authority'))].append(
+            (error_id, feature_row(payload)))
+
+    resolved, failed, entity_ids, bounds = [], [], [], []
+    for (importer_name, run_id, query_date, source_authority), items in groups.items():
+        if importer_name not in IMPORTERS:
+            logger.warning(f"Skipping {len(items)} errors from unknown importer '{importer_name}'")
+            continue
+        module_name, class_name = IMPORTERS[importer_name]
+        importer = getattr(importlib.import_module(module_name), class_name)(db)
+        resumed = ImportRun.resume(db, run_id)
+        importer.run = resumed or importer.begin_run(None, query_date, source_authority)
+        logger.info(f"Retrying {len(items)} features with {class_name} (valid_start {query_date})")
+
+        batch_failed = []
+
+        def mark_errors(cur, batch_results):
+            # Same transaction as the batch, so a crash cannot leave a loaded row's error open
+            if batch_results:
+                cur.execute(SQL_RESOLVE, ([error_id for error_id, _ in batch_results],))
+            if batch_failed:
+                execute_values(cur, SQL_FAILED_AGAIN, batch_failed)
+                failed.extend(batch_failed)
+                batch_failed.clear()
+
+        with db.get_connection() as conn:
+            written = write_in_batches(
+                conn, items,
+                lambda cur, item: (item[0], importer.write_feature(cur, item[1], query_date, source_authority)),
+                lambda item, e: batch_failed.append((item[0], type(e).__name__, str(e).strip()[:2000])),
+                before_commit=mark_errors)
+        written_ids = {error_id for error_id, _ in written}
+        importer.run.record(entities=len(written), names=sum(names for _, (_, names) in written),
+                            errors=-len(written) if resumed else 0)
+        resolved.extend(written_ids)
+        entity_ids.extend(entity_id for _, (entity_id, _) in written)
+        bounds.extend(row['geometry'].bounds for error_id, row in items if error_id in written_ids)
+    return resolved, failed, entity_ids, bounds
+
+
+# --- Command Line Interface ---
+@click.command('reprocess-errors')
+@click.option('--run-id', default=None, help='Only errors of this import run (default: all open errors).')
+@click.option('--error-class', default=None, help='Only errors of this exception class.')
+@click.option('--limit', type=int, default=None, help='Retry at most this many errors.')
+@click.option('--summary', is_flag=True, help='List open errors by run, stage and class instead of retrying.')
+def main(run_id, error_class, limit, summary):
+    """
+    Retries the features quarantined in staging.import_errors.
+    """
+    params = {'run_id': run_id, 'error_class': error_class, 'limit': limit}
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            if summary:
+                cur.execute(SQL_SUMMARY, params)
+                rows = cur.fetchall()
+            else:
+                cur.execute(SQL_OPEN_ERRORS, params)
+                errors = cur.fetchall()
+
+    if summary:
+        click.echo(f"{'run':<36}  {'importer':<16} {'stage':<6} {'errors':>7} {'attempts':>8}  error class")
+        for run, importer_name, stage, cls, count, first_seen, attempts in rows:
+            click.echo(f"{run:<36}  {importer_name:<16} {stage:<6} {count:>7} {attempts:>8}  {cls}")
+        return
+
+    if not errors:
+        logger.info("No open load-stage errors to retry.")
+        return
+
+    resolved, failed, entity_ids, bounds = retry(errors)
+
+    if entity_ids:
+        db.refresh_name_history(entity_ids)
+        db.bump_cache_generation(entity_ids, 'reprocess_errors')
+        invalidate_bounds(bounds)
+    logger.info(f"Reprocessed {len(errors)} quarantined features: {len(resolved)} loaded, {len(failed)} failed again.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# scripts/maintenance/cluster_entities.py
+"""
+Reorders toponyms.entities on disk by spatial key (geohash of the centroid,
+toponyms.spatial_key) and reports how many pages bbox queries touch before and
+after.
+
+Entities arrive in PBF order, so one neighbourhood's rows are spread over the
+whole heap. CLUSTER rewrites the table in entities_spatial_key_idx order;
+loaders keep new batches in the same order (scripts/utils/spatial_key.py), but
+rows appended after a CLUSTER are only ordered within their batch, so re-run
+this after large imports. CLUSTER holds an ACCESS EXCLUSIVE lock on the table
+while it rewrites it.
+
+Usage:
+    python scripts/maintenance/cluster_entities.py run
+    python scripts/maintenance/cluster_entities.py measure --queries 200 --bbox-m 300
+"""
+
+import json
+import math
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import click
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.database import db
+from scripts.utils.config import setup_logging, MARIUPOL_BBOX
+
+logger = setup_logging(__name__)
+
+METERS_PER_DEGREE = 111320.0
+
+SQL_CLUSTER = "CLUSTER VERBOSE toponyms.entities USING entities_spatial_key_idx;"
+
+SQL_BBOX_QUERY = """
+SELECT e.entity_id, e.entity_type, e.source_authority
+FROM toponyms.entities e
+WHERE e.geometry && ST_MakeEnvelope(%s, %s, %s, %s, 4326)
+  AND e.txn_end IS NULL
+"""
+
+# Physical order vs key order: 1.0 means the heap is sorted by the key
+SQL_KEY_CORRELATION = """
+SELECT correlation
+FROM pg_stats
+WHERE schemaname = 'toponyms' AND tablename = 'entities_spatial_key_idx';
+"""
+
+SQL_TABLE_PAGES = "SELECT relpages, reltuples::bigint FROM pg_class WHERE oid = 'toponyms.entities'::regclass;"
+
+
+def random_bboxes(count: int, size_m: float, seed: int) -> List[Tuple[float, float, float, float]]:
+    """Square (xmin, ymin, xmax, ymax) boxes of size_m metres at random points in MARIUPOL_BBOX."""
+    min_lat, min_lon, max_lat, max_lon = (float(p) for p in MARIUPOL_BBOX.split(','))
+    rng = random.Random(seed)
+    half_lat = size_m / 2 / METERS_PER_DEGREE
+    half_lon = size_m / 2 / (METERS_PER_DEGREE * math.cos(math.radians((min_lat + max_lat) / 2)))
+    boxes = []
+    for _ in range(count):
+        lat, lon = rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)
+        boxes.append((lon - half_lon, lat - half_lat, lon + half_lon, lat + half_lat))
+    return boxes
+
+
+def _heap_blocks(plan: Dict[str, Any]) -> int:
+    blocks = plan.get('Exact Heap Blocks', 0) + plan.get('Lossy Heap Blocks', 0)
+    return blocks + sum(_heap_blocks(child) for child in plan.get('Plans', []))
+
+
+def measure(cur, boxes) -> Dict[str, Any]:
+    """Buffers and heap blocks touched by the bbox queries (EXPLAIN ANALYZE, BUFFERS)."""
+    totals = {'queries': len(boxes), 'rows': 0, 'buffers': 0, 'heap_blocks': 0, 'ms': 0.0}
+    for box in boxes:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + SQL_BBOX_QUERY, box)
+        result = cur.fetchone()[0]
+        result = (json.loads(result) if isinstance(result, str) else result)[0]
+        plan = result['Plan']
+        totals['rows'] += plan.get('Actual Rows', 0)
+        totals['buffers'] += plan.get('Shared Hit Blocks', 0) + plan.get('Shared Read Blocks', 0)
+        totals['heap_blocks'] += _heap_blocks(plan)
+        totals['ms'] += result['Execution Time']
+    cur.execute(SQL_KEY_CORRELATION)
+    row = cur.fetchone()
+    totals['key_correlation'] = round(row[0], 3) if row and row[0] is not None else None
+    cur.execute(SQL_TABLE_PAGES)
+    totals['table_pages'], totals['table_rows'] = cur.fetchone()
+    return totals
+
+
+def _measure(boxes) -> Dict[str, Any]:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("ANALYZE toponyms.entities")
+            return measure(cur, boxes)
+
+
+def _report(label: str, totals: Dict[str, Any]) -> None:
+    queries = max(totals['queries'], 1)
+    click.echo(f"{label:<7} buffers/query {totals['buffers'] / queries:>9.1f}   "
+               f"heap blocks/query {totals['heap_blocks'] / queries:>9.1f}   "
+               f"rows/query {totals['rows'] / queries:>7.1f}   ms/query {totals['ms'] / queries:>7.2f}   "
+               f"key correlation {totals['key_correlation']}")
+
+
+# --- Command Line Interface ---
+@click.group()
+def cli():
+    """Spatial clustering of toponyms.entities."""
+
+
+@cli.command('measure')
+@click.option('--queries', default=100, show_default=True, type=int, help='Random bbox queries per measurement.')
+@click.option('--bbox-m', default=500.0, show_default=True, type=float, help='Side of each query box in metres.')
+@click.option('--seed', default=42, show_default=True, type=int)
+def measure_command(queries, bbox_m, seed):
+    """Report pages touched by random bbox queries."""
+    _report('current', _measure(random_bboxes(queries, bbox_m, seed)))
+
+
+@cli.command()
+@click.option('--queries', default=100, show_default=True, type=int, help='Random bbox queries per measurement.')
+@click.option('--bbox-m', default=500.0, show_default=True, type=float, help='Side of each query box in metres.')
+@click.option('--seed', default=42, show_default=True, type=int)
+def run(queries, bbox_m, seed):
+    """CLUSTER entities by spatial key, with before/after bbox query numbers."""
+    boxes = random_bboxes(queries, bbox_m, seed)
+    before = _measure(boxes)
+
+    logger.info(f"Clustering toponyms.entities ({before['table_pages']} pages) by spatial key...")
+    started = time.perf_counter()
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_CLUSTER)
+    logger.info(f"CLUSTER finished in {time.perf_counter() - started:.1f}s")
+
+    after = _measure(boxes)
+    _report('before', before)
+    _report('after', after)
+    if before['buffers']:
+        change = (after['buffers'] - before['buffers']) / before['buffers'] * 100
+        click.echo(f"Buffers touched by bbox queries: {change:+.1f}%")
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+# scripts/maintenance/partition_names.py
+"""
+Converts toponyms.names into a table range-partitioned by valid_start year, and
+keeps the yearly partitions ahead of incoming data.
+
+`migrate` runs three steps, each safe to re-run, without holding long locks:
+
+  1. prepare: create toponyms.names_partitioned with the same columns, checks,
+     foreign keys and indexes (primary key (name_id, valid_start)), a partition
+     for everything before --first-year, one per year up to next year and a
+     DEFAULT partition, and a trigger on toponyms.names that mirrors every write
+     into it while the copy runs.
+  2. copy: move the existing rows in keyset batches of --batch-size, one short
+     transaction per batch; only the rows of the current batch are locked.
+  3. swap: compare the row counts of both tables in one snapshot while writes
+     go on (the mirror trigger keeps them equal from then on), then, under an
+     ACCESS EXCLUSIVE lock bounded by --lock-timeout, check only that both
+     still end at the same highest name_id (an index lookup), rename the tables so
+     the partitioned one becomes toponyms.names,
+     enable the cross-partition overlap check and recreate the views that
+     referenced the old table. The old table stays as toponyms.names_unpartitioned
+     until `drop-old`.
+
+Partition helpers and the overlap trigger live in sql/20_functions/02_names_partitioning.sql.
+
+Usage:
+    python scripts/maintenance/partition_names.py migrate --first-year 2014
+    python scripts/maintenance/partition_names.py ensure --years-ahead 1
+    python scripts/maintenance/partition_names.py status
+    python scripts/maintenance/partition_names.py drop-old
+"""
+
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import click
+from psycopg2.errors import LockNotAvailable
+
+# Add project root to Python path
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from scripts.utils.database import db
+from scripts.utils.config import setup_logging
+
+logger = setup_logging(__name__)
+
+NAMES = 'toponyms.names'
+STAGING = 'toponyms.names_partitioned'
+OLD = 'names_unpartitioned'
+DEFAULT_PARTITION = 'names_default'
+MIRROR_TRIGGER = 'names_mirror_to_partitioned'
+OVERLAP_TRIGGER = 'names_check_overlap'
+
+DEFAULT_BATCH_SIZE = 10000
+DEFAULT_FIRST_YEAR = 2014
+
+# Catalog output (view and index definitions) fully schema-qualified
+SQL_QUALIFIED_NAMES = "SET LOCAL search_path TO pg_catalog;"
+
+SQL_RELKIND = "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);"
+
+SQL_CREATE_STAGING = f"""
+CREATE TABLE {STAGING} (
+    LIKE {NAMES} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING COMMENTS,
+    PRIMARY KEY (name_id, valid_start)
+) PARTITION BY RANGE (valid_start);
+"""
+
+SQL_FOREIGN_KEYS = """
+SELECT conname, pg_get_constraintdef(oid)
+FROM pg_constraint
+WHERE conrelid = %s::regclass AND contype = 'f';
+"""
+
+# Plain indexes only: the primary key and the exclusion constraint are recreated separately
+SQL_INDEXES = """
+SELECT c.relname, pg_get_indexdef(i.indexrelid), i.indisunique
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE i.indrelid = %s::regclass
+  AND NOT i.indisprimary
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+ORDER BY c.relname;
+"""
+
+SQL_MAX_YEAR = f"SELECT extract(year FROM max(valid_start) AT TIME ZONE 'UTC')::int FROM {NAMES};"
+
+SQL_CREATE_DEFAULT = f"""
+CREATE TABLE IF NOT EXISTS toponyms.{DEFAULT_PARTITION} PARTITION OF {STAGING} DEFAULT;
+"""
+
+SQL_MIRROR_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION toponyms.mirror_names_to_partitioned()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        DELETE FROM {STAGING} WHERE name_id = OLD.name_id AND valid_start = OLD.valid_start;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {STAGING} SELECT (NEW).* ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS {MIRROR_TRIGGER} ON {NAMES};
+CREATE TRIGGER {MIRROR_TRIGGER}
+AFTER INSERT OR UPDATE OR DELETE ON {NAMES}
+FOR EACH ROW EXECUTE FUNCTION toponyms.mirror_names_to_partitioned();
+"""
+
+# Locks the batch's source rows until the copy commits, so a concurrent update
+# waits and is then mirrored on top of the copied row rather than underneath it
+SQL_NEXT_BATCH = f"""
+SELECT name_id FROM {NAMES}
+WHERE name_id > %s::uuid
+ORDER BY name_id
+LIMIT %s
+FOR SHARE;
+"""
+
+SQL_COPY_BATCH = f"""
+INSERT INTO {STAGING}
+SELECT * FROM {NAMES} WHERE name_id = ANY(%s::uuid[])
+ON CONFLICT DO NOTHING;
+"""
+
+SQL_COUNTS = f"SELECT (SELECT count(*) FROM {NAMES}), (SELECT count(*) FROM {STAGING});"
+
+# There is no max(uuid); ORDER BY ... LIMIT 1 is the same primary key index lookup
+SQL_WATERMARKS = f"""
+SELECT (SELECT name_id FROM {NAMES} ORDER BY name_id DESC LIMIT 1),
+       (SELECT name_id FROM {STAGING} ORDER BY name_id DESC LIMIT 1);
+"""
+
+SQL_DEPENDENT_VIEWS = """
+SELECT DISTINCT v.oid, v.oid::regclass::text, v.relkind, pg_get_viewdef(v.oid)
+FROM pg_depend d
+JOIN pg_rewrite r ON r.oid = d.objid
+JOIN pg_class v ON v.oid = r.ev_class
+WHERE d.classid = 'pg_rewrite'::regclass
+  AND d.refobjid = %s::regclass
+  AND v.oid <> d.refobjid;
+"""
+
+SQL_VIEW_INDEXES = "SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s;"
+
+SQL_PARTITIONS = """
+SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint,
+       pg_size_pretty(pg_total_relation_size(c.oid))
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = %s::regclass
+ORDER BY pg_get_expr(c.relpartbound, c.oid) = 'DEFAULT', c.relname;
+"""
+
+SQL_DEFAULT_YEARS = f"""
+SELECT DISTINCT extract(year FROM valid_start AT TIME ZONE 'UTC')::int
+FROM toponyms.{DEFAULT_PARTITION}
+ORDER BY 1;
+"""
+
+INDEX_DEF = re.compile(r'^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?toponyms\.names (.*)$')
+
+
+def _relkind(cur, name: str) -> Optional[str]:
+    cur.execute(SQL_RELKIND, (name,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _staging_index_name(name: str) -> str:
+    return f"{name[:58]}_part"
+
+
+def _copyable_indexes(cur) -> List[Tuple[str, str]]:
+    """(index name, CREATE INDEX for the staging table) for each plain index on toponyms.names."""
+    cur.execute(SQL_INDEXES, (NAMES,))
+    indexes = []
+    for name, definition, unique in cur.fetchall():
+        match = INDEX_DEF.match(definition)
+        if unique or not match:
+            # Unique indexes must include valid_start on a partitioned table
+            logger.warning(f"Not recreating index {name} on the partitioned table: {definition}")
+            continue
+        indexes.append((name, f"CREATE INDEX IF NOT EXISTS {_staging_index_name(name)} ON {STAGING} {match.group(3)}"))
+    return indexes
+
+
+def prepare(first_year: int) -> None:
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(SQL_QUALIFIED_NAMES)
+            if _relkind(cur, STAGING) is None:
+                cur.execute(SQL_CREATE_STAGING)
+                cur.execute(SQL_FOREIGN_KEYS, (NAMES,))
+                for conname, definition in cur.fetchall():
+                    cur.execute(f"ALTER TABLE {STAGING} ADD CONSTRAINT {conname} {definition}")
+                logger.info(f"Created {STAGING}")
+
+            for _, create_index in _copyable_indexes(cur):
+                cur.execute(create_index)
+
+            cur.execute(SQL_MAX_YEAR)
+            max_year = cur.fetchone()[0]
+            last_year = max(datetime.now(timezone.utc).year + 1, max_year or 0)
+            cur.execute("SELECT toponyms.create_names_partition(%s, '-infinity', make_timestamptz(%s, 1, 1, 0, 0, 0, 'UTC'), %s)",
+                        (f"names_before_{first_year}", first_year, STAGING))
+            for year in range(first_year, last_year + 1):
+                cur.execute("SELECT toponyms.ensure_names_partition(%s, %s)", (year, STAGING))
+            if _relkind(cur, f"toponyms.{DEFAULT_PARTITION}") is None:
+                cur.execute(SQL_CREATE_DEFAULT)
+                cur.execute("SELECT toponyms.add_name_exclusion(%s)", (f"toponyms.{DEFAULT_PARTITION}",))
+            logger.info(f"Partitions: before {first_year}, {first_year}-{last_year}, default")
+
+            cur.execute(SQL_MIRROR_FUNCTION)
+    logger.info(f"Writes to {NAMES} are now mirrored into {STAGING}")
+
+
+def copy_rows(batch_size: int, pause: float) -> int:
+    after = '00000000-0000-0000-0000-000000000000'
+    copied = batches = 0
+    started = time.perf_counter()
+    while True:
+        with db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_NEXT_BATCH, (after, batch_size))
+                ids = [row[0] for row in cur.fetchall()]
+                if not ids:
+                    break
+                cur.execute(SQL_COPY_BATCH, (ids,))
+                copied += cur.rowcount
+        after = ids[-1]
+        batches += 1
+        if batches % 10 == 0:
+            rate = copied / (time.perf_counter() - started)
+            logger.info(f"Copied {copied} rows in {batches} batches ({rate:.0f} rows/s)")
+        if pause:
+            time.sleep(pause)
+    logger.info(f"Copy finished: {copied} rows copied in {batches} batches "
+                f"({time.perf_counter() - started:.1f}s); rows already present were skipped")
+    return copied
+
+
+def verify_counts() -> None:
+    """
+    Compare the row counts of both tables in one snapshot, without the swap
+    lock: readers and writers carry on during the two scans.
+    """
+    started = time.perf_counter()
+    with db.get_connection() as conn:
+        conn.rollback()  # the snapshot must start with the count
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        with conn.cursor() as cur:
+            cur.execute(SQL_COUNTS)
+            old_count, new_count = cur.fetchone()
+    if old_count != new_count:
+        raise click.ClickException(
+            f"Row counts differ ({NAMES}: {old_count}, {STAGING}: {new_count}); "
+            f"re-run the copy before swapping")
+    logger.info(f"Row counts match ({old_count}) in {time.perf_counter() - started:.1f}s")
+
+
+def _swap(cur, verify: bool) -> None:
+    cur.execute(f"LOCK TABLE {NAMES} IN ACCESS EXCLUSIVE MODE")
+    if verify:
+        # Counted before the lock; the mirror trigger has kept the tables equal since,
+        # so only check that nothing slipped past it
+        cur.execute(SQL_WATERMARKS)
+        old_max, new_max = cur.fetchone()
+        if old_max != new_max:
+            raise click.ClickException(
+                f"Latest name_id differs ({NAMES}: {old_max}, {STAGING}: {new_max}); "
+                f"re-run the copy before swapping")
+
+    indexes = _copyable_indexes(cur)
+    cur.execute(SQL_DEPENDENT_VIEWS, (NAMES,))
+    views = []
+    for oid, view, relkind, definition in cur.fetchall():
+        cur.execute(SQL_VIEW_INDEXES, (oid,))
+        views.append((view, relkind, definition, [row[0] for row in cur.fetchall()]))
+    for view, relkind, _, _ in views:
+        cur.execute(f"DROP {'MATERIALIZED VIEW' if relkind == 'm' else 'VIEW'} {view}")
+
+    cur.execute(f"DROP TRIGGER {MIRROR_TRIGGER} ON {NAMES}")
+    cur.execute("DROP FUNCTION toponyms.mirror_names_to_partitioned()")
+
+    cur.execute(f"ALTER TABLE {NAMES} RENAME TO {OLD}")
+    cur.execute(f"ALTER TABLE toponyms.{OLD} RENAME CONSTRAINT names_pkey TO {OLD}_pkey")
+    for name, _ in indexes:
+        cur.execute(f"ALTER INDEX toponyms.{name} RENAME TO {name[:50]}_unpart")
+
+    cur.execute(f"ALTER TABLE {STAGING} RENAME TO names")
+    cur.execute(f"ALTER TABLE {NAMES} RENAME CONSTRAINT names_partitioned_pkey TO names_pkey")
+    for name, _ in indexes:
+        cur.execute(f"ALTER INDEX toponyms.{_staging_index_name(name)} RENAME TO {name}")
+    cur.execute(f"CREATE TRIGGER {OVERLAP_TRIGGER} BEFORE INSERT OR UPDATE ON {NAMES} "
+                f"FOR EACH ROW EXECUTE FUNCTION toponyms.check_name_overlap()")
+
+    for view, relkind, definition, view_indexes in views:
+        cur.execute(f"CREATE {'MATERIALIZED VIEW' if relkind == 'm' else 'VIEW'} {view} AS {definition}")
+        for create_index in view_indexes:
+            cur.execute(create_index)
+        logger.info(f"Recreated {view}")
+
+
+def swap(verify: bool, lock_timeout: float, attempts: int) -> None:
+    if verify:
+        verify_counts()
+    for attempt in range(1, attempts + 1):
+        try:
+            with db.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(SQL_QUALIFIED_NAMES)
+                    cur.execute(f"SET LOCAL lock_timeout = '{int(lock_timeout * 1000)}ms'")
+                    _swap(cur, verify)
+            logger.info(f"{NAMES} is now partitioned by valid_start; the old table is toponyms.{OLD}")
+            return
+        except LockNotAvailable:
+            logger.warning(f"Could not lock {NAMES} within {lock_timeout}s (attempt {attempt}/{attempts})")
+            time.sleep(lock_timeout)
+    raise click.ClickException(f"Gave up waiting for a lock on {NAMES}; re-run swap when writers are quieter")
+
+
+# --- Command Line Interface ---
+@click.group()
+def cli():
+    """Range partitioning of toponyms.names by valid_start year."""
+
+
+@cli.command()
+@click.option('--first-year', default=DEFAULT_FIRST_YEAR, show_default=True, type=int,
+              help='First yearly partition; earlier names share one partition.')
+@click.option('--batch-size', default=DEFAULT_BATCH_SIZE, show_default=True, type=int,
+              help='Rows copied per transaction.')
+@click.option('--pause', default=0.0, show_default=True, type=float,
+              help='Seconds to sleep between batches to leave room for other writers.')
+@click.option('--swap/--no-swap', 'do_swap', default=True, show_default=True,
+              help='Swap the tables once the copy is done.')
+@click.option('--verify/--no-verify', default=True, show_default=True,
+              help='Compare row counts before the swap (two full scans, without the swap lock).')
+@click.option('--lock-timeout', default=5.0, show_default=True, type=float,
+              help='Seconds to wait for the swap lock before retrying.')
+@click.option('--lock-attempts', default=10, show_default=True, type=int)
+def migrate(first_year, batch_size, pause, do_swap, verify, lock_timeout, lock_attempts):
+    """Convert toponyms.names into a partitioned table."""
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            kind = _relkind(cur, NAMES)
+    if kind == 'p':
+        logger.info(f"{NAMES} is already partitioned; nothing to do.")
+        return
+    prepare(first_year)
+    copy_rows(batch_size, pause)
+    if do_swap:
+        swap(verify, lock_timeout, lock_attempts)
+    else:
+        logger.info("Copy complete; run `swap` to switch over (writes keep being mirrored until then).")
+
+
+@cli.command('swap')
+@click.option('--verify/--no-verify', default=True, show_default=True)
+@click.option('--lock-timeout', default=5.0, show_default=True, type=float)
+@click.option('--lock-attempts', default=10, show_default=True, type=int)
+def swap_command(verify, lock_timeout, lock_attempts):
+    """Switch to the partitioned table after `migrate --no-swap`."""
+    swap(verify, lock_timeout, lock_attempts)
+
+
+@cli.command()
+@click.option('--years-ahead', default=1, show_default=True, type=int,
+              help='Create partitions up to this many years after the current one.')
+def ensure(years_ahead):
+    """Create upcoming yearly partitions and split years out of the DEFAULT partition."""
+    current_year = datetime.now(timezone.utc).year
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            if _relkind(cur, NAMES) != 'p':
+                raise click.ClickException(f"{NAMES} is not partitioned yet; run `migrate` first")
+            cur.execute(SQL_DEFAULT_YEARS)
+            years = sorted({row[0] for row in cur.fetchall()} | set(range(current_year, current_year + years_ahead + 1)))
+            for year in years:
+                cur.execute("SELECT toponyms.ensure_names_partition(%s)", (year,))
+    logger.info(f"Partitions present for {', '.join(map(str, years))}")
+
+
+@cli.command()
+def status():
+    """Show partitions with estimated row counts and sizes."""
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            kind = _relkind(cur, NAMES)
+            if kind != 'p':
+                staging = _relkind(cur, STAGING)
+                click.echo(f"{NAMES} is not partitioned" +
+                           (f"; {STAGING} exists (migration in progress)" if staging else ""))
+                return
+            cur.execute(SQL_PARTITIONS, (NAMES,))
+            rows = cur.fetchall()
+            old = _relkind(cur, f"toponyms.{OLD}")
+    click.echo(f"{'partition':<22} {'rows (est.)':>12} {'size':>10}  bounds")
+    for name, bounds, tuples, size in rows:
+        click.echo(f"{name:<22} {max(tuples, 0):>12} {size:>10}  {bounds}")
+    if old:
+        click.echo(f"toponyms.{OLD} is still present (remove with `drop-old`)")
+
+
+@cli.command('drop-old')
+@click.option('--yes', is_flag=True, help='Do not ask for confirmation.')
+def drop_old(yes):
+    """Drop toponyms.names_unpartitioned after a successful migration."""
+    if not yes:
+        click.confirm(f"Drop toponyms.{OLD}?", abort=True)
+    with db.get_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP TABLE IF EXISTS toponyms.{OLD}")
+    logger.info(f"Dropped toponyms.{OLD}")
+
+
+if __name__ == "__main__":
+    cli()
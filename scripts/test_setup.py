@@ -12,13 +12,14 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from scripts.utils.database import db
-from scripts.utils.config import setup_logging, SQL_DIR
+from scripts.utils.config import setup_logging, ensure_directories, SQL_DIR
 
 logger = setup_logging(__name__)
 
 def main():
     """Run all setup tests"""
     print("🔍 Testing Mariupol Toponyms Database Setup\n")
+    ensure_directories()
     
     # Test 1: Database connection
     print("1. Testing database connection...")
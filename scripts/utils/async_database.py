@@ -0,0 +1,245 @@
+# scripts/utils/async_database.py
+"""
+asyncio database layer on psycopg 3, for high-concurrency reads and writes.
+
+AsyncDatabaseConnection mirrors DatabaseConnection (insert_entity,
+reference_data, get_valid_entity_types, execute_sql_file, refresh_name_history,
+find_entities_by_tags, tag_values, test_connection) on top of an
+AsyncConnectionPool, so one process can serve many concurrent requests. The batch methods (insert_entities, insert_entities_with_names,
+execute_pipelined, fetch_many) use pipeline mode:
+every statement of a batch is sent before any result is read, so a batch costs
+one network round trip instead of one per statement.
+
+    async with AsyncDatabaseConnection() as adb:
+        ids = await adb.insert_entities(rows)
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import psycopg
+from psycopg.conninfo import make_conninfo
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+
+from .config import DB_CONFIG, setup_logging
+from .database import (ENTITY_COLUMNS, SQL_ENTITIES_BY_TAGS, SQL_INSERT_ENTITY, SQL_REFRESH_NAME_HISTORY,
+                       SQL_TAG_VALUES, tag_filter_params, tags_json)
+from .reference_data import ReferenceData, SQL_REFERENCE_DATA
+from .ids import new_id
+
+logger = setup_logging(__name__)
+
+PIPELINE_BATCH_SIZE = 500  # statements queued per pipeline sync
+
+
+class AsyncDatabaseConnection:
+    """Pooled psycopg 3 connections with the same methods as DatabaseConnection, as coroutines."""
+
+    def __init__(self, config: Dict[str, Any] = None, min_size: int = 1, max_size: int = 10):
+        self.config = config or DB_CONFIG
+        self.min_size = min_size
+        self.max_size = max_size
+        self.pool: Optional[AsyncConnectionPool] = None
+        self._reference_data: Optional[ReferenceData] = None
+
+    def conninfo(self) -> str:
+        return make_conninfo(
+            host=self.config['host'],
+            port=self.config['port'],
+            dbname=self.config['database'],
+            user=self.config['user'],
+            password=self.config['password'],
+        )
+
+    @retry(
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        stop=stop_after_attempt(10),
+        retry=retry_if_exception_type((psycopg.OperationalError, PoolTimeout)),
+    )
+    async def open(self) -> None:
+        if self.pool is None:
+            self.pool = AsyncConnectionPool(self.conninfo(), min_size=self.min_size,
+                                            max_size=self.max_size, open=False)
+        try:
+            await self.pool.open(wait=True, timeout=10)
+        except Exception:
+            await self.pool.close()
+            self.pool = None
+            raise
+        logger.info(f"Async connection pool opened ({self.min_size}-{self.max_size} connections).")
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def __aenter__(self) -> 'AsyncDatabaseConnection':
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def get_connection(self) -> AsyncIterator[psycopg.AsyncConnection]:
+        """Borrow a pooled connection; commits on success and rolls back on error."""
+        if self.pool is None:
+            await self.open()
+        async with self.pool.connection() as conn:
+            yield conn
+
+    async def execute_sql_file(self, filepath: str) -> None:
+        logger.info(f"Executing SQL file: {filepath}")
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            sql_content = f.read()
+
+        async with self.get_connection() as conn:
+            await conn.execute(sql_content)
+
+        logger.info(f"Successfully executed: {filepath}")
+
+    async def test_connection(self) -> bool:
+        try:
+            async with self.get_connection() as conn:
+                cur = await conn.execute("SELECT version(), PostGIS_version()")
+                pg_version, postgis_version = await cur.fetchone()
+                logger.info(f"Connected to PostgreSQL: {pg_version}")
+                logger.info(f"PostGIS version: {postgis_version}")
+            return True
+        except Exception as e:
+            logger.error(f"Connection test failed: {e}")
+            return False
+
+    async def insert_entity(self, entity_type: str, geometry_wkt: str,
+                            source_authority: str, valid_start: str,
+                            properties: Dict[str, Any] = None, entity_id: Optional[str] = None,
+                            run_id: Optional[str] = None, osm_type: Optional[str] = None,
+                            osm_id: Optional[int] = None) -> str:
+        entity_id = entity_id or new_id()
+        async with self.get_connection() as conn:
+            await conn.execute(SQL_INSERT_ENTITY, {
+                'entity_id': entity_id,
+                'entity_type': entity_type,
+                'geometry': geometry_wkt,
+                'source_authority': source_authority,
+                'valid_start': valid_start,
+                'run_id': run_id,
+                'osm_type': osm_type,
+                'osm_id': osm_id,
+                'tags': tags_json(properties)
+            })
+
+        logger.debug(f"Created entity {entity_id} of type {entity_type}")
+        return entity_id
+
+    async def insert_entities(self, entities: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Insert many entities (dicts with insert_entity's keyword arguments) in one
+        transaction using pipeline mode; returns their ids in input order.
+        """
+        return await self.insert_entities_with_names(entities)
+
+    async def insert_entities_with_names(self, entities: Iterable[Dict[str, Any]],
+                                         name_sql: Optional[str] = None) -> List[str]:
+        """
+        Insert entities and their names in one pipelined pass. Entity ids are
+        assigned client-side (time-ordered) unless an entity dict has `entity_id`,
+        so each entity's name statements can be queued right behind it without
+        waiting for RETURNING. `name_sql` is run once per dict in an entity's
+        `names` list, with `entity_id` filled in.
+        """
+        statements = []
+        ids = []
+        for e in entities:
+            entity_id = e.get('entity_id') or new_id()
+            ids.append(entity_id)
+            statements.append((SQL_INSERT_ENTITY, {
+                'entity_id': entity_id,
+                'entity_type': e['entity_type'],
+                'geometry': e['geometry_wkt'],
+                'source_authority': e['source_authority'],
+                'valid_start': e['valid_start'],
+                'run_id': e.get('run_id'),
+                'osm_type': e.get('osm_type'),
+                'osm_id': e.get('osm_id'),
+                'tags': tags_json(e.get('properties')),
+            }))
+            if name_sql:
+                statements.extend((name_sql, dict(name, entity_id=entity_id)) for name in e.get('names', ()))
+        await self.execute_pipelined(statements)
+        logger.info(f"Created {len(ids)} entities ({len(statements) - len(ids)} names)")
+        return ids
+
+    async def execute_pipelined(self, statements: Sequence[Tuple[str, Any]]) -> None:
+        """Run (sql, params) pairs in order over one connection in pipeline mode, in a single transaction."""
+        async with self.get_connection() as conn:
+            for start in range(0, len(statements), PIPELINE_BATCH_SIZE):
+                async with conn.pipeline():
+                    for sql, params in statements[start:start + PIPELINE_BATCH_SIZE]:
+                        await conn.execute(sql, params)
+
+    async def fetch_many(self, sql: str, params_seq: Sequence[Any]) -> List[List[tuple]]:
+        """
+        Run `sql` once per parameter set over one connection in pipeline mode and
+        return each statement's rows (in input order). Runs in a single transaction.
+        """
+        results: List[List[tuple]] = []
+        async with self.get_connection() as conn:
+            for start in range(0, len(params_seq), PIPELINE_BATCH_SIZE):
+                cursors = []
+                async with conn.pipeline():
+                    for params in params_seq[start:start + PIPELINE_BATCH_SIZE]:
+                        cur = conn.cursor()
+                        await cur.execute(sql, params)
+                        cursors.append(cur)
+                # Leaving the pipeline block syncs: all results are available now
+                for cur in cursors:
+                    results.append(await cur.fetchall() if cur.description else [])
+        return results
+
+    async def refresh_name_history(self, entity_ids: Optional[List[str]] = None) -> int:
+        """Recompute rename history for the given entities (all when None) and refresh the rollup views."""
+        async with self.get_connection() as conn:
+            cur = await conn.execute(SQL_REFRESH_NAME_HISTORY,
+                                     (list(entity_ids) if entity_ids is not None else None,))
+            refreshed = (await cur.fetchone())[0]
+
+        logger.info(f"Refreshed name history for {refreshed} entity/language pairs")
+        return refreshed
+
+    async def find_entities_by_tags(self, tags: Dict[str, Optional[str]], entity_type: Optional[str] = None,
+                                    renamed_after: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Current entities whose OSM tags match `tags` (see DatabaseConnection.find_entities_by_tags)."""
+        async with self.get_connection() as conn:
+            cur = await conn.execute(SQL_ENTITIES_BY_TAGS, tag_filter_params(tags, entity_type, renamed_after, limit))
+            return [dict(zip(ENTITY_COLUMNS, row)) for row in await cur.fetchall()]
+
+    async def tag_values(self, key: str, limit: int = 100) -> List[tuple]:
+        async with self.get_connection() as conn:
+            cur = await conn.execute(SQL_TAG_VALUES, {'key': key, 'limit': limit})
+            return await cur.fetchall()
+
+    async def reference_data(self, reload: bool = False) -> ReferenceData:
+        """Entity types, languages and name types with surrogate ids, loaded once (see DatabaseConnection)."""
+        if self._reference_data is None or reload:
+            try:
+                async with self.get_connection() as conn:
+                    cur = await conn.execute(SQL_REFERENCE_DATA)
+                    self._reference_data = ReferenceData.from_rows(await cur.fetchall())
+            except psycopg.errors.UndefinedTable as e:
+                logger.error(f"Reference tables not ready or do not exist: {e}. Falling back to hardcoded codes.")
+                self._reference_data = ReferenceData.fallback()
+            except Exception as e:
+                logger.error(f"Error loading reference data from DB: {e}. Falling back to hardcoded codes.")
+                self._reference_data = ReferenceData.fallback()
+            logger.debug(f"Loaded reference data: {self._reference_data.summary()}")
+        return self._reference_data
+
+    async def get_valid_entity_types(self) -> List[str]:
+        return (await self.reference_data()).entity_type_codes
+
+
+async_db = AsyncDatabaseConnection()
+
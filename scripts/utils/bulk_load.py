@@ -0,0 +1,325 @@
+# scripts/utils/bulk_load.py
+"""
+Bulk load path for classified PBF features (the importers' --bulk option).
+
+The row-by-row load checks every name against name_temporal_uniqueness and
+updates each index of toponyms.names one insert at a time, and overlapping names
+disappear through ON CONFLICT ... DO NOTHING. For the initial load of a snapshot
+BulkLoader instead, in a single transaction:
+
+  1. COPYs entities and names into unindexed temp tables, shipping the SMALLINT
+     reference-data ids rather than the codes when they are known;
+  2. finds overlapping names inside the batch with one set-based query and
+     reports them (the first name of each overlapping group is kept); like
+     name_temporal_uniqueness it keys on entity_id, and every staged entity is
+     new, so names already in toponyms.names cannot overlap them;
+  3. when the snapshot's year partition of toponyms.names is missing or empty,
+     fills a new detached partition, then adds its exclusion constraint and
+     attaches it, so the constraint, indexes and foreign key are each built
+     once over the loaded rows; when the partition already has rows (a later
+     snapshot of the same year), inserts the names with one INSERT ... SELECT,
+     checked as usual;
+  4. ANALYZEs the tables it wrote to once the transaction has committed.
+
+toponyms.names must be partitioned (scripts/maintenance/partition_names.py):
+on the plain table there is no unindexed table to load into, so load()
+refuses rather than quietly doing a constraint-checked insert. Entities
+always go into toponyms.entities with one INSERT ... SELECT. --bulk and the
+row-by-row load write the same rows for the same input.
+
+Entity and name ids are generated here (time-ordered, scripts/utils/ids.py), so
+new entities cannot overlap existing ones and rows reach the primary key
+indexes in key order; entities are inserted with one INSERT ... SELECT in the
+order they were given. Rows carry the import run's id (scripts/utils/import_runs.py),
+the OSM object and its tags on the entity and the OSM tag key code on the name.
+"""
+
+import csv
+import io
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from .config import setup_logging
+from .osm_mapping import detect_language
+from .metrics import metrics
+from .ids import new_id
+from .import_runs import ImportRun, OSM_TYPE_CODES
+from .database import tags_json
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+logger = setup_logging(__name__)
+
+COPY_BATCH_SIZE = 5000
+NAMES = 'toponyms.names'
+
+SQL_CREATE_LOAD_TABLES = """
+CREATE TEMP TABLE bulk_entities (
+    row_no INTEGER NOT NULL,
+    entity_id UUID NOT NULL,
+    type_id SMALLINT,
+    type_code TEXT,
+    osm_type "char",
+    osm_id BIGINT,
+    tags JSONB,
+    geometry_wkb TEXT NOT NULL
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE bulk_names (
+    row_no INTEGER NOT NULL,
+    name_id UUID NOT NULL,
+    entity_id UUID NOT NULL,
+    name_text TEXT NOT NULL,
+    language_id SMALLINT,
+    language_code TEXT,
+    script_code TEXT,
+    name_type_id SMALLINT,
+    name_type TEXT,
+    osm_tag_key_id SMALLINT
+) ON COMMIT DROP;
+
+CREATE TEMP TABLE bulk_conflicts (
+    row_no INTEGER NOT NULL,
+    entity_id UUID NOT NULL,
+    language_code TEXT NOT NULL,
+    name_type TEXT NOT NULL,
+    name_text TEXT NOT NULL,
+    conflicts_with TEXT NOT NULL,
+    reason TEXT NOT NULL
+) ON COMMIT DROP;
+
+-- Codes resolved from whichever of id/code was shipped
+CREATE TEMP VIEW bulk_names_coded AS
+SELECT n.row_no, n.name_id, n.entity_id, n.name_text, n.script_code, n.osm_tag_key_id,
+       COALESCE(n.language_code, l.language_code) AS language_code,
+       COALESCE(n.name_type, t.name_type) AS name_type
+FROM bulk_names n
+LEFT JOIN toponyms.languages l ON l.language_id = n.language_id
+LEFT JOIN toponyms.name_types t ON t.name_type_id = n.name_type_id;
+"""
+
+ENTITY_COLUMNS = ('row_no', 'entity_id', 'type_id', 'type_code', 'osm_type', 'osm_id', 'tags', 'geometry_wkb')
+NAME_COLUMNS = ('row_no', 'name_id', 'entity_id', 'name_text', 'language_id', 'language_code', 'script_code',
+                'name_type_id', 'name_type', 'osm_tag_key_id')
+
+# Keeps the checked state until commit: writers wait, readers do not
+SQL_LOCK_NAMES = f"LOCK TABLE {NAMES} IN SHARE ROW EXCLUSIVE MODE;"
+
+# Every staged name has the same open-ended validity, so same key = overlap
+SQL_BATCH_CONFLICTS = """
+INSERT INTO bulk_conflicts
+SELECT n.row_no, n.entity_id, n.language_code, n.name_type, n.name_text, k.name_text, 'batch'
+FROM (
+    SELECT *, first_value(row_no) OVER (PARTITION BY entity_id, language_code, name_type ORDER BY row_no) AS kept_row
+    FROM bulk_names_coded
+) n
+JOIN bulk_names_coded k ON k.row_no = n.kept_row
+WHERE n.row_no <> n.kept_row;
+"""
+
+SQL_CONFLICTS = "SELECT * FROM bulk_conflicts ORDER BY row_no;"
+
+SQL_INSERT_ENTITIES = """
+INSERT INTO toponyms.entities
+(entity_id, entity_type, geometry, centroid, source_authority, valid_start, run_id, osm_type, osm_id, tags)
+SELECT e.entity_id, COALESCE(e.type_code, t.type_code), g.geom, ST_Centroid(g.geom),
+       %(source_authority)s, %(valid_start)s::timestamptz, %(run_id)s::uuid, e.osm_type, e.osm_id, e.tags
+FROM bulk_entities e
+LEFT JOIN toponyms.entity_types t ON t.type_id = e.type_id
+CROSS JOIN LATERAL (SELECT ST_SetSRID(ST_GeomFromWKB(decode(e.geometry_wkb, 'hex')), 4326) AS geom) g
+ORDER BY e.row_no;  -- callers pass rows in spatial-key order
+"""
+
+SQL_INSERT_NAMES = """
+INSERT INTO {table}
+(name_id, entity_id, name_text, normalized_name, language_code, script_code, name_type, valid_start,
+ run_id, osm_tag_key_id)
+SELECT n.name_id, n.entity_id, n.name_text, toponyms.normalize_name(n.name_text), n.language_code, n.script_code,
+       n.name_type, %(valid_start)s::timestamptz, %(run_id)s::uuid, n.osm_tag_key_id
+FROM bulk_names_coded n
+WHERE NOT EXISTS (SELECT 1 FROM bulk_conflicts c WHERE c.row_no = n.row_no)
+ORDER BY n.row_no;
+"""
+
+SQL_RELKIND = "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);"
+
+SQL_PARTITION_FOR = "SELECT relname FROM pg_class WHERE oid = toponyms.names_partition_for(%s::timestamptz, %s);"
+
+NOT_PARTITIONED = (f"{NAMES} is not partitioned, so --bulk has no unindexed table to load into. Partition it "
+                   f"first (python scripts/maintenance/partition_names.py migrate) or load without --bulk.")
+
+
+def _reference_value(ids: Dict[str, Optional[int]], code: str) -> Tuple[Optional[int], Optional[str]]:
+    """(id, None) when the surrogate id is known, otherwise (None, code)."""
+    id_ = ids.get(code)
+    return (id_, None) if id_ is not None else (None, code)
+
+
+def _copy_rows(cur, table: str, columns: Iterable[str], rows: List[tuple]) -> None:
+    for start in range(0, len(rows), COPY_BATCH_SIZE):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows[start:start + COPY_BATCH_SIZE])
+        buffer.seek(0)
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+class BulkLoader:
+    """Loads a classified GeoDataFrame through temp tables and set-based SQL."""
+
+    def __init__(self, db_connection):
+        self.db = db_connection
+
+    def build_rows(self, gdf: 'gpd.GeoDataFrame', run: ImportRun) -> Tuple[List[tuple], List[tuple]]:
+        """Entity and name rows for the COPY, in gdf order, with client-generated time-ordered ids."""
+        reference = self.db.reference_data()
+        official = _reference_value(reference.name_types, 'official')
+        tag_keys = run.tag_key_ids({tag for tags in gdf['name_tags'] for tag in tags})
+        entities, names = [], []
+        wkb = gdf.geometry.to_wkb(hex=True)
+        for row_no, (row, geometry_wkb) in enumerate(zip(gdf.itertuples(index=False), wkb)):
+            entity_id = new_id()
+            entities.append((row_no, entity_id, *_reference_value(reference.entity_types, row.entity_type),
+                             OSM_TYPE_CODES.get(row.osm_type), row.osm_id, tags_json(row.properties), geometry_wkb))
+            for name_tag, name_value in row.name_tags.items():
+                if not name_value or not name_value.strip():
+                    continue
+                language_code, script_code = detect_language(name_tag, name_value)
+                names.append((len(names), new_id(), entity_id, name_value,
+                              *_reference_value(reference.languages, language_code), script_code,
+                              *official, tag_keys[name_tag]))
+        return entities, names
+
+    def require_partitioned_names(self) -> None:
+        """Raise RuntimeError unless toponyms.names is partitioned; call before a long parse."""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_RELKIND, (NAMES,))
+                row = cur.fetchone()
+        if not row or row[0] != 'p':
+            raise RuntimeError(NOT_PARTITIONED)
+
+    def _target_partition(self, valid_start: str) -> Optional[int]:
+        """
+        Year whose names partition will be built from scratch, or None to insert
+        through toponyms.names. An existing, empty yearly partition is dropped here,
+        in its own short transaction (DETACH locks out readers until commit).
+        """
+        year = datetime.fromisoformat(valid_start.replace('Z', '+00:00')).year
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_RELKIND, (NAMES,))
+                row = cur.fetchone()
+                if not row or row[0] != 'p':
+                    raise RuntimeError(NOT_PARTITIONED)
+                cur.execute(SQL_PARTITION_FOR, (valid_start, NAMES))
+                row = cur.fetchone()
+                if row is None:
+                    return year
+                partition = f"toponyms.{row[0]}"
+                if row[0] != f"names_y{year}":
+                    logger.info(f"{partition} covers {valid_start}; names go in with one constraint-checked INSERT")
+                    return None
+                cur.execute(SQL_LOCK_NAMES)
+                cur.execute(f"SELECT EXISTS (SELECT 1 FROM {partition})")
+                if cur.fetchone()[0]:
+                    logger.info(f"{partition} already has rows; names go in with one constraint-checked INSERT")
+                    return None
+                cur.execute(f"ALTER TABLE {NAMES} DETACH PARTITION {partition}")
+                cur.execute(f"DROP TABLE {partition}")
+                logger.info(f"Dropped empty {partition} to rebuild it from the bulk load")
+        return year
+
+    def load(self, gdf: 'gpd.GeoDataFrame', valid_start: str, source_authority: str,
+             run: Optional[ImportRun] = None) -> Dict[str, Any]:
+        """
+        Load gdf (with an `entity_type` column) as one snapshot, stamped with `run`
+        (a new one when not given). Returns counts, timings, the new entity ids and
+        the overlapping names that were skipped.
+        """
+        started = time.perf_counter()
+        run = run or ImportRun.start(self.db, 'bulk_load', None, valid_start, source_authority)
+        params = {'valid_start': valid_start, 'source_authority': source_authority, 'run_id': run.run_id}
+        stats: Dict[str, Any] = {'seconds': {}}
+
+        def lap(step: str, since: float) -> float:
+            now = time.perf_counter()
+            stats['seconds'][step] = round(now - since, 3)
+            return now
+
+        entities, names = self.build_rows(gdf, run)
+        stats['entity_ids'] = [row[1] for row in entities]
+        mark = lap('prepare', started)
+
+        year = self._target_partition(valid_start)
+        names_table = NAMES if year is None else f"toponyms.names_y{year}"
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_CREATE_LOAD_TABLES)
+                _copy_rows(cur, 'bulk_entities', ENTITY_COLUMNS, entities)
+                _copy_rows(cur, 'bulk_names', NAME_COLUMNS, names)
+                mark = lap('copy', mark)
+
+                cur.execute(SQL_LOCK_NAMES)
+                if year is not None:
+                    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (names_table,))
+                    if cur.fetchone()[0]:
+                        logger.info(f"{names_table} was created meanwhile; names go in with one constraint-checked INSERT")
+                        year, names_table = None, NAMES
+                cur.execute(SQL_BATCH_CONFLICTS)
+                cur.execute(SQL_CONFLICTS)
+                columns = [c.name for c in cur.description]
+                stats['conflicts'] = [dict(zip(columns, row)) for row in cur.fetchall()]
+                mark = lap('overlap_check', mark)
+
+                cur.execute(SQL_INSERT_ENTITIES, params)
+                stats['entities'] = cur.rowcount
+                mark = lap('entities', mark)
+
+                if year is not None:
+                    cur.execute("SELECT toponyms.ensure_names_partition(%s, %s, FALSE)", (year, NAMES))
+                cur.execute(SQL_INSERT_NAMES.format(table=names_table), params)
+                stats['names'] = cur.rowcount
+                mark = lap('names', mark)
+
+                if year is not None:
+                    cur.execute("SELECT toponyms.attach_names_partition(%s, make_timestamptz(%s, 1, 1, 0, 0, 0, 'UTC'), "
+                                "make_timestamptz(%s, 1, 1, 0, 0, 0, 'UTC'), %s)",
+                                (f"names_y{year}", year, year + 1, NAMES))
+                    mark = lap('attach', mark)
+
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("ANALYZE toponyms.entities")
+                cur.execute(f"ANALYZE {names_table}")
+        lap('analyze', mark)
+
+        stats['target'] = names_table
+        stats['total_seconds'] = round(time.perf_counter() - started, 3)
+        metrics.inc('db_rows_written_total', stats['entities'], table='entities')
+        metrics.inc('db_rows_written_total', stats['names'], table='names')
+        metrics.inc('bulk_name_conflicts_total', len(stats['conflicts']))
+        self._report(stats)
+        return stats
+
+    @staticmethod
+    def _report(stats: Dict[str, Any]) -> None:
+        steps = ', '.join(f"{step} {seconds:.2f}s" for step, seconds in stats['seconds'].items())
+        logger.info(f"Bulk load: {stats['entities']} entities and {stats['names']} names into "
+                    f"{stats['target']} in {stats['total_seconds']:.2f}s ({steps})")
+        conflicts = stats['conflicts']
+        if conflicts:
+            logger.warning(f"{len(conflicts)} overlapping names were not loaded; first ones:")
+            for conflict in conflicts[:20]:
+                logger.warning(f"   {conflict['entity_id']} {conflict['language_code']}/{conflict['name_type']} "
+                               f"'{conflict['name_text']}' overlaps '{conflict['conflicts_with']}' ({conflict['reason']})")
+
+
+def write_conflicts(conflicts: List[Dict[str, Any]], path) -> None:
+    """Write the overlapping names reported by BulkLoader.load to a CSV file."""
+    columns = ('row_no', 'entity_id', 'language_code', 'name_type', 'name_text', 'conflicts_with', 'reason')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(conflicts)
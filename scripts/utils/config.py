@@ -9,6 +9,7 @@ from pathlib import Path
 from dotenv import load_dotenv
 import logging
 from datetime import datetime
+from typing import List
 
 # Load environment variables from .env file
 project_root = Path(__file__).parent.parent.parent
@@ -24,27 +25,80 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'change_me_please!')
 }
 
+# Statement timing (see DatabaseConnection.enable_timing)
+DB_TIMING = os.getenv('DB_TIMING', '0').lower() in ('1', 'true', 'yes')
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', 500))
+
+# osmium node location index selection (see scripts/utils/node_index.py)
+NODE_INDEX_MEMORY_FRACTION = float(os.getenv('NODE_INDEX_MEMORY_FRACTION', 0.5))
+OSM_MAX_NODE_ID = int(os.getenv('OSM_MAX_NODE_ID', 13_000_000_000))
+# Keep node location indexes on disk, keyed by input file hash, and reuse them
+NODE_CACHE = os.getenv('NODE_CACHE', '1').lower() in ('1', 'true', 'yes')
+# Smaller inputs only get a cache file when they would need a file index anyway
+NODE_CACHE_MIN_BYTES = int(os.getenv('NODE_CACHE_MIN_BYTES', 64 * 1024 ** 2))
+# Read only the PBF blocks that overlap the import bbox (see scripts/utils/pbf_index.py);
+# files smaller than PBF_INDEX_MIN_BYTES are read whole
+PBF_BLOCK_INDEX = os.getenv('PBF_BLOCK_INDEX', '1').lower() in ('1', 'true', 'yes')
+PBF_INDEX_MIN_BYTES = int(os.getenv('PBF_INDEX_MIN_BYTES', 64 * 1024 ** 2))
+# Keep parsed features as Arrow files and reload them instead of parsing again
+FEATURE_CACHE = os.getenv('FEATURE_CACHE', '1').lower() in ('1', 'true', 'yes')
+
 # Project paths
 PROJECT_ROOT = project_root
 DATA_DIR = PROJECT_ROOT / 'data'
 RAW_DATA_DIR = DATA_DIR / 'raw'
 PROCESSED_DATA_DIR = DATA_DIR / 'processed'
 BACKUP_DIR = DATA_DIR / 'backups'
+EXPORT_DIR = DATA_DIR / 'exports'
+TILE_CACHE_DIR = DATA_DIR / 'tiles'
+CACHE_DIR = Path(os.getenv('CACHE_DIR', DATA_DIR / 'cache'))
+NODE_INDEX_DIR = Path(os.getenv('NODE_INDEX_DIR', CACHE_DIR / 'node_index'))
+PBF_INDEX_DIR = Path(os.getenv('PBF_INDEX_DIR', CACHE_DIR / 'pbf_index'))
+FEATURE_CACHE_DIR = Path(os.getenv('FEATURE_CACHE_DIR', CACHE_DIR / 'features'))
 LOG_DIR = PROJECT_ROOT / 'logs'
 SQL_DIR = PROJECT_ROOT / 'sql'
 
-# Create directories if they don't exist
-for directory in [RAW_DATA_DIR, PROCESSED_DATA_DIR, BACKUP_DIR, LOG_DIR]:
-    directory.mkdir(parents=True, exist_ok=True)
+
+def ensure_directories() -> None:
+    """Create the project data and log directories (no longer done on import)."""
+    for directory in [RAW_DATA_DIR, PROCESSED_DATA_DIR, BACKUP_DIR, EXPORT_DIR, LOG_DIR]:
+        directory.mkdir(parents=True, exist_ok=True)
 
 # Logging configuration
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
+
+class _DailyLogFileHandler(logging.FileHandler):
+    """One log file per day; LOG_DIR and the file are only created when the first record is written."""
+
+    def __init__(self):
+        super().__init__(LOG_DIR / f"{datetime.now().strftime('%Y%m%d')}_toponyms.log", delay=True)
+
+    def _open(self):
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        return super()._open()
+
+
+_handlers: List[logging.Handler] = []
+
+
+def _shared_handlers() -> List[logging.Handler]:
+    if not _handlers:
+        formatter = logging.Formatter(LOG_FORMAT)
+        for handler in (logging.StreamHandler(), _DailyLogFileHandler()):
+            handler.setFormatter(formatter)
+            _handlers.append(handler)
+    return _handlers
+
+
 def setup_logging(name: str) -> logging.Logger:
     """
     Set up logging for a module
     
+    Safe to call repeatedly: every logger shares one console and one file
+    handler, attached once.
+    
     Args:
         name: Logger name (usually __name__ from the calling module)
         
@@ -53,17 +107,9 @@ def setup_logging(name: str) -> logging.Logger:
     """
     logger = logging.getLogger(name)
     logger.setLevel(LOG_LEVEL)
-    
-    # Console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    logger.addHandler(console_handler)
-    
-    # File handler (one log file per day)
-    log_file = LOG_DIR / f"{datetime.now().strftime('%Y%m%d')}_toponyms.log"
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
-    logger.addHandler(file_handler)
+    for handler in _shared_handlers():
+        if handler not in logger.handlers:
+            logger.addHandler(handler)
     
     return logger
 
@@ -1,19 +1,21 @@
 import psycopg2
-from psycopg2.extras import DictRow, DictCursor
+from psycopg2.extras import DictRow
 from psycopg2 import OperationalError
 from psycopg2.errors import UndefinedTable # Correct import for UndefinedTable error
 
-import pandas as pd
-import geopandas as gpd
 from contextlib import contextmanager
 from typing import Optional, Dict, Any, List
+import atexit
 import json
 import time
 import logging
 
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_log
 
-from .config import DB_CONFIG, setup_logging
+from .config import DB_CONFIG, DB_TIMING, DB_SLOW_QUERY_MS, setup_logging
+from .query_stats import StatementStats, TimedConnection
+from .reference_data import ReferenceData, SQL_REFERENCE_DATA
+from .ids import new_id
 
 logger = setup_logging(__name__)
 
@@ -21,12 +23,151 @@ RETRYABLE_DB_EXCEPTIONS = (
     OperationalError,
 )
 
+# Statements shared with the asyncio layer (scripts/utils/async_database.py).
+# Ids are assigned client-side (scripts/utils/ids.py), so no RETURNING round trip.
+SQL_INSERT_ENTITY = """
+INSERT INTO toponyms.entities 
+(entity_id, entity_type, geometry, centroid, source_authority, valid_start, run_id, osm_type, osm_id, tags)
+VALUES (
+    %(entity_id)s::uuid,
+    %(entity_type)s,
+    ST_GeomFromText(%(geometry)s, 4326),
+    ST_Centroid(ST_GeomFromText(%(geometry)s, 4326)),
+    %(source_authority)s,
+    %(valid_start)s::timestamptz,
+    %(run_id)s::uuid,
+    %(osm_type)s,
+    %(osm_id)s,
+    %(tags)s::jsonb
+)
+"""
+
+# SQL_INSERT_ENTITY for many rows in one statement: psycopg2.extras.execute_values
+# with ENTITY_VALUES as the template, same parameter dicts
+SQL_INSERT_ENTITIES = """
+INSERT INTO toponyms.entities
+(entity_id, entity_type, geometry, centroid, source_authority, valid_start, run_id, osm_type, osm_id, tags)
+VALUES %s
+"""
+
+ENTITY_VALUES = """(
+    %(entity_id)s::uuid,
+    %(entity_type)s,
+    ST_GeomFromText(%(geometry)s, 4326),
+    ST_Centroid(ST_GeomFromText(%(geometry)s, 4326)),
+    %(source_authority)s,
+    %(valid_start)s::timestamptz,
+    %(run_id)s::uuid,
+    %(osm_type)s,
+    %(osm_id)s,
+    %(tags)s::jsonb
+)"""
+
+SQL_REFRESH_NAME_HISTORY = "SELECT toponyms.refresh_name_history(%s::uuid[]);"
+
+SQL_BUMP_CACHE_GENERATION = "SELECT audit.bump_cache_generation(%s::uuid[], %s);"
+
+# Tag queries (sql/10_setup/14_entity_tags.sql); each filter is skipped when its
+# parameter is NULL, and the GIN index on tags serves both ?& and @>
+SQL_ENTITIES_BY_TAGS = """
+SELECT e.entity_id::text, e.entity_type, e.osm_type, e.osm_id, e.tags, e.valid_start, e.valid_end
+FROM toponyms.entities e
+WHERE e.txn_end IS NULL
+  AND (%(contains)s::jsonb IS NULL OR e.tags @> %(contains)s::jsonb)
+  AND (%(has_keys)s::text[] IS NULL OR e.tags ?& %(has_keys)s::text[])
+  AND (%(entity_type)s::text IS NULL OR e.entity_type = %(entity_type)s)
+  AND (%(renamed_after)s::timestamptz IS NULL OR EXISTS (
+        SELECT 1 FROM toponyms.name_rename_events r
+        WHERE r.entity_id = e.entity_id AND r.renamed_at >= %(renamed_after)s::timestamptz))
+ORDER BY e.entity_id
+LIMIT %(limit)s;
+"""
+
+SQL_TAG_VALUES = """
+SELECT e.tags ->> %(key)s AS value, count(*)
+FROM toponyms.entities e
+WHERE e.txn_end IS NULL
+  AND e.tags ? %(key)s
+GROUP BY 1
+ORDER BY 2 DESC, 1
+LIMIT %(limit)s;
+"""
+
+ENTITY_COLUMNS = ('entity_id', 'entity_type', 'osm_type', 'osm_id', 'tags', 'valid_start', 'valid_end')
+
+# Keys the handlers add to `properties` that are columns of their own
+NON_TAG_PROPERTIES = ('osm_type', 'osm_id')
+
+
+def tags_json(properties: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The OSM tags in a feature's `properties`, as JSON for the tags column (None when there are none)."""
+    if not properties:
+        return None
+    tags = {k: v for k, v in properties.items() if k not in NON_TAG_PROPERTIES}
+    return json.dumps(tags, ensure_ascii=False) if tags else None
+
+
+def tag_filter_params(tags: Dict[str, Optional[str]], entity_type: Optional[str] = None,
+                      renamed_after: Optional[str] = None, limit: int = 1000) -> Dict[str, Any]:
+    """Parameters for SQL_ENTITIES_BY_TAGS: a None value matches any value of that key (highway=*)."""
+    contains = {k: v for k, v in tags.items() if v is not None}
+    has_keys = [k for k, v in tags.items() if v is None]
+    return {
+        'contains': json.dumps(contains, ensure_ascii=False) if contains else None,
+        'has_keys': has_keys or None,
+        'entity_type': entity_type,
+        'renamed_after': renamed_after,
+        'limit': limit,
+    }
+
 class DatabaseConnection:
     """Manages database connections with proper error handling and logging"""
     
     def __init__(self, config: Dict[str, Any] = None):
         self.config = config or DB_CONFIG
-        self._valid_entity_types_cache = None # FIX: Initialize the cache here
+        self._reference_data: Optional[ReferenceData] = None
+        self.stats: Optional[StatementStats] = None
+        if DB_TIMING:
+            self.enable_timing()
+
+    def enable_timing(self, slow_query_ms: float = DB_SLOW_QUERY_MS, report_at_exit: bool = True) -> StatementStats:
+        """
+        Time connect/execute/fetch/commit for every statement on connections opened
+        from now on, log statements slower than `slow_query_ms`, and (by default)
+        log the aggregated report when the process exits.
+        """
+        if self.stats is None:
+            self.stats = StatementStats(slow_query_ms)
+            if report_at_exit:
+                atexit.register(self.log_timing_report)
+        return self.stats
+
+    def timing_report(self, top: int = 15) -> str:
+        if self.stats is None:
+            return "Database timing is disabled (set DB_TIMING=1 or call enable_timing())."
+        pg_current = None
+        if self.stats.pg_available:
+            conn = psycopg2.connect(**self._connect_params())
+            try:
+                pg_current = self.stats.snapshot_pg_stat_statements(conn)
+            finally:
+                conn.close()
+        return self.stats.report(top, pg_current)
+
+    def log_timing_report(self) -> None:
+        try:
+            logger.info(self.timing_report())
+        except Exception as e:
+            logger.warning(f"Could not build database timing report: {e}")
+
+    def _connect_params(self) -> Dict[str, Any]:
+        return {
+            'host': self.config['host'],
+            'port': self.config['port'],
+            'dbname': self.config['database'],
+            'user': self.config['user'],
+            'password': self.config['password'],
+        }
         
     @retry(
         wait=wait_exponential(multiplier=1, min=1, max=10),
@@ -38,22 +179,27 @@ class DatabaseConnection:
     def get_connection(self):
         conn = None
         try:
-            logger.info("Attempting to acquire database connection...")
-            conn = psycopg2.connect(
-                host=self.config['host'],
-                port=self.config['port'],
-                dbname=self.config['database'],
-                user=self.config['user'],
-                password=self.config['password'],
-                # options="-c search_path=toponyms,public" # OPTIONAL: REMOVE THIS LINE
-            )
+            logger.debug("Attempting to acquire database connection...")
+            if self.stats is None:
+                conn = psycopg2.connect(
+                    **self._connect_params(),
+                    # options="-c search_path=toponyms,public" # OPTIONAL: REMOVE THIS LINE
+                )
+            else:
+                started = time.perf_counter()
+                conn = psycopg2.connect(**self._connect_params(), connection_factory=TimedConnection)
+                self.stats.record_connect(time.perf_counter() - started)
+                if self.stats.pg_available is None:
+                    # Baseline so the report only shows server time spent during this run
+                    self.stats.pg_baseline = self.stats.snapshot_pg_stat_statements(conn)
+                conn.stats = self.stats
 
             # REMOVE THIS BLOCK. The search_path should be set by ALTER ROLE/DATABASE
             # with conn.cursor() as cur:
             #     cur.execute("SET search_path TO toponyms, public;")
             # logger.debug("Database session search_path set to 'toponyms, public'.")
 
-            logger.info("Database connection established successfully.")
+            logger.debug("Database connection established successfully.")
             yield conn
             conn.commit()
             logger.debug("Transaction committed successfully")
@@ -94,52 +240,97 @@ class DatabaseConnection:
     
     def insert_entity(self, entity_type: str, geometry_wkt: str, 
                      source_authority: str, valid_start: str,
-                     properties: Dict[str, Any] = None) -> str:
-        
-        sql = """
-        INSERT INTO toponyms.entities 
-        (entity_type, geometry, centroid, source_authority, valid_start)
-        VALUES (
-            %(entity_type)s,
-            ST_GeomFromText(%(geometry)s, 4326),
-            ST_Centroid(ST_GeomFromText(%(geometry)s, 4326)),
-            %(source_authority)s,
-            %(valid_start)s::timestamptz
-        )
-        RETURNING entity_id
+                     properties: Dict[str, Any] = None, entity_id: Optional[str] = None,
+                     run_id: Optional[str] = None, osm_type: Optional[str] = None, osm_id: Optional[int] = None) -> str:
         """
-        
+        Insert one entity; its id is generated here (time-ordered) unless given.
+        `run_id` is the import run writing it (scripts/utils/import_runs.py),
+        `osm_type` ('n', 'w' or 'r') and `osm_id` the OSM object it came from,
+        `properties` its OSM tags (stored in the tags column).
+        """
+        entity_id = entity_id or new_id()
         with self.get_connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(sql, {
+                cur.execute(SQL_INSERT_ENTITY, {
+                    'entity_id': entity_id,
                     'entity_type': entity_type,
                     'geometry': geometry_wkt,
                     'source_authority': source_authority,
-                    'valid_start': valid_start
+                    'valid_start': valid_start,
+                    'run_id': run_id,
+                    'osm_type': osm_type,
+                    'osm_id': osm_id,
+                    'tags': tags_json(properties)
                 })
-                entity_id = cur.fetchone()[0]
                 
         logger.info(f"Created entity {entity_id} of type {entity_type}")
         return entity_id
     
-    def get_valid_entity_types(self) -> List[str]:
-        if self._valid_entity_types_cache:
-            return self._valid_entity_types_cache
+    def refresh_name_history(self, entity_ids: Optional[List[str]] = None) -> int:
+        """Recompute rename history for the given entities (all when None) and refresh the rollup views."""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_REFRESH_NAME_HISTORY, (list(entity_ids) if entity_ids is not None else None,))
+                refreshed = cur.fetchone()[0]
 
-        sql = "SELECT type_code FROM toponyms.entity_types ORDER BY type_code;"
-        try:
-            with self.get_connection() as conn: 
-                with conn.cursor(cursor_factory=DictCursor) as cur:
-                    cur.execute(sql)
-                    types = [row['type_code'] for row in cur.fetchall()]
-                    self._valid_entity_types_cache = types
-                    logger.debug(f"Fetched valid entity types: {types}")
-                    return types
+        logger.info(f"Refreshed name history for {refreshed} entity/language pairs")
+        return refreshed
+
+    def bump_cache_generation(self, entity_ids: Optional[List[str]] = None, source: Optional[str] = None) -> int:
+        """Tell read caches which entities an import batch changed (None: possibly any)."""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_BUMP_CACHE_GENERATION,
+                            (list(entity_ids) if entity_ids is not None else None, source))
+                generation = cur.fetchone()[0]
+
+        logger.debug(f"Cache generation bumped to {generation} by {source}")
+        return generation
+
+    def find_entities_by_tags(self, tags: Dict[str, Optional[str]], entity_type: Optional[str] = None,
+                              renamed_after: Optional[str] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Current entities whose OSM tags match `tags` (a None value matches any
+        value: {'highway': None} is highway=*), optionally of one entity type
+        and renamed on or after `renamed_after`:
+
+            db.find_entities_by_tags({'highway': None}, renamed_after='2022-01-01')
+            db.find_entities_by_tags({'historic': 'memorial'})
+        """
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_ENTITIES_BY_TAGS, tag_filter_params(tags, entity_type, renamed_after, limit))
+                return [dict(zip(ENTITY_COLUMNS, row)) for row in cur.fetchall()]
+
+    def tag_values(self, key: str, limit: int = 100) -> List[tuple]:
+        """(value, entity count) for one OSM tag key over current entities, most frequent first."""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_TAG_VALUES, {'key': key, 'limit': limit})
+                return cur.fetchall()
+
+    def reference_data(self, reload: bool = False) -> ReferenceData:
+        """
+        Entity types, languages and name types with their surrogate ids, read in a
+        single query on first use and kept for the life of the process. A failed
+        read is logged once and the fallback codes are kept instead of retrying.
+        """
+        if self._reference_data is None or reload:
+            try:
+                with self.get_connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute(SQL_REFERENCE_DATA)
+                        self._reference_data = ReferenceData.from_rows(cur.fetchall())
             except UndefinedTable as e:
-                logger.error(f"Schema for entity_types table not ready or does not exist: {e}. Falling back to hardcoded list.")
-                return ['region', 'district', 'street', 'square', 'park', 'building', 'city', 'point_of_interest', 'area', 'path', 'waterway', 'unknown']
+                logger.error(f"Reference tables not ready or do not exist: {e}. Falling back to hardcoded codes.")
+                self._reference_data = ReferenceData.fallback()
             except Exception as e:
-                logger.error(f"Error fetching valid entity types from DB: {e}. Falling back to hardcoded list.")
-                return ['region', 'district', 'street', 'square', 'park', 'building', 'city', 'point_of_interest', 'area', 'path', 'waterway', 'unknown']
+                logger.error(f"Error loading reference data from DB: {e}. Falling back to hardcoded codes.")
+                self._reference_data = ReferenceData.fallback()
+            logger.debug(f"Loaded reference data: {self._reference_data.summary()}")
+        return self._reference_data
+
+    def get_valid_entity_types(self) -> List[str]:
+        return self.reference_data().entity_type_codes
 
 db = DatabaseConnection()
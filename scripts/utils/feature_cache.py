@@ -0,0 +1,101 @@
+# scripts/utils/feature_cache.py
+"""
+Parsed PBF features kept as Arrow IPC files, so reloading a file or
+reclassifying its features does not run osmium again.
+
+The handler stage of the importers (extract_features) turns a PBF into one
+dict per named feature: osm_id, osm_type, name_tags, geometry, properties.
+After the first parse these are written to FEATURE_CACHE_DIR as an
+uncompressed Arrow IPC file, one row per feature, with the geometry as WKB and
+the name tags and other tags as map<string, string> columns. The file name
+holds everything the features depend on:
+
+    <sha256 of the input>-<bbox hash>-<handler class>-v<handler version>.arrow
+
+Later runs with the same input, bbox and handler version memory-map the file
+and rebuild the feature dicts from its columns. A handler declares `version`
+and has it bumped whenever what it extracts changes; files of older versions
+are not read again (delete FEATURE_CACHE_DIR to reclaim the space). Parse
+errors are quarantined only by the run that parsed, so retrying them needs a
+run with the cache off.
+
+    features = read_features(path) if path.exists() else None
+    write_features(path, handler.features, handler.object_counts)
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pyarrow as pa
+import shapely
+
+from .config import FEATURE_CACHE_DIR, setup_logging
+from .import_runs import cached_file_sha256
+
+logger = setup_logging(__name__)
+
+TAGS = pa.map_(pa.string(), pa.string())
+SCHEMA = pa.schema([
+    ('osm_id', pa.int64()),
+    ('osm_type', pa.dictionary(pa.int8(), pa.string())),
+    ('geometry', pa.binary()),  # WKB
+    ('name_tags', TAGS),
+    ('tags', TAGS),             # properties without osm_type and osm_id
+])
+
+
+def feature_cache_path(pbf_path: Path, bbox: Sequence[float], handler_class: type) -> Path:
+    """Where the features `handler_class` extracts from `pbf_path` within `bbox` are kept."""
+    bbox_hash = hashlib.sha256(','.join(f"{float(v):.7f}" for v in bbox).encode()).hexdigest()[:12]
+    return FEATURE_CACHE_DIR / (f"{cached_file_sha256(pbf_path)}-{bbox_hash}-"
+                                f"{handler_class.__name__}-v{handler_class.version}.arrow")
+
+
+def write_features(path: Path, features: List[Dict[str, Any]], object_counts: Optional[Dict[str, int]] = None) -> None:
+    """Write handler features to `path` (complete or not at all)."""
+    table = pa.table({
+        'osm_id': pa.array([f['osm_id'] for f in features], pa.int64()),
+        'osm_type': pa.array([f['osm_type'] for f in features], pa.string()).dictionary_encode(),
+        'geometry': pa.array(shapely.to_wkb([f['geometry'] for f in features]), pa.binary()),
+        'name_tags': pa.array([f['name_tags'] for f in features], TAGS),
+        'tags': pa.array([{k: str(v) for k, v in f['properties'].items() if k not in ('osm_type', 'osm_id')}
+                          for f in features], TAGS),
+    }).cast(SCHEMA).replace_schema_metadata({'object_counts': json.dumps(object_counts or {})})
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with pa.OSFile(str(tmp), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        tmp.replace(path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+    logger.info(f"Cached {len(features)} parsed features in {path.name} ({path.stat().st_size / 1024 ** 2:.1f} MB)")
+
+
+def read_features(path: Path) -> List[Dict[str, Any]]:
+    """The features written to `path`, read from a memory map."""
+    with pa.memory_map(str(path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+        geometries = shapely.from_wkb(table['geometry'].to_numpy(zero_copy_only=False))
+        columns = {name: table[name].to_pylist() for name in ('osm_id', 'osm_type', 'name_tags', 'tags')}
+
+    features = []
+    for osm_id, osm_type, name_tags, tags, geometry in zip(columns['osm_id'], columns['osm_type'], columns['name_tags'],
+                                                           columns['tags'], geometries):
+        properties = dict(tags)
+        properties['osm_type'] = osm_type
+        properties['osm_id'] = osm_id
+        features.append({
+            'osm_id': osm_id,
+            'osm_type': osm_type,
+            'name_tags': dict(name_tags),
+            'geometry': geometry,
+            'properties': properties,
+        })
+    return features
+
@@ -0,0 +1,105 @@
+# scripts/utils/geojson_stream.py
+"""
+Incremental GeoJSON reader.
+Yields features one at a time from a FeatureCollection (optionally inside a zip
+archive) without loading the whole document into memory.
+"""
+
+import io
+import json
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, TextIO
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB of text per read
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+
+
+def _skip_whitespace(buffer: str, pos: int) -> int:
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def iter_geojson_features(stream: TextIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Yield each object of the top-level "features" array of a FeatureCollection.
+
+    Only the text of the feature currently being decoded (plus one read chunk)
+    is held in memory.
+    """
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    # Locate the opening bracket of the "features" array
+    while True:
+        idx = buffer.find('"features"', pos)
+        if idx != -1:
+            bracket = buffer.find('[', idx)
+            if bracket != -1:
+                pos = bracket + 1
+                break
+        if eof or not fill():
+            raise ValueError("No 'features' array found in GeoJSON stream")
+
+    while True:
+        pos = _skip_whitespace(buffer, pos)
+        if pos >= len(buffer):
+            if not fill():
+                raise ValueError("Unexpected end of GeoJSON stream inside 'features' array")
+            continue
+
+        char = buffer[pos]
+        if char == ']':
+            return
+        if char == ',':
+            pos += 1
+            continue
+
+        try:
+            feature, end = _decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # Feature is split across chunks, read more and retry
+            if not fill():
+                raise
+            continue
+
+        pos = end
+        yield feature
+
+
+@contextmanager
+def open_geojson(path: Path, member: Optional[str] = None) -> Iterator[TextIO]:
+    """
+    Open a GeoJSON file for streaming, as a context manager. If `path` is a zip
+    archive the member is decompressed on the fly; `member` defaults to the
+    first *.geojson entry. Both the stream and the archive are closed on exit.
+    """
+    path = Path(path)
+    if not zipfile.is_zipfile(path):
+        with open(path, 'r', encoding='utf-8') as stream:
+            yield stream
+        return
+
+    with zipfile.ZipFile(path) as archive:
+        if member is None:
+            candidates = [n for n in archive.namelist() if n.endswith('.geojson')]
+            if not candidates:
+                raise FileNotFoundError(f"No .geojson member found in {path}")
+            member = candidates[0]
+        with io.TextIOWrapper(archive.open(member), encoding='utf-8') as stream:
+            yield stream
@@ -0,0 +1,57 @@
+# scripts/utils/ids.py
+"""
+Time-ordered UUIDs (version 7, RFC 9562) for entity and name keys.
+
+A version 7 UUID starts with the Unix time in milliseconds, so ids generated
+one after another sort together: inserts append to the right edge of the
+primary key and names_entity_id_idx btrees instead of touching random pages,
+and loaders can assign ids before writing instead of reading them back with
+RETURNING. Within one millisecond the 12 rand_a bits are used as a counter, so
+ids from one process are strictly increasing.
+
+toponyms.uuid_generate_v7() (sql/10_setup/11_time_ordered_ids.sql) is the
+server-side equivalent used as the column default. Existing version 4 ids stay
+valid; they simply sort in random order.
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional, Union
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+
+def uuid7() -> uuid.UUID:
+    """New version 7 UUID, greater than any previously returned by this process."""
+    global _last_ms, _counter
+    with _lock:
+        ms = time.time_ns() // 1_000_000
+        if ms > _last_ms:
+            _last_ms = ms
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF  # leaves room to count up
+        else:
+            _counter += 1
+            if _counter > 0xFFF:  # counter exhausted: borrow the next millisecond
+                _last_ms += 1
+                _counter = 0
+        ms, counter = _last_ms, _counter
+    rand_b = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    return uuid.UUID(int=(ms << 80) | (0x7 << 76) | (counter << 64) | (0b10 << 62) | rand_b)
+
+
+def new_id() -> str:
+    """uuid7() as the string form the database layer passes around."""
+    return str(uuid7())
+
+
+def uuid7_time(value: Union[str, uuid.UUID]) -> Optional[datetime]:
+    """Creation time embedded in a version 7 UUID; None for other versions (e.g. older v4 rows)."""
+    value = value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+    if value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
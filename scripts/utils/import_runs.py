@@ -0,0 +1,176 @@
+# scripts/utils/import_runs.py
+"""
+Import-run provenance (sql/10_setup/13_import_runs.sql).
+
+Each importer run registers one row in toponyms.import_runs (source file and
+its SHA-256, query date, authority, source type and reliability, timing, row
+counts) and stamps the rows it writes with the run id. Names then carry only
+the run id and their OSM tag key as a SMALLINT code, instead of the authority,
+source type, reliability and a notes string each. A run is audited or removed
+with one indexed predicate:
+
+    SELECT * FROM toponyms.name_provenance WHERE run_id = '<uuid>';
+    DELETE FROM toponyms.import_runs WHERE run_id = '<uuid>';  -- cascades to its entities and names
+
+    run = ImportRun.start(db, 'import_osm_pbf', pbf_path, query_date, authority)
+    ... write rows with run.run_id and run.tag_key_id(name_tag) ...
+    run.finish(entities=..., names=...)
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+from .config import CACHE_DIR, setup_logging
+from .ids import new_id
+
+logger = setup_logging(__name__)
+
+HASH_CHUNK_SIZE = 1 << 20
+HASH_MEMO_FILE = CACHE_DIR / 'file_hashes.json'
+
+# osm_type as stored on toponyms.entities ("char")
+OSM_TYPE_CODES = {'node': 'n', 'way': 'w', 'relation': 'r'}
+
+SQL_START_RUN = """
+INSERT INTO toponyms.import_runs
+(run_id, importer, source_file, file_hash, file_bytes, query_date, source_authority, source_type, source_reliability)
+VALUES (%(run_id)s::uuid, %(importer)s, %(source_file)s, %(file_hash)s, %(file_bytes)s, %(query_date)s::timestamptz,
+        %(source_authority)s, %(source_type)s, %(source_reliability)s)
+"""
+
+SQL_RECORD_RUN = """
+UPDATE toponyms.import_runs
+SET entities_written = entities_written + %(entities)s,
+    names_written = names_written + %(names)s,
+    errors = errors + %(errors)s,
+    status = COALESCE(%(status)s, status),
+    finished_at = CASE WHEN %(status)s IS NULL THEN finished_at ELSE NOW() END
+WHERE run_id = %(run_id)s::uuid
+"""
+
+SQL_RUN_IMPORTER = "SELECT importer FROM toponyms.import_runs WHERE run_id = %s::uuid"
+
+SQL_TAG_KEYS = "SELECT tag_key, tag_key_id FROM toponyms.osm_tag_keys WHERE tag_key = ANY(%s)"
+
+SQL_ADD_TAG_KEYS = """
+INSERT INTO toponyms.osm_tag_keys (tag_key)
+SELECT unnest(%s::text[])
+ON CONFLICT (tag_key) DO NOTHING
+"""
+
+
+def file_sha256(path: Union[str, Path]) -> str:
+    """Hex SHA-256 of a file, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cached_file_sha256(path: Union[str, Path]) -> str:
+    """
+    file_sha256, remembered in HASH_MEMO_FILE by path, size and modification
+    time, so a multi-GB input is hashed once rather than on every run.
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = str(path)
+    try:
+        memo = json.loads(HASH_MEMO_FILE.read_text())
+    except (OSError, ValueError):
+        memo = {}
+    entry = memo.get(key)
+    if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+        return entry['sha256']
+
+    digest = file_sha256(path)
+    memo[key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+    try:
+        HASH_MEMO_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = HASH_MEMO_FILE.with_name(f"{HASH_MEMO_FILE.name}.{os.getpid()}")
+        tmp.write_text(json.dumps(memo, indent=1))
+        tmp.replace(HASH_MEMO_FILE)
+    except OSError as e:
+        logger.warning(f"Could not remember the hash of {path.name}: {e}")
+    return digest
+
+
+class ImportRun:
+    """One row of toponyms.import_runs, plus the OSM tag key codes its rows use."""
+
+    def __init__(self, db_connection, run_id: str, importer: str):
+        self.db = db_connection
+        self.run_id = run_id
+        self.importer = importer
+        self._tag_keys: Dict[str, int] = {}
+
+    @classmethod
+    def start(cls, db_connection, importer: str, source_file: Optional[Union[str, Path]] = None,
+              query_date: Optional[str] = None, source_authority: Optional[str] = None,
+              source_type: str = 'osm_data', source_reliability: str = 'high') -> 'ImportRun':
+        """Register a new run (hashing `source_file` when given) and return it."""
+        file_hash = file_bytes = None
+        if source_file is not None:
+            source_file = Path(source_file)
+            file_hash = cached_file_sha256(source_file)
+            file_bytes = source_file.stat().st_size
+        run = cls(db_connection, new_id(), importer)
+        with db_connection.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_START_RUN, {
+                    'run_id': run.run_id,
+                    'importer': importer,
+                    'source_file': str(source_file) if source_file is not None else None,
+                    'file_hash': file_hash,
+                    'file_bytes': file_bytes,
+                    'query_date': query_date,
+                    'source_authority': source_authority,
+                    'source_type': source_type,
+                    'source_reliability': source_reliability,
+                })
+        logger.info(f"Started import run {run.run_id} ({importer}"
+                    f"{f', {source_file.name} sha256 {file_hash[:12]}' if file_hash else ''})")
+        return run
+
+    @classmethod
+    def resume(cls, db_connection, run_id: str) -> Optional['ImportRun']:
+        """An existing run (to add rows to it, e.g. retried errors), or None when it is not registered."""
+        with db_connection.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_RUN_IMPORTER, (run_id,))
+                row = cur.fetchone()
+        return cls(db_connection, run_id, row[0]) if row else None
+
+    def record(self, entities: int = 0, names: int = 0, errors: int = 0, status: Optional[str] = None) -> None:
+        """Add row counts to the run; with `status`, also close it."""
+        with self.db.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(SQL_RECORD_RUN, {'run_id': self.run_id, 'entities': entities, 'names': names,
+                                             'errors': errors, 'status': status})
+
+    def finish(self, status: str = 'finished', entities: int = 0, names: int = 0, errors: int = 0) -> None:
+        self.record(entities, names, errors, status)
+        logger.info(f"Import run {self.run_id} {status}.")
+
+    def tag_key_ids(self, keys: Iterable[str]) -> Dict[str, int]:
+        """
+        SMALLINT codes of OSM tag keys, registering unknown keys. Registration is
+        committed on its own connection, so it survives a rolled-back load batch.
+        """
+        missing = sorted({key for key in keys if key not in self._tag_keys})
+        if missing:
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute(SQL_ADD_TAG_KEYS, (missing,))
+                    cur.execute(SQL_TAG_KEYS, (missing,))
+                    self._tag_keys.update(cur.fetchall())
+        return self._tag_keys
+
+    def tag_key_id(self, key: str) -> int:
+        if key not in self._tag_keys:
+            self.tag_key_ids((key,))
+        return self._tag_keys[key]
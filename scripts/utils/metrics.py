@@ -0,0 +1,196 @@
+# scripts/utils/metrics.py
+"""
+Lightweight run metrics (counters, histograms, timers) for the import pipeline.
+
+The module-level `metrics` registry is disabled by default: every call returns after
+a single flag check and timer() hands back a shared no-op context manager, so
+instrumented code pays almost nothing unless a CLI enables it (--metrics-out).
+At the end of a run the registry is written as Prometheus text format (.prom)
+or JSON (.json).
+
+`profiled()` wraps a run in cProfile and tracemalloc for --profile.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+from .config import LOG_DIR, setup_logging
+
+logger = setup_logging(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, float('inf'))
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+_NULL_TIMER = nullcontext()
+
+
+class _Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'started')
+
+    def __init__(self, registry: 'Metrics', name: str, labels: Dict[str, str]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Metrics:
+    """Registry of labelled counters and histograms."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        self.histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def reset(self) -> None:
+        self.counters.clear()
+        self.histograms.clear()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = _Histogram()
+        histogram.observe(value)
+
+    def timer(self, name: str, **labels):
+        """Context manager observing the elapsed seconds into histogram `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name, labels)
+
+    # --- Export ---
+
+    def snapshot(self) -> dict:
+        return {
+            'counters': {
+                name: [{'labels': dict(key), 'value': value} for key, value in series.items()]
+                for name, series in self.counters.items()
+            },
+            'histograms': {
+                name: [{'labels': dict(key), 'count': h.count, 'sum': round(h.sum, 6),
+                        'buckets': {('+Inf' if b == float('inf') else str(b)): c
+                                    for b, c in zip(h.buckets, h.counts)}}
+                       for key, h in series.items()]
+                for name, series in self.histograms.items()
+            },
+        }
+
+    def to_prometheus(self) -> str:
+        lines = []
+        for name, series in sorted(self.counters.items()):
+            lines.append(f"# TYPE {name} counter")
+            for key, value in series.items():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        for name, series in sorted(self.histograms.items()):
+            lines.append(f"# TYPE {name} histogram")
+            for key, h in series.items():
+                cumulative = 0
+                for bound, count in zip(h.buckets, h.counts):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(key)} {h.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Path) -> None:
+        """Write the registry as JSON (.json) or Prometheus text format (anything else)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == '.json':
+            path.write_text(json.dumps(self.snapshot(), indent=2, ensure_ascii=False), encoding='utf-8')
+        else:
+            path.write_text(self.to_prometheus(), encoding='utf-8')
+        logger.info(f"Metrics written to {path}")
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ''
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in key) + '}'
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def profiled(enabled: bool = True, top: int = 25, output_dir: Path = LOG_DIR) -> Iterator[Optional[Path]]:
+    """
+    Run the enclosed block under cProfile and tracemalloc, then log the `top`
+    functions by cumulative time and allocation sites by size, and dump the raw
+    profile to <output_dir>/profile_<timestamp>.prof (for snakeviz / pstats).
+    """
+    if not enabled:
+        yield None
+        return
+
+    profile_path = Path(output_dir) / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.prof"
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        yield profile_path
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profile_path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(profile_path))
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+        logger.info(f"Top {top} functions by cumulative time (full profile: {profile_path}):\n{stream.getvalue()}")
+
+        allocations = '\n'.join(f"   {stat}" for stat in snapshot.statistics('lineno')[:top])
+        logger.info(f"Python heap peak {peak / (1024 * 1024):.1f} MB; top allocation sites:\n{allocations}")
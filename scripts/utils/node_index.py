@@ -0,0 +1,240 @@
+# scripts/utils/node_index.py
+"""
+Node location index selection for osmium handlers that need way geometries
+(apply_file(..., locations=True)).
+
+libosmium keeps the location of every node it reads in an index, and the
+right index depends on how many nodes the file has and how much memory the
+process may use:
+
+  flex_mem           small extracts: osmium's default, sparse or dense in memory
+  sparse_mem_array   16 bytes per node in memory
+  dense_mmap_array   8 bytes per possible node id in (anonymous) memory; only
+                     wins when the file holds a large share of all node ids
+  sparse_file_array  16 bytes per node in a file under NODE_INDEX_DIR
+  dense_file_array   8 bytes per possible node id in a sparse file
+
+The number of nodes is estimated from the file size (about BYTES_PER_NODE of
+PBF per node; history files have more bytes per distinct node, so the estimate
+errs high) and the id range from OSM_MAX_NODE_ID. The memory budget is
+NODE_INDEX_MEMORY_FRACTION of the smaller of the cgroup limit (the container's
+memory limit) and MemAvailable, so the full Ukraine history file goes to a file
+index on a 2 GB container instead of being killed.
+
+With NODE_CACHE (the default) inputs of NODE_CACHE_MIN_BYTES or more, and
+smaller ones that would need a file index anyway, get a file index kept in
+NODE_INDEX_DIR under the SHA-256 of the input (<sha256>.<index type>). The
+first run over a file builds it; later runs of any importer or
+extract_mariupol_data.py open it memory-mapped, hand nodes only to the handler
+and fill way node locations from the cache, so nodes are not indexed again.
+A cache file appears only once it is complete. Cache files are never evicted
+and take about twice the size of their input; deleting them (make clean-cache)
+just means the next run rebuilds them.
+
+    apply_with_node_index(handler, pbf_path, node_index=None)  # None or 'auto' chooses
+
+logs the choice, the estimate behind it and the peak RSS of the process.
+"""
+
+import os
+import resource
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import osmium
+
+from .config import (NODE_CACHE, NODE_CACHE_MIN_BYTES, NODE_INDEX_DIR, NODE_INDEX_MEMORY_FRACTION, OSM_MAX_NODE_ID,
+                     setup_logging)
+from .import_runs import cached_file_sha256
+
+logger = setup_logging(__name__)
+
+INDEX_TYPES = ('flex_mem', 'sparse_mem_array', 'dense_mmap_array', 'sparse_file_array', 'dense_file_array')
+FILE_INDEX_TYPES = ('sparse_file_array', 'dense_file_array')
+
+BYTES_PER_NODE = 8          # PBF bytes per node in a current-state extract (less is safer)
+SPARSE_ENTRY_BYTES = 16     # node id + location
+DENSE_ENTRY_BYTES = 8       # location, addressed by node id
+SMALL_INDEX_BYTES = 256 * 1024 ** 2
+DEFAULT_MEMORY_BYTES = 2 * 1024 ** 3  # when neither cgroup nor /proc/meminfo says
+
+
+@dataclass
+class NodeIndexChoice:
+    """The index to use for one file and why."""
+    index_type: str
+    reason: str
+    estimated_nodes: int = 0
+    estimated_bytes: int = 0
+    path: Optional[Path] = None
+    cache: Optional[str] = None  # 'build' or 'reuse' for the persistent cache, None for a one-off index
+
+    @property
+    def idx(self) -> str:
+        """The idx argument for apply_file."""
+        return f"{self.index_type},{self.path}" if self.path else self.index_type
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def available_memory() -> int:
+    """Bytes this process can still use: the tighter of the cgroup limit and MemAvailable."""
+    candidates = []
+    limit = _read_int('/sys/fs/cgroup/memory.max') or _read_int('/sys/fs/cgroup/memory/memory.limit_in_bytes')
+    if limit and limit < 1 << 60:  # cgroup v1 reports "no limit" as a huge number
+        used = _read_int('/sys/fs/cgroup/memory.current') or _read_int('/sys/fs/cgroup/memory/memory.usage_in_bytes') or 0
+        candidates.append(max(limit - used, 0))
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except OSError:
+        pass
+    return min(candidates) if candidates else DEFAULT_MEMORY_BYTES
+
+
+def peak_rss_bytes() -> int:
+    """Peak resident set size of this process so far."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # kilobytes on Linux
+
+
+def _index_sizes(pbf_path: Path) -> Tuple[int, int, int]:
+    """(estimated nodes, sparse index bytes, dense index bytes) for `pbf_path`."""
+    nodes = max(Path(pbf_path).stat().st_size // BYTES_PER_NODE, 1)
+    return nodes, nodes * SPARSE_ENTRY_BYTES, (OSM_MAX_NODE_ID + 1) * DENSE_ENTRY_BYTES
+
+
+def choose_node_index(pbf_path: Path, memory_bytes: Optional[int] = None) -> NodeIndexChoice:
+    """Pick the cheapest index that fits the memory budget for `pbf_path`."""
+    nodes, sparse, dense = _index_sizes(pbf_path)
+    budget = int((memory_bytes if memory_bytes is not None else available_memory()) * NODE_INDEX_MEMORY_FRACTION)
+    sizes = f"~{nodes / 1e6:.0f}M nodes, sparse {sparse / 1024 ** 2:.0f} MB, budget {budget / 1024 ** 2:.0f} MB"
+
+    if sparse <= min(SMALL_INDEX_BYTES, budget):
+        return NodeIndexChoice('flex_mem', f"small file ({sizes})", nodes, sparse)
+    if dense <= min(sparse, budget):
+        return NodeIndexChoice('dense_mmap_array', f"dense ids fit in memory ({sizes})", nodes, dense)
+    if sparse <= budget:
+        return NodeIndexChoice('sparse_mem_array', f"fits in memory ({sizes})", nodes, sparse)
+    if dense <= sparse:
+        return NodeIndexChoice('dense_file_array', f"too large for memory, dense ids ({sizes})", nodes, dense)
+    return NodeIndexChoice('sparse_file_array', f"too large for memory ({sizes})", nodes, sparse)
+
+
+def cached_node_index(pbf_path: Path, index_type: Optional[str] = None) -> NodeIndexChoice:
+    """The persistent cache for `pbf_path`: an existing one to reuse, or the one to build."""
+    digest = cached_file_sha256(pbf_path)
+    for candidate in ((index_type,) if index_type else FILE_INDEX_TYPES):
+        path = NODE_INDEX_DIR / f"{digest}.{candidate}"
+        if path.exists():
+            return NodeIndexChoice(candidate, f"cached for sha256 {digest[:12]}", path=path, cache='reuse')
+
+    if index_type is None:
+        nodes, sparse, dense = _index_sizes(pbf_path)
+        index_type = 'dense_file_array' if dense <= sparse else 'sparse_file_array'
+        reason = f"~{nodes / 1e6:.0f}M nodes, {min(dense, sparse) / 1024 ** 2:.0f} MB"
+    else:
+        reason = 'requested'
+    return NodeIndexChoice(index_type, f"building cache for sha256 {digest[:12]}, {reason}",
+                           path=NODE_INDEX_DIR / f"{digest}.{index_type}", cache='build')
+
+
+def resolve_node_index(pbf_path: Path, node_index: Optional[str] = None, cache: bool = NODE_CACHE) -> NodeIndexChoice:
+    """
+    The index for `pbf_path`: `node_index` when given (not 'auto'), else
+    choose_node_index. With `cache`, a requested file index is persistent, and
+    'auto' reuses an existing cache or builds one for inputs of at least
+    NODE_CACHE_MIN_BYTES and for those choose_node_index sends to a file.
+    """
+    requested = node_index if node_index and node_index != 'auto' else None
+    if requested and requested not in INDEX_TYPES:
+        raise ValueError(f"Unknown node index '{node_index}', expected one of {', '.join(INDEX_TYPES)} or auto")
+    if cache and requested in FILE_INDEX_TYPES:
+        NODE_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        return cached_node_index(pbf_path, requested)
+
+    choice = NodeIndexChoice(requested, 'requested') if requested else choose_node_index(pbf_path)
+    if cache and requested is None:
+        cached = cached_node_index(pbf_path)
+        if (cached.cache == 'reuse' or choice.index_type in FILE_INDEX_TYPES
+                or Path(pbf_path).stat().st_size >= NODE_CACHE_MIN_BYTES):
+            NODE_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+            return cached
+    if choice.index_type in FILE_INDEX_TYPES:
+        NODE_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        choice.path = NODE_INDEX_DIR / f"{Path(pbf_path).name}.{os.getpid()}.{choice.index_type}"
+    return choice
+
+
+class _NodesOnly:
+    """Passes nodes to a handler ahead of the filter that keeps them from the location handler."""
+
+    def __init__(self, handler):
+        self.node = handler.node
+
+
+def _apply_cached(handler: osmium.SimpleHandler, pbf_path: Path, choice: NodeIndexChoice) -> None:
+    """Read `pbf_path` with way node locations from an existing cache file, without indexing nodes."""
+    index = osmium.index.create_map(choice.idx)
+    locations = osmium.NodeLocationsForWays(index)
+    locations.ignore_errors()  # as apply_file: ways with nodes outside the file keep invalid locations
+    ways_and_relations = osmium.osm.WAY | osmium.osm.RELATION
+    if callable(getattr(handler, 'node', None)):
+        osmium.apply(str(pbf_path), _NodesOnly(handler), osmium.filter.EntityFilter(ways_and_relations),
+                     locations, handler)
+    else:
+        # Nothing wants nodes: skip decoding them altogether
+        reader = osmium.io.Reader(str(pbf_path), ways_and_relations)
+        try:
+            osmium.apply(reader, locations, handler)
+        finally:
+            reader.close()
+
+
+def apply_with_node_index(handler: osmium.SimpleHandler, pbf_path: Path,
+                          node_index: Optional[str] = None, cache: bool = NODE_CACHE,
+                          read_path: Optional[Path] = None) -> NodeIndexChoice:
+    """
+    handler.apply_file with node locations, using the chosen index. A cached
+    index is reused or built (and kept); a one-off file index is removed afterwards.
+
+    With `read_path` (a file holding some of the blocks of `pbf_path`, see
+    scripts/utils/pbf_index.py), that file is read instead, with way node
+    locations from the cache of `pbf_path`, which must exist.
+    """
+    choice = resolve_node_index(pbf_path, node_index, cache)
+    if read_path is not None and choice.cache != 'reuse':
+        raise ValueError(f"Reading {Path(read_path).name} needs the node location cache of {Path(pbf_path).name}")
+    logger.info(f"Node location index: {choice.index_type} ({choice.reason})")
+    started = time.perf_counter()
+    if choice.cache == 'reuse':
+        _apply_cached(handler, read_path or pbf_path, choice)
+    elif choice.cache == 'build':
+        final_path, choice.path = choice.path, choice.path.with_name(f"{choice.path.name}.{os.getpid()}.tmp")
+        try:
+            handler.apply_file(str(pbf_path), locations=True, idx=choice.idx)
+            choice.path.replace(final_path)  # complete: later runs may use it
+        finally:
+            if choice.path.exists():
+                choice.path.unlink()
+            choice.path = final_path
+    else:
+        try:
+            handler.apply_file(str(pbf_path), locations=True, idx=choice.idx)
+        finally:
+            if choice.path is not None and choice.path.exists():
+                choice.path.unlink()
+    logger.info(f"Read {Path(read_path or pbf_path).name} with {choice.index_type} in {time.perf_counter() - started:.1f}s, "
+                f"peak RSS {peak_rss_bytes() / 1024 ** 2:.0f} MB")
+    return choice
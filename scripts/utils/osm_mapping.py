@@ -0,0 +1,60 @@
+# scripts/utils/osm_mapping.py
+"""
+Mapping of OSM features onto the toponymic schema, shared by the PBF importers:
+entity type classification from tags and language/script detection for name tags.
+"""
+
+from typing import Any, Dict, Tuple
+
+PLACE_DISTRICT_VALUES = ['town', 'village', 'hamlet', 'suburb', 'borough', 'neighbourhood']
+
+
+def classify_entity_type(osm_type: str, properties: Dict[str, Any], geom_type: str) -> str:
+    """Map an OSM feature (type, non-name tags, geometry type) to an entity_types.type_code."""
+    mapped_entity_type = 'unknown'
+
+    # Prioritize based on common OSM tags
+    if osm_type == 'way':
+        if 'highway' in properties: mapped_entity_type = 'street'
+        elif 'waterway' in properties: mapped_entity_type = 'waterway'
+        elif 'footway' in properties or 'path' in properties: mapped_entity_type = 'path'
+    elif osm_type == 'relation':
+        if 'admin_level' in properties and properties['admin_level'] in ['8', '9', '10']: mapped_entity_type = 'district'
+        elif 'boundary' in properties and properties['boundary'] == 'administrative': mapped_entity_type = 'region'
+        elif properties.get('type') == 'multipolygon':
+            if 'landuse' in properties and properties['landuse'] == 'park': mapped_entity_type = 'park'
+            elif 'building' in properties or 'amenity' in properties: mapped_entity_type = 'building'
+            else: mapped_entity_type = 'area'
+    elif osm_type == 'node':
+        if 'place' in properties and properties['place'] == 'city': mapped_entity_type = 'city'
+        elif 'building' in properties: mapped_entity_type = 'building'
+        elif 'amenity' in properties or 'shop' in properties or 'leisure' in properties: mapped_entity_type = 'point_of_interest'
+        elif 'place' in properties and properties['place'] in PLACE_DISTRICT_VALUES: mapped_entity_type = 'district'
+
+    # Fallback: if after all specific checks, it's still 'unknown', use geometry type
+    if mapped_entity_type == 'unknown':
+        if geom_type == 'Point':
+            mapped_entity_type = 'point_of_interest'
+        elif geom_type in ('LineString', 'MultiLineString'):
+            mapped_entity_type = 'path'
+        elif geom_type in ('Polygon', 'MultiPolygon'):
+            mapped_entity_type = 'area'
+
+    return mapped_entity_type
+
+
+def detect_language(name_tag: str, name_value: str) -> Tuple[str, str]:
+    """Return (language_code, script_code) for an OSM name tag and its value."""
+    language_code = 'und'
+    script_code = 'Latn'
+
+    if name_tag == 'name':
+        if any(c in name_value for c in 'іїєґІЇЄҐ'): language_code = 'ukr'
+        elif any(c in name_value for c in 'ыЭЫ'): language_code = 'rus'
+        else: language_code = 'ukr'
+        script_code = 'Cyrl'
+    elif name_tag == 'name:uk': language_code = 'ukr'; script_code = 'Cyrl'
+    elif name_tag == 'name:ru': language_code = 'rus'; script_code = 'Cyrl'
+    elif name_tag == 'name:en': language_code = 'eng'; script_code = 'Latn'
+
+    return language_code, script_code
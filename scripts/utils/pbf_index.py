@@ -0,0 +1,429 @@
+# scripts/utils/pbf_index.py
+"""
+Block index over OSM PBF files, so a bbox is read without decompressing the
+whole file.
+
+A PBF file is a sequence of separately compressed blocks of about 8000
+objects: nodes, then ways, then relations, each sorted by id. The index
+records for every block its byte offset and length, what it holds, its id
+range and the bounding box of its nodes - for node blocks from their own
+coordinates, for way blocks from the locations of the nodes they reference,
+looked up in the node location cache of the file (scripts/utils/node_index.py).
+It is built once per file, right after the first run that reads the file whole
+and builds that cache, and kept in PBF_INDEX_DIR under the SHA-256 of the input
+(<sha256>.json).
+
+Later reads of a bbox copy the blocks that overlap it, still compressed, into a
+temporary PBF together with the header block and every block without a bbox
+(relations, and blocks this module cannot decode), and osmium reads only that.
+Ways that cross the bbox edge keep all their node locations, since those come
+from the node cache of the whole file rather than from the blocks read.
+Handlers only see the objects of the selected blocks: anything they would pick
+up outside the bbox (by tags, say) is missed.
+
+    apply_in_bbox(handler, pbf_path, (min_lon, min_lat, max_lon, max_lat))
+
+falls back to apply_with_node_index (the whole file) for inputs smaller than
+PBF_INDEX_MIN_BYTES, with PBF_BLOCK_INDEX off, without the node cache or when
+the bbox needs most of the file anyway.
+"""
+
+import json
+import lzma
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import osmium
+
+from .config import NODE_CACHE, PBF_BLOCK_INDEX, PBF_INDEX_DIR, PBF_INDEX_MIN_BYTES, setup_logging
+from .import_runs import cached_file_sha256
+from .node_index import NodeIndexChoice, apply_with_node_index, resolve_node_index
+
+logger = setup_logging(__name__)
+
+INDEX_VERSION = 2               # 2: nodes without a location no longer widen node block bboxes
+FULL_READ_SHARE = 0.8            # read the original file when the bbox needs more of it than this
+UNDEFINED_COORDINATE = 2 ** 31 - 1  # osmium::Location of a node without coordinates
+COORDINATE_PRECISION = 10 ** 7      # osmium::Location stores degrees * 1e7
+
+Bbox = Tuple[float, float, float, float]  # min_lon, min_lat, max_lon, max_lat
+
+
+@dataclass
+class Block:
+    """One block (blob) of a PBF file."""
+    offset: int
+    length: int                   # bytes, including the length prefix and blob header
+    kind: str                     # header, node, way, relation, mixed or unknown (not decoded)
+    min_id: Optional[int] = None
+    max_id: Optional[int] = None
+    bbox: Optional[Bbox] = None   # of its nodes or of the nodes its ways reference
+
+    def needed_for(self, bbox: Bbox) -> bool:
+        """Whether reading `bbox` has to include this block."""
+        if self.kind in ('node', 'way'):
+            # Blocks without a bbox hold only nodes without locations (deleted
+            # versions) or ways none of whose nodes have one
+            return self.bbox is not None and not (
+                self.bbox[2] < bbox[0] or self.bbox[0] > bbox[2] or self.bbox[3] < bbox[1] or self.bbox[1] > bbox[3])
+        return True
+
+
+# --- Minimal protobuf decoding (fileformat.proto and osmformat.proto) ---
+
+def _varint(buf, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _int64(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _sint64(value: int) -> int:
+    return (value >> 1) ^ -(value & 1)
+
+
+def _fields(buf) -> Iterator[Tuple[int, object]]:
+    """(field number, value) pairs of a message; length-delimited values as memoryviews."""
+    buf = memoryview(buf)
+    pos, end = 0, len(buf)
+    while pos < end:
+        key, pos = _varint(buf, pos)
+        wire_type = key & 7
+        if wire_type == 0:
+            value, pos = _varint(buf, pos)
+        elif wire_type == 2:
+            size, pos = _varint(buf, pos)
+            value, pos = buf[pos:pos + size], pos + size
+        elif wire_type == 1:
+            value, pos = buf[pos:pos + 8], pos + 8
+        elif wire_type == 5:
+            value, pos = buf[pos:pos + 4], pos + 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}")
+        yield key >> 3, value
+
+
+def _packed_sint64(buf) -> np.ndarray:
+    """A packed repeated sint64 field, decoded with numpy rather than one varint at a time."""
+    data = np.frombuffer(buf, dtype=np.uint8)
+    if not data.size:
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    shifts = (np.arange(data.size) - np.repeat(starts, ends - starts + 1)).astype(np.uint64) * np.uint64(7)
+    raw = np.bitwise_or.reduceat((data & 0x7f).astype(np.uint64) << shifts, starts)
+    return (raw >> np.uint64(1)).astype(np.int64) ^ -(raw & np.uint64(1)).astype(np.int64)
+
+
+def _delta_decode(deltas: np.ndarray, counts: List[int]) -> np.ndarray:
+    """Undo delta coding of several concatenated lists of `counts` values each."""
+    totals = np.concatenate(([0], np.cumsum(deltas)))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int64)
+    return totals[1:] - np.repeat(totals[starts], counts)
+
+
+# --- Reading blocks ---
+
+def _read_blobs(f) -> Iterator[Tuple[int, int, str, bytes]]:
+    """(offset, length, blob type, blob) of each block of an open PBF file."""
+    offset = 0
+    while True:
+        prefix = f.read(4)
+        if len(prefix) < 4:
+            return
+        header_size = struct.unpack('>I', prefix)[0]
+        blob_type, data_size = '', 0
+        for field, value in _fields(f.read(header_size)):
+            if field == 1:
+                blob_type = bytes(value).decode()
+            elif field == 3:
+                data_size = value
+        blob = f.read(data_size)
+        length = 4 + header_size + data_size
+        yield offset, length, blob_type, blob
+        offset += length
+
+
+def _decompress(blob) -> Optional[bytes]:
+    """The block inside a blob; None for compressions not handled here (lz4, zstd)."""
+    for field, value in _fields(blob):
+        if field == 1:
+            return bytes(value)
+        if field == 3:
+            return zlib.decompress(value)
+        if field == 4:
+            return lzma.decompress(value)
+    return None
+
+
+class _CachedLocations:
+    """Node locations from a node location cache file (dense or sparse), memory-mapped."""
+
+    def __init__(self, choice: NodeIndexChoice):
+        if choice.index_type == 'dense_file_array':
+            self.dense = np.memmap(choice.path, dtype='<i4', mode='r').reshape(-1, 2)  # x, y by node id
+            self.sparse = None
+        else:
+            entries = np.memmap(choice.path, dtype=[('id', '<u8'), ('x', '<i4'), ('y', '<i4')], mode='r')
+            self.sparse = entries[:self._used(entries['id'])]
+            self.dense = None
+
+    @staticmethod
+    def _used(ids) -> int:
+        """Entries in use: sorted ids are followed by the unused, zeroed capacity of the file."""
+        lo, hi = 0, len(ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if ids[mid] != 0:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _lookup_sparse(self, refs: np.ndarray) -> np.ndarray:
+        """Positions of `refs` in the sparse index (-1 when missing), by a vectorised binary search."""
+        ids = self.sparse['id']  # a strided view: only the probed entries are read
+        size = len(ids)
+        if not size:
+            return np.full(len(refs), -1, dtype=np.int64)
+        refs = refs.astype(np.uint64)
+        lo = np.zeros(len(refs), dtype=np.int64)
+        hi = np.full(len(refs), size, dtype=np.int64)
+        active = lo < hi
+        while active.any():
+            mid = (lo + hi) // 2
+            below = active & (ids[np.minimum(mid, size - 1)] < refs)
+            lo = np.where(below, mid + 1, lo)
+            hi = np.where(active & ~below, mid, hi)
+            active = lo < hi
+        found = (lo < size) & (ids[np.minimum(lo, size - 1)] == refs)
+        return np.where(found, lo, -1)
+
+    def bounds(self, refs: np.ndarray) -> Optional[Bbox]:
+        """Bounding box of the nodes `refs` that have a location."""
+        refs = np.unique(refs[refs > 0])
+        if self.dense is not None:
+            xy = self.dense[refs[refs < len(self.dense)]]
+            x, y = xy[:, 0], xy[:, 1]
+        else:
+            positions = self._lookup_sparse(refs)
+            positions = positions[positions >= 0]
+            x, y = self.sparse['x'][positions], self.sparse['y'][positions]
+        valid = (x != UNDEFINED_COORDINATE) & (y != UNDEFINED_COORDINATE)
+        if not valid.any():
+            return None
+        x, y = x[valid], y[valid]
+        return (x.min() / COORDINATE_PRECISION, y.min() / COORDINATE_PRECISION,
+                x.max() / COORDINATE_PRECISION, y.max() / COORDINATE_PRECISION)
+
+
+def _scan_block(data: bytes, locations: Optional[_CachedLocations]) -> Tuple[str, Optional[int], Optional[int], Optional[Bbox]]:
+    """(kind, min id, max id, bbox) of a decompressed PrimitiveBlock."""
+    granularity, lat_offset, lon_offset = 100, 0, 0
+    groups = []
+    for field, value in _fields(data):
+        if field == 2:
+            groups.append(value)
+        elif field == 17:
+            granularity = value
+        elif field == 19:
+            lat_offset = _int64(value)
+        elif field == 20:
+            lon_offset = _int64(value)
+
+    kinds, ids, lats, lons, way_refs, ref_counts = set(), [], [], [], [], []
+    for group in groups:
+        for field, value in _fields(group):
+            if field == 1:  # Node
+                kinds.add('node')
+                node_id, lat, lon, visible = 0, 0, 0, True
+                for node_field, node_value in _fields(value):
+                    if node_field == 1:
+                        node_id = _sint64(node_value)
+                    elif node_field == 4:
+                        visible = all(v for f, v in _fields(node_value) if f == 6)
+                    elif node_field == 8:
+                        lat = _sint64(node_value)
+                    elif node_field == 9:
+                        lon = _sint64(node_value)
+                ids.append(np.array([node_id]))
+                if visible:
+                    lats.append(np.array([lat]))
+                    lons.append(np.array([lon]))
+            elif field == 2:  # DenseNodes
+                kinds.add('node')
+                dense = dict.fromkeys((1, 8, 9), b'')
+                visible = None
+                for dense_field, dense_value in _fields(value):
+                    if dense_field in dense:
+                        dense[dense_field] = dense_value
+                    elif dense_field == 5:
+                        for info_field, info_value in _fields(dense_value):
+                            if info_field == 6:  # packed bools, one byte each
+                                visible = np.frombuffer(info_value, dtype=np.uint8) != 0
+                ids.append(np.cumsum(_packed_sint64(dense[1])))
+                lat, lon = np.cumsum(_packed_sint64(dense[8])), np.cumsum(_packed_sint64(dense[9]))
+                if visible is not None and len(visible) == len(lat):
+                    lat, lon = lat[visible], lon[visible]
+                lats.append(lat)
+                lons.append(lon)
+            elif field == 3:  # Way
+                kinds.add('way')
+                for way_field, way_value in _fields(value):
+                    if way_field == 1:
+                        ids.append(np.array([_int64(way_value)]))
+                    elif way_field == 8:
+                        way_refs.append(bytes(way_value))
+                        ref_counts.append(int(np.count_nonzero(np.frombuffer(way_value, dtype=np.uint8) < 0x80)))
+            elif field == 4:  # Relation
+                kinds.add('relation')
+                for relation_field, relation_value in _fields(value):
+                    if relation_field == 1:
+                        ids.append(np.array([_int64(relation_value)]))
+                        break
+            elif field == 5:
+                kinds.add('changeset')
+
+    if len(kinds) != 1:
+        return 'mixed', None, None, None
+    kind = kinds.pop()
+    all_ids = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+    min_id, max_id = (int(all_ids.min()), int(all_ids.max())) if all_ids.size else (None, None)
+
+    bbox = None
+    if kind == 'node' and lats and sum(len(lat) for lat in lats):
+        lat = lat_offset + granularity * np.concatenate(lats).astype(np.int64)  # nanodegrees
+        lon = lon_offset + granularity * np.concatenate(lons).astype(np.int64)
+        # Nodes without a location are written with the undefined one
+        defined = (lat != UNDEFINED_COORDINATE * 100) & (lon != UNDEFINED_COORDINATE * 100)
+        if defined.any():
+            lat, lon = lat[defined], lon[defined]
+            bbox = (int(lon.min()) / 1e9, int(lat.min()) / 1e9, int(lon.max()) / 1e9, int(lat.max()) / 1e9)
+    elif kind == 'way' and way_refs and locations is not None:
+        bbox = locations.bounds(_delta_decode(_packed_sint64(b''.join(way_refs)), ref_counts))
+    return ('mixed' if kind == 'changeset' else kind), min_id, max_id, bbox
+
+
+# --- The index ---
+
+class BlockIndex:
+    """The blocks of one PBF file."""
+
+    def __init__(self, pbf_path: Path, blocks: List[Block]):
+        self.pbf_path = Path(pbf_path)
+        self.blocks = blocks
+
+    @classmethod
+    def build(cls, pbf_path: Path, node_locations: Optional[NodeIndexChoice] = None) -> 'BlockIndex':
+        """Scan every block of `pbf_path`; way blocks get a bbox from `node_locations` (a cache file)."""
+        locations = _CachedLocations(node_locations) if node_locations is not None else None
+        blocks = []
+        started = time.perf_counter()
+        with open(pbf_path, 'rb') as f:
+            for offset, length, blob_type, blob in _read_blobs(f):
+                if blob_type == 'OSMHeader':
+                    blocks.append(Block(offset, length, 'header'))
+                    continue
+                data = _decompress(blob) if blob_type == 'OSMData' else None
+                if data is None:
+                    blocks.append(Block(offset, length, 'unknown'))
+                    continue
+                blocks.append(Block(offset, length, *_scan_block(data, locations)))
+        logger.info(f"Indexed {len(blocks)} blocks of {Path(pbf_path).name} in {time.perf_counter() - started:.1f}s")
+        return cls(pbf_path, blocks)
+
+    @classmethod
+    def load(cls, pbf_path: Path, index_path: Path) -> Optional['BlockIndex']:
+        """A saved index, or None when it is missing or was written by another INDEX_VERSION."""
+        try:
+            saved = json.loads(index_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if saved.get('version') != INDEX_VERSION:
+            return None
+        return cls(pbf_path, [Block(offset, length, kind, min_id, max_id, tuple(bbox) if bbox else None)
+                              for offset, length, kind, min_id, max_id, bbox in saved['blocks']])
+
+    def save(self, index_path: Path) -> None:
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = index_path.with_name(f"{index_path.name}.{os.getpid()}")
+        tmp.write_text(json.dumps({
+            'version': INDEX_VERSION,
+            'source_file': self.pbf_path.name,
+            'blocks': [[b.offset, b.length, b.kind, b.min_id, b.max_id, b.bbox] for b in self.blocks],
+        }))
+        tmp.replace(index_path)
+
+    def select(self, bbox: Bbox) -> List[Block]:
+        """The blocks reading `bbox` needs, in file order."""
+        return [block for block in self.blocks if block.needed_for(bbox)]
+
+    def write_blocks(self, blocks: List[Block], out_path: Path) -> None:
+        """Copy `blocks` (still compressed) into a new PBF file."""
+        with open(self.pbf_path, 'rb') as src, open(out_path, 'wb') as dst:
+            for block in blocks:
+                src.seek(block.offset)
+                dst.write(src.read(block.length))
+
+
+def block_index(pbf_path: Path, node_locations: Optional[NodeIndexChoice] = None) -> BlockIndex:
+    """The saved index of `pbf_path`, built (and saved) when there is none."""
+    index_path = PBF_INDEX_DIR / f"{cached_file_sha256(pbf_path)}.json"
+    index = BlockIndex.load(pbf_path, index_path)
+    if index is None:
+        index = BlockIndex.build(pbf_path, node_locations)
+        index.save(index_path)
+    return index
+
+
+def apply_in_bbox(handler: osmium.SimpleHandler, pbf_path: Path, bbox: Bbox,
+                  node_index: Optional[str] = None, cache: bool = NODE_CACHE,
+                  block_filter: bool = PBF_BLOCK_INDEX) -> NodeIndexChoice:
+    """
+    apply_with_node_index over the blocks of `pbf_path` that overlap `bbox`
+    (min_lon, min_lat, max_lon, max_lat). The first run over a file reads it
+    whole, building the node location cache and then the block index.
+    """
+    pbf_path = Path(pbf_path)
+    if not (block_filter and cache) or pbf_path.stat().st_size < PBF_INDEX_MIN_BYTES:
+        return apply_with_node_index(handler, pbf_path, node_index, cache)
+
+    choice = resolve_node_index(pbf_path, node_index, cache)
+    if choice.cache != 'reuse':
+        # No location cache to fill in nodes outside the selected blocks (yet)
+        choice = apply_with_node_index(handler, pbf_path, node_index, cache)
+        if choice.cache == 'build':
+            block_index(pbf_path, choice)
+        return choice
+
+    index = block_index(pbf_path, choice)
+    blocks = index.select(bbox)
+    selected = sum(block.length for block in blocks)
+    total = sum(block.length for block in index.blocks)
+    logger.info(f"Bbox {bbox} needs {len(blocks)} of {len(index.blocks)} blocks "
+                f"({selected / 1024 ** 2:.1f} of {total / 1024 ** 2:.1f} MB)")
+    if selected > total * FULL_READ_SHARE:
+        return apply_with_node_index(handler, pbf_path, node_index, cache)
+
+    suffix = '.osh.pbf' if pbf_path.name.endswith('.osh.pbf') else '.osm.pbf'
+    subset_path = PBF_INDEX_DIR / f"{pbf_path.name}.{os.getpid()}.bbox{suffix}"
+    try:
+        index.write_blocks(blocks, subset_path)
+        return apply_with_node_index(handler, pbf_path, node_index, cache, read_path=subset_path)
+    finally:
+        if subset_path.exists():
+            subset_path.unlink()
@@ -0,0 +1,136 @@
+# scripts/utils/quarantine.py
+"""
+Failure handling for the row-by-row loaders.
+
+write_in_batches writes features on one connection, each batch under a
+savepoint and committed on its own. When a batch fails it is rolled back to the
+savepoint and replayed one row at a time, so only the failing rows are lost and
+the cost of a failure is proportional to the number of failures, not to the
+size of the transaction.
+
+Failing rows go to an ErrorQuarantine, which writes them to
+staging.import_errors (sql/10_setup/12_import_errors.sql) in one statement per
+flush, with the feature payload needed to retry them
+(scripts/import/reprocess_errors.py).
+"""
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from psycopg2.extras import Json, execute_values
+
+from .config import setup_logging
+from .ids import new_id
+from .metrics import metrics
+
+logger = setup_logging(__name__)
+
+LOAD_BATCH_SIZE = 500
+
+SQL_INSERT_ERRORS = """
+INSERT INTO staging.import_errors
+(run_id, importer, stage, osm_type, osm_id, feature, error_class, message)
+VALUES %s
+"""
+
+
+def feature_payload(row, query_date: Optional[str] = None, source_authority: Optional[str] = None) -> Dict[str, Any]:
+    """JSON-ready copy of a feature row (geometry as WKT) with what a retry needs."""
+    payload = {}
+    for key in ('osm_id', 'osm_type', 'entity_type', 'name_tags', 'properties', 'tags'):
+        if key in row and row[key] is not None:
+            payload[key] = row[key]
+    geometry = row['geometry'] if 'geometry' in row else None
+    if geometry is not None:
+        payload['geometry'] = geometry.wkt
+    if query_date:
+        payload['query_date'] = query_date
+    if source_authority:
+        payload['source_authority'] = source_authority
+    # Round trip through json so numpy scalars and other odd values become plain JSON
+    return json.loads(json.dumps(payload, default=lambda o: o.item() if hasattr(o, 'item') else str(o)))
+
+
+class ErrorQuarantine:
+    """Collects failed features of one import run and writes them to staging.import_errors."""
+
+    def __init__(self, db_connection, importer: str, run_id: Optional[str] = None):
+        self.db = db_connection
+        self.importer = importer
+        self.run_id = run_id or new_id()
+        self.pending: List[tuple] = []
+        self.total = 0
+
+    def add(self, stage: str, payload: Dict[str, Any], error: BaseException) -> None:
+        self.pending.append((self.run_id, self.importer, stage, payload.get('osm_type'), payload.get('osm_id'),
+                             Json(payload), type(error).__name__, str(error).strip()[:2000]))
+        self.total += 1
+        metrics.inc('import_errors_total', stage=stage)
+        logger.debug(f"Quarantined {payload.get('osm_type')} {payload.get('osm_id')} ({stage}): "
+                     f"{type(error).__name__}: {error}")
+
+    def flush(self) -> int:
+        """Write pending failures; returns how many were written."""
+        if not self.pending:
+            return 0
+        rows, self.pending = self.pending, []
+        try:
+            with self.db.get_connection() as conn:
+                with conn.cursor() as cur:
+                    execute_values(cur, SQL_INSERT_ERRORS, rows, page_size=1000)
+        except Exception as e:
+            logger.error(f"Could not write {len(rows)} failed features to staging.import_errors: {e}")
+            for row in rows[:20]:
+                logger.error(f"   {row[3]} {row[4]} ({row[2]}): {row[6]}: {row[7]}")
+            return 0
+        logger.warning(f"{len(rows)} failed features quarantined in staging.import_errors (run {self.run_id}); "
+                       f"retry with: python scripts/import/reprocess_errors.py --run-id {self.run_id}")
+        return len(rows)
+
+    def __len__(self) -> int:
+        return self.total
+
+
+def write_in_batches(conn, items: Sequence[Any], write: Callable[[Any, Any], Any],
+                     on_error: Callable[[Any, BaseException], None], batch_size: int = LOAD_BATCH_SIZE,
+                     on_batch: Optional[Callable[[int], None]] = None,
+                     write_batch: Optional[Callable[[Any, Sequence[Any]], List[Any]]] = None,
+                     before_commit: Optional[Callable[[Any, List[Any]], None]] = None) -> List[Any]:
+    """
+    Call write(cur, item) for every item, committing once per batch. A failing
+    batch is rolled back to its savepoint and replayed row by row; rows that fail
+    again are passed to on_error. Returns the results of the rows that were written.
+    With `write_batch`, a batch is first tried as write_batch(cur, batch), which
+    returns the results of all its items (in order); the replay still uses `write`.
+    `before_commit(cur, batch_results)` runs in each batch's transaction just
+    before it commits, for bookkeeping that must not outlive a lost batch.
+    """
+    results = []
+    with conn.cursor() as cur:
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            cur.execute("SAVEPOINT load_batch")
+            try:
+                if write_batch:
+                    batch_results = write_batch(cur, batch)
+                else:
+                    batch_results = [write(cur, item) for item in batch]
+                cur.execute("RELEASE SAVEPOINT load_batch")
+            except Exception:
+                cur.execute("ROLLBACK TO SAVEPOINT load_batch")
+                batch_results = []
+                for item in batch:
+                    cur.execute("SAVEPOINT load_row")
+                    try:
+                        batch_results.append(write(cur, item))
+                        cur.execute("RELEASE SAVEPOINT load_row")
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO SAVEPOINT load_row")
+                        on_error(item, e)
+            if before_commit:
+                before_commit(cur, batch_results)
+            conn.commit()
+            results.extend(batch_results)
+            if on_batch:
+                on_batch(len(batch))
+    return results
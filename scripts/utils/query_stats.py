@@ -0,0 +1,217 @@
+# scripts/utils/query_stats.py
+"""
+Statement-level timing for psycopg2 connections.
+
+TimedConnection / TimedCursor measure connect, execute, fetch and commit time and
+aggregate it per SQL template (the statement text with whitespace collapsed, so
+all calls of one parameterised query share a row). Statements slower than the
+configured threshold are logged as they happen; StatementStats.report() renders
+the end-of-run summary, optionally alongside the server-side execution times
+pg_stat_statements recorded over the same period.
+
+Used by DatabaseConnection.enable_timing() (or DB_TIMING=1 in .env).
+"""
+
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+from .config import setup_logging
+
+logger = setup_logging(__name__)
+
+TEMPLATE_MAX_LENGTH = 160
+
+SQL_PG_STAT_STATEMENTS = """
+SELECT s.queryid, s.query, s.calls, s.total_exec_time, s.rows
+FROM pg_stat_statements s
+JOIN pg_database d ON d.oid = s.dbid
+WHERE d.datname = current_database();
+"""
+
+
+def statement_template(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', errors='replace')
+    elif not isinstance(query, str):
+        query = str(query)  # psycopg2.sql.Composed and friends
+    return re.sub(r'\s+', ' ', query).strip()
+
+
+class _Statement:
+    __slots__ = ('calls', 'execute_s', 'fetch_s', 'max_s', 'rows')
+
+    def __init__(self):
+        self.calls = 0
+        self.execute_s = 0.0
+        self.fetch_s = 0.0
+        self.max_s = 0.0
+        self.rows = 0
+
+
+class StatementStats:
+    """Thread-safe per-template aggregate of client-side statement timings."""
+
+    def __init__(self, slow_query_ms: float = 500.0):
+        self.slow_query_ms = slow_query_ms
+        self.statements: Dict[str, _Statement] = {}
+        self.connects = [0, 0.0]  # count, seconds
+        self.commits = [0, 0.0]
+        self.pg_baseline: Optional[Dict[int, Tuple[str, int, float, int]]] = None
+        self.pg_available: Optional[bool] = None  # None until probed
+        self._lock = threading.Lock()
+
+    def _statement(self, template: str) -> _Statement:
+        statement = self.statements.get(template)
+        if statement is None:
+            statement = self.statements[template] = _Statement()
+        return statement
+
+    def record_execute(self, template: str, seconds: float, rows: int) -> None:
+        with self._lock:
+            statement = self._statement(template)
+            statement.calls += 1
+            statement.execute_s += seconds
+            statement.max_s = max(statement.max_s, seconds)
+            statement.rows += max(rows, 0)
+        if seconds * 1000 >= self.slow_query_ms:
+            logger.warning(f"Slow query ({seconds * 1000:.0f} ms): {template[:TEMPLATE_MAX_LENGTH]}")
+
+    def record_fetch(self, template: str, seconds: float) -> None:
+        with self._lock:
+            self._statement(template).fetch_s += seconds
+
+    def record_connect(self, seconds: float) -> None:
+        with self._lock:
+            self.connects[0] += 1
+            self.connects[1] += seconds
+
+    def record_commit(self, seconds: float) -> None:
+        with self._lock:
+            self.commits[0] += 1
+            self.commits[1] += seconds
+
+    # --- pg_stat_statements ---
+
+    def snapshot_pg_stat_statements(self, conn) -> Optional[Dict[int, Tuple[str, int, float, int]]]:
+        """Read pg_stat_statements through `conn` (not timed); None when the extension is unavailable."""
+        try:
+            with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements';")
+                if cur.fetchone() is None:
+                    self.pg_available = False
+                    return None
+                cur.execute(SQL_PG_STAT_STATEMENTS)
+                rows = cur.fetchall()
+        except psycopg2.Error as e:
+            # Installed but not in shared_preload_libraries
+            logger.debug(f"pg_stat_statements not readable: {e}")
+            conn.rollback()
+            self.pg_available = False
+            return None
+        self.pg_available = True
+        return {queryid: (query, calls, total_ms, n_rows) for queryid, query, calls, total_ms, n_rows in rows}
+
+    def _pg_stat_delta(self, current, top: int) -> List[Tuple[str, int, float, int]]:
+        baseline = self.pg_baseline or {}
+        delta = []
+        for queryid, (query, calls, total_ms, n_rows) in current.items():
+            _, base_calls, base_ms, base_rows = baseline.get(queryid, (None, 0, 0.0, 0))
+            if calls > base_calls:
+                delta.append((statement_template(query), calls - base_calls, total_ms - base_ms, n_rows - base_rows))
+        return sorted(delta, key=lambda d: d[2], reverse=True)[:top]
+
+    # --- Report ---
+
+    def report(self, top: int = 15, pg_current=None) -> str:
+        with self._lock:
+            statements = sorted(self.statements.items(), key=lambda s: s[1].execute_s + s[1].fetch_s, reverse=True)
+            connects, commits = list(self.connects), list(self.commits)
+
+        lines = [
+            "Database timing report",
+            f"  connect: {connects[0]} x, {connects[1] * 1000:.1f} ms total"
+            + (f", {connects[1] * 1000 / connects[0]:.2f} ms avg" if connects[0] else ''),
+            f"  commit:  {commits[0]} x, {commits[1] * 1000:.1f} ms total"
+            + (f", {commits[1] * 1000 / commits[0]:.2f} ms avg" if commits[0] else ''),
+            f"  {'calls':>7} {'exec ms':>10} {'fetch ms':>9} {'max ms':>8} {'rows':>9}  statement",
+        ]
+        for template, s in statements[:top]:
+            lines.append(f"  {s.calls:>7} {s.execute_s * 1000:>10.1f} {s.fetch_s * 1000:>9.1f} "
+                         f"{s.max_s * 1000:>8.1f} {s.rows:>9}  {template[:TEMPLATE_MAX_LENGTH]}")
+
+        if pg_current:
+            lines.append("  pg_stat_statements (server execution during this run):")
+            lines.append(f"  {'calls':>7} {'exec ms':>10} {'mean ms':>9} {'rows':>9}  statement")
+            for query, calls, total_ms, n_rows in self._pg_stat_delta(pg_current, top):
+                lines.append(f"  {calls:>7} {total_ms:>10.1f} {total_ms / calls:>9.2f} {n_rows:>9}  "
+                             f"{query[:TEMPLATE_MAX_LENGTH]}")
+        return '\n'.join(lines)
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor reporting execute/fetch durations to its connection's StatementStats."""
+
+    _template = ''
+
+    def _stats(self) -> Optional[StatementStats]:
+        return getattr(self.connection, 'stats', None)
+
+    def _timed_execute(self, method, query, *args):
+        self._template = statement_template(query)
+        started = time.perf_counter()
+        try:
+            return method(query, *args)
+        finally:
+            stats = self._stats()
+            if stats is not None:
+                stats.record_execute(self._template, time.perf_counter() - started, self.rowcount)
+
+    def execute(self, query, vars=None):
+        return self._timed_execute(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed_execute(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed_execute(super().copy_expert, sql, file, size)
+
+    def _timed_fetch(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            stats = self._stats()
+            if stats is not None:
+                stats.record_fetch(self._template, time.perf_counter() - started)
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(super().fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors are TimedCursors and whose commits are timed."""
+
+    stats: Optional[StatementStats] = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = TimedCursor
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            if self.stats is not None:
+                self.stats.record_commit(time.perf_counter() - started)
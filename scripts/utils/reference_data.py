@@ -0,0 +1,77 @@
+# scripts/utils/reference_data.py
+"""
+Reference data shared by the loaders: entity types, languages and name types
+with their SMALLINT surrogate ids (sql/10_setup/09_reference_data.sql).
+
+DatabaseConnection.reference_data() (and its asyncio twin) reads all three
+tables in one round trip the first time it is needed and keeps the result for
+the life of the process. If the tables cannot be read, the fallback codes below
+are used instead; the ids are then unknown (None) and bulk loaders must ship
+the codes themselves.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SQL_REFERENCE_DATA = """
+SELECT 'entity_type' AS kind, type_code AS code, type_id AS id FROM toponyms.entity_types
+UNION ALL
+SELECT 'language', language_code, language_id FROM toponyms.languages
+UNION ALL
+SELECT 'name_type', name_type, name_type_id FROM toponyms.name_types
+ORDER BY kind, code;
+"""
+
+# Used when the reference tables cannot be read; entity types exactly as seeded by sql/10_setup/03_tables.sql
+FALLBACK_ENTITY_TYPES = ('region', 'district', 'city', 'street', 'square', 'park', 'building',
+                         'point_of_interest', 'area', 'path', 'waterway')
+FALLBACK_LANGUAGES = ('ukr', 'rus', 'eng', 'und')
+FALLBACK_NAME_TYPES = ('official', 'historical', 'traditional', 'colloquial', 'memorial',
+                       'occupational', 'former', 'variant')
+
+
+class ReferenceData:
+    """Code -> surrogate id maps for the toponyms lookup tables."""
+
+    def __init__(self, entity_types: Dict[str, Optional[int]], languages: Dict[str, Optional[int]],
+                 name_types: Dict[str, Optional[int]], from_database: bool = True):
+        self.entity_types = entity_types
+        self.languages = languages
+        self.name_types = name_types
+        self.from_database = from_database
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, Optional[int]]]) -> 'ReferenceData':
+        """Build from (kind, code, id) rows as returned by SQL_REFERENCE_DATA."""
+        maps: Dict[str, Dict[str, Optional[int]]] = {'entity_type': {}, 'language': {}, 'name_type': {}}
+        for kind, code, id_ in rows:
+            maps[kind][code] = id_
+        return cls(maps['entity_type'], maps['language'], maps['name_type'])
+
+    @classmethod
+    def fallback(cls) -> 'ReferenceData':
+        return cls(dict.fromkeys(FALLBACK_ENTITY_TYPES), dict.fromkeys(FALLBACK_LANGUAGES),
+                   dict.fromkeys(FALLBACK_NAME_TYPES), from_database=False)
+
+    @property
+    def entity_type_codes(self) -> List[str]:
+        return list(self.entity_types)
+
+    @staticmethod
+    def _lookup(table: Dict[str, Optional[int]], kind: str, code: str) -> Optional[int]:
+        try:
+            return table[code]
+        except KeyError:
+            raise KeyError(f"Unknown {kind} {code!r}; expected one of {', '.join(table)}") from None
+
+    def entity_type_id(self, code: str) -> Optional[int]:
+        return self._lookup(self.entity_types, 'entity type', code)
+
+    def language_id(self, code: str) -> Optional[int]:
+        return self._lookup(self.languages, 'language', code)
+
+    def name_type_id(self, code: str) -> Optional[int]:
+        return self._lookup(self.name_types, 'name type', code)
+
+    def summary(self) -> str:
+        return (f"{len(self.entity_types)} entity types, {len(self.languages)} languages, "
+                f"{len(self.name_types)} name types" + ("" if self.from_database else " (fallback)"))
@@ -0,0 +1,56 @@
+# scripts/utils/spatial_key.py
+"""
+Spatial sort key for entities: the geohash of the centroid, matching
+toponyms.spatial_key() in sql/10_setup/10_spatial_clustering.sql.
+
+Loaders sort each batch by this key before writing, so new rows land on disk
+next to their neighbours, in the same order CLUSTER
+(scripts/maintenance/cluster_entities.py) puts existing rows.
+"""
+
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+
+SPATIAL_KEY_PRECISION = 10
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lon: float, lat: float, precision: int = SPATIAL_KEY_PRECISION) -> str:
+    """Standard geohash of a WGS84 point (same output as PostGIS ST_GeoHash)."""
+    lon_range, lat_range = [-180.0, 180.0], [-90.0, 90.0]
+    chars = []
+    bits = value = 0
+    even = True  # bits alternate, starting with longitude
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def spatial_key(geometry) -> Optional[str]:
+    """Sort key of a shapely geometry (None for empty geometries, which sort last)."""
+    if geometry is None or geometry.is_empty:
+        return None
+    centroid = geometry.centroid
+    return geohash(centroid.x, centroid.y)
+
+
+def sort_by_spatial_key(gdf: 'gpd.GeoDataFrame') -> 'gpd.GeoDataFrame':
+    """Rows of gdf ordered by spatial_key of their geometry."""
+    keys = [spatial_key(geometry) for geometry in gdf.geometry]
+    order = sorted(range(len(keys)), key=lambda i: (keys[i] is None, keys[i] or ''))
+    return gdf.iloc[order]
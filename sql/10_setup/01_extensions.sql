@@ -13,6 +13,9 @@ CREATE EXTENSION IF NOT EXISTS pgcrypto;
 -- Advanced indexing for temporal queries (used by EXCLUDE constraints)
 CREATE EXTENSION IF NOT EXISTS btree_gist;
 
+-- Per-statement server execution statistics (read by the DB_TIMING report; needs shared_preload_libraries)
+CREATE EXTENSION IF NOT EXISTS pg_stat_statements;
+
 -- Add comment explaining our database purpose
 COMMENT ON DATABASE mariupol_toponyms IS 
 'Bitemporal database tracking toponymic changes in Mariupol for historical preservation and legal documentation';
@@ -0,0 +1,23 @@
+-- 04_addresses.sql
+-- Address points (building footprints with housenumber/street) loaded from address datasets.
+
+CREATE TABLE IF NOT EXISTS toponyms.addresses (
+    address_id BIGSERIAL PRIMARY KEY,
+    entity_id UUID NOT NULL REFERENCES toponyms.entities(entity_id) ON DELETE CASCADE,
+    source_dataset VARCHAR(100) NOT NULL,
+    osm_id BIGINT NOT NULL,
+    housenumber VARCHAR(50),
+    street_text TEXT,
+    normalized_street TEXT,
+    city VARCHAR(100),
+    postcode VARCHAR(10),
+    building_type VARCHAR(50),
+    amenity VARCHAR(50),
+    valid_start TIMESTAMPTZ NOT NULL,
+    loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT addresses_dataset_osm_id_key UNIQUE (source_dataset, osm_id)
+);
+CREATE INDEX IF NOT EXISTS addresses_entity_id_idx ON toponyms.addresses (entity_id);
+CREATE INDEX IF NOT EXISTS addresses_normalized_street_idx ON toponyms.addresses (normalized_street);
+
+COMMENT ON TABLE toponyms.addresses IS 'Addresses attached to building entities, keyed by (source_dataset, osm_id) for idempotent reloads';
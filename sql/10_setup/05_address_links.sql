@@ -0,0 +1,15 @@
+-- 05_address_links.sql
+-- Links between addresses and the street entities their street text refers to.
+
+CREATE TABLE IF NOT EXISTS toponyms.address_street_links (
+    address_id BIGINT PRIMARY KEY REFERENCES toponyms.addresses(address_id) ON DELETE CASCADE,
+    street_entity_id UUID REFERENCES toponyms.entities(entity_id) ON DELETE CASCADE,
+    matched_name_id UUID,
+    match_method VARCHAR(20) NOT NULL CHECK (match_method IN ('name_and_distance', 'distance_only', 'unmatched')),
+    confidence NUMERIC(4, 3) NOT NULL DEFAULT 0,
+    distance_m DOUBLE PRECISION,
+    linked_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS address_street_links_street_idx ON toponyms.address_street_links (street_entity_id);
+
+COMMENT ON TABLE toponyms.address_street_links IS 'Address-to-street matches with confidence, rebuilt by scripts/import/link_addresses.py';
@@ -0,0 +1,23 @@
+-- 06_address_summary.sql
+-- Precomputed address statistics per snapshot date and per district (see scripts/analysis/address_stats.py).
+
+CREATE TABLE IF NOT EXISTS toponyms.address_summary (
+    breakdown VARCHAR(10) NOT NULL CHECK (breakdown IN ('date', 'district')),
+    valid_date DATE NOT NULL,
+    district_entity_id UUID,
+    total_addresses INTEGER NOT NULL,
+    unique_streets INTEGER NOT NULL,
+    unique_postcodes INTEGER NOT NULL,
+    building_types INTEGER NOT NULL,
+    amenity_types INTEGER NOT NULL,
+    min_housenumber_length INTEGER,
+    max_housenumber_length INTEGER,
+    avg_building_area_sqm DOUBLE PRECISION,
+    bounding_box TEXT,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE UNIQUE INDEX IF NOT EXISTS address_summary_group_idx ON toponyms.address_summary (
+    breakdown, valid_date, COALESCE(district_entity_id, '00000000-0000-0000-0000-000000000000'::uuid)
+);
+
+COMMENT ON TABLE toponyms.address_summary IS 'Address aggregates per date (breakdown=date) and per date and district (breakdown=district)';
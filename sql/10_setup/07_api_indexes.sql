@@ -0,0 +1,8 @@
+-- 07_api_indexes.sql
+-- Indexes for the HTTP lookup service (scripts/api/)
+
+-- Prefix search: normalized_name LIKE 'prefix%' can only use a btree with pattern ops
+-- under a non-C collation (names_normalized_name_idx serves equality lookups).
+CREATE INDEX IF NOT EXISTS names_normalized_name_pattern_idx
+    ON toponyms.names (normalized_name text_pattern_ops)
+    WHERE txn_end IS NULL;
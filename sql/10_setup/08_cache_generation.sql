@@ -0,0 +1,47 @@
+-- 08_cache_generation.sql
+-- Generation counter for read caches (scripts/api/). Every import batch calls
+-- audit.bump_cache_generation() with the entities it touched; the lookup service
+-- listens on the 'cache_generation' channel (polling as a fallback) and drops only
+-- the cached results affected by the entities recorded since its last generation.
+
+CREATE TABLE IF NOT EXISTS audit.cache_generation (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    generation BIGINT NOT NULL DEFAULT 0,
+    bumped_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO audit.cache_generation (singleton) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS audit.cache_invalidations (
+    generation BIGINT PRIMARY KEY,
+    entity_ids UUID[],          -- NULL: the batch could not say which entities changed
+    source TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+COMMENT ON TABLE audit.cache_invalidations IS
+'Entities touched per import batch, kept 7 days; caches further behind than that flush completely';
+
+CREATE OR REPLACE FUNCTION audit.bump_cache_generation(
+    p_entity_ids UUID[] DEFAULT NULL,
+    p_source TEXT DEFAULT NULL
+)
+RETURNS BIGINT AS $$
+DECLARE
+    new_generation BIGINT;
+BEGIN
+    UPDATE audit.cache_generation
+    SET generation = generation + 1, bumped_at = NOW()
+    WHERE singleton
+    RETURNING generation INTO new_generation;
+
+    INSERT INTO audit.cache_invalidations (generation, entity_ids, source)
+    VALUES (new_generation, p_entity_ids, p_source);
+
+    DELETE FROM audit.cache_invalidations WHERE created_at < NOW() - INTERVAL '7 days';
+
+    -- Delivered on commit, so listeners never see a generation before its rows
+    PERFORM pg_notify('cache_generation', new_generation::text);
+    RETURN new_generation;
+END;
+$$ LANGUAGE plpgsql;
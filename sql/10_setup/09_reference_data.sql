@@ -0,0 +1,38 @@
+-- 09_reference_data.sql
+-- Lookup tables with small integer surrogate keys. Loaders read them once per
+-- process (scripts/utils/reference_data.py) and bulk paths ship the SMALLINT ids
+-- instead of repeating the VARCHAR codes on every row.
+
+ALTER TABLE toponyms.entity_types
+    ADD COLUMN IF NOT EXISTS type_id SMALLINT GENERATED BY DEFAULT AS IDENTITY;
+CREATE UNIQUE INDEX IF NOT EXISTS entity_types_type_id_idx ON toponyms.entity_types (type_id);
+
+CREATE TABLE IF NOT EXISTS toponyms.languages (
+    language_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    language_code VARCHAR(3) NOT NULL UNIQUE,
+    language_name_en VARCHAR(100) NOT NULL,
+    default_script VARCHAR(4)
+);
+
+INSERT INTO toponyms.languages (language_code, language_name_en, default_script) VALUES
+('ukr', 'Ukrainian', 'Cyrl'),
+('rus', 'Russian', 'Cyrl'),
+('eng', 'English', 'Latn'),
+('und', 'Undetermined', NULL)
+ON CONFLICT (language_code) DO NOTHING;
+
+-- Name types mirror the CHECK constraint on toponyms.names.name_type, so the
+-- constraint stays the single place where the list is maintained.
+CREATE TABLE IF NOT EXISTS toponyms.name_types (
+    name_type_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    name_type VARCHAR(20) NOT NULL UNIQUE
+);
+
+INSERT INTO toponyms.name_types (name_type)
+SELECT m[1]
+FROM pg_constraint c
+CROSS JOIN LATERAL regexp_matches(pg_get_constraintdef(c.oid), '''([a-z_]+)''::', 'g') AS m
+WHERE c.conrelid = 'toponyms.names'::regclass
+  AND c.contype = 'c'
+  AND pg_get_constraintdef(c.oid) LIKE '%name_type%'
+ON CONFLICT (name_type) DO NOTHING;
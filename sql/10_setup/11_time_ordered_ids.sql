@@ -0,0 +1,28 @@
+-- 11_time_ordered_ids.sql
+-- Time-ordered (version 7) UUID defaults for entity and name keys.
+--
+-- uuid_generate_v4() scatters new keys over the whole primary key and
+-- names_entity_id_idx btrees; version 7 ids start with the creation time in
+-- milliseconds, so new rows append to the right edge of the indexes. Loaders
+-- generate the same kind of id client-side (scripts/utils/ids.py) and skip
+-- RETURNING. Existing version 4 ids are untouched and stay valid.
+
+-- Random v4 UUID with the 48-bit Unix millisecond timestamp written over its
+-- first six bytes and the version nibble turned from 4 (0100) into 7 (0111)
+CREATE OR REPLACE FUNCTION toponyms.uuid_generate_v7()
+RETURNS UUID AS $$
+    SELECT encode(
+        set_bit(
+            set_bit(
+                overlay(uuid_send(gen_random_uuid())
+                        PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                        FROM 1 FOR 6),
+                52, 1),
+            53, 1),
+        'hex')::uuid;
+$$ LANGUAGE sql VOLATILE;
+
+COMMENT ON FUNCTION toponyms.uuid_generate_v7 IS 'Time-ordered UUID (RFC 9562 version 7)';
+
+ALTER TABLE toponyms.entities ALTER COLUMN entity_id SET DEFAULT toponyms.uuid_generate_v7();
+ALTER TABLE toponyms.names ALTER COLUMN name_id SET DEFAULT toponyms.uuid_generate_v7();
@@ -0,0 +1,28 @@
+-- 12_import_errors.sql
+-- Quarantine for features an import could not write.
+--
+-- Loaders write each batch under a savepoint; when a batch fails it is replayed
+-- row by row and only the failing features land here, with enough of the
+-- feature to retry it (scripts/import/reprocess_errors.py) without re-reading
+-- the PBF. Rows that later load successfully keep their entry, with resolved_at set.
+
+CREATE TABLE IF NOT EXISTS staging.import_errors (
+    error_id BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    run_id UUID NOT NULL,
+    importer VARCHAR(50) NOT NULL,
+    stage VARCHAR(20) NOT NULL,
+    osm_type VARCHAR(10),
+    osm_id BIGINT,
+    feature JSONB NOT NULL,
+    error_class VARCHAR(100) NOT NULL,
+    message TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    attempts INTEGER NOT NULL DEFAULT 1,
+    resolved_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS import_errors_open_idx
+    ON staging.import_errors (run_id, stage)
+    WHERE resolved_at IS NULL;
+
+COMMENT ON TABLE staging.import_errors IS 'Features that failed to import, kept for retry by scripts/import/reprocess_errors.py';
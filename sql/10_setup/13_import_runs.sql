@@ -0,0 +1,69 @@
+-- 13_import_runs.sql
+-- Import-run provenance.
+--
+-- Every importer registers a run (source file and its SHA-256, query date,
+-- authority, timing and row counts) and tags the rows it writes with the run
+-- id, instead of repeating the authority, source type, reliability and a long
+-- notes string on every name. Per-row provenance is reduced to the run id, the
+-- OSM object on the entity and the OSM tag key of each name as a SMALLINT.
+-- Deleting a run's row from import_runs removes everything it wrote.
+
+CREATE TABLE IF NOT EXISTS toponyms.import_runs (
+    run_id UUID PRIMARY KEY DEFAULT toponyms.uuid_generate_v7(),
+    importer VARCHAR(50) NOT NULL,
+    source_file TEXT,
+    file_hash CHAR(64),
+    file_bytes BIGINT,
+    query_date TIMESTAMPTZ,
+    source_authority VARCHAR(255),
+    source_type VARCHAR(50),
+    source_reliability VARCHAR(50),
+    status VARCHAR(20) NOT NULL DEFAULT 'running' CHECK (status IN ('running', 'finished', 'failed')),
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    entities_written INTEGER NOT NULL DEFAULT 0,
+    names_written INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    started_by VARCHAR(100) DEFAULT CURRENT_USER
+);
+CREATE INDEX IF NOT EXISTS import_runs_file_hash_idx ON toponyms.import_runs (file_hash);
+
+CREATE TABLE IF NOT EXISTS toponyms.osm_tag_keys (
+    tag_key_id SMALLINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    tag_key VARCHAR(100) NOT NULL UNIQUE
+);
+
+-- Common keys; importers add others the first time they see them
+INSERT INTO toponyms.osm_tag_keys (tag_key) VALUES
+('name'), ('name:uk'), ('name:ru'), ('name:en'), ('old_name'), ('alt_name'), ('official_name'),
+('short_name'), ('addr:street')
+ON CONFLICT (tag_key) DO NOTHING;
+
+ALTER TABLE toponyms.entities
+    ADD COLUMN IF NOT EXISTS run_id UUID REFERENCES toponyms.import_runs(run_id) ON DELETE CASCADE,
+    ADD COLUMN IF NOT EXISTS osm_type "char",  -- n, w or r
+    ADD COLUMN IF NOT EXISTS osm_id BIGINT;
+CREATE INDEX IF NOT EXISTS entities_run_id_idx ON toponyms.entities (run_id);
+
+ALTER TABLE toponyms.names
+    ADD COLUMN IF NOT EXISTS run_id UUID REFERENCES toponyms.import_runs(run_id) ON DELETE CASCADE,
+    ADD COLUMN IF NOT EXISTS osm_tag_key_id SMALLINT REFERENCES toponyms.osm_tag_keys(tag_key_id);
+CREATE INDEX IF NOT EXISTS names_run_id_idx ON toponyms.names (run_id);
+
+-- The provenance a name row used to spell out in its notes
+CREATE OR REPLACE VIEW toponyms.name_provenance AS
+SELECT n.name_id, n.entity_id, n.run_id,
+       r.importer, r.source_file, r.file_hash, r.query_date, r.started_at AS imported_at,
+       COALESCE(n.source_type, r.source_type) AS source_type,
+       COALESCE(n.source_reliability, r.source_reliability) AS source_reliability,
+       r.source_authority,
+       CASE e.osm_type WHEN 'n' THEN 'node' WHEN 'w' THEN 'way' WHEN 'r' THEN 'relation' END AS osm_type,
+       e.osm_id,
+       k.tag_key AS osm_tag_key,
+       n.notes
+FROM toponyms.names n
+JOIN toponyms.entities e ON e.entity_id = n.entity_id
+LEFT JOIN toponyms.import_runs r ON r.run_id = n.run_id
+LEFT JOIN toponyms.osm_tag_keys k ON k.tag_key_id = n.osm_tag_key_id;
+
+COMMENT ON TABLE toponyms.import_runs IS 'One row per importer run; rows written by a run carry its run_id';
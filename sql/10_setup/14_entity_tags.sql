@@ -0,0 +1,14 @@
+-- 14_entity_tags.sql
+-- OSM tags of each entity as JSONB.
+--
+-- The importers classify entities from their OSM tags; the non-name tags are
+-- kept here (names are rows of toponyms.names) so tag-based questions run on an
+-- index instead of re-reading PBFs. The GIN index uses the default jsonb_ops
+-- class, which serves both key existence (tags ? 'highway') and containment
+-- (tags @> '{"historic": "memorial"}').
+
+ALTER TABLE toponyms.entities ADD COLUMN IF NOT EXISTS tags JSONB;
+
+CREATE INDEX IF NOT EXISTS entities_tags_idx ON toponyms.entities USING GIN (tags);
+
+COMMENT ON COLUMN toponyms.entities.tags IS 'OSM tags other than name tags, as imported';
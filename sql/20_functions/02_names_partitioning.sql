@@ -0,0 +1,164 @@
+-- 02_names_partitioning.sql
+-- Helpers for toponyms.names range-partitioned by valid_start year.
+--
+-- scripts/maintenance/partition_names.py converts the plain table into
+-- toponyms.names PARTITION BY RANGE (valid_start) with one partition per year,
+-- one partition for everything before the first year and a DEFAULT partition.
+-- Exclusion constraints cannot span partitions (PostgreSQL 16), so each
+-- partition gets its own copy of name_temporal_uniqueness and
+-- toponyms.check_name_overlap() rejects overlaps between partitions.
+
+-- Creates (or returns the existing) partition of p_parent for [p_from, p_to).
+-- Rows already in the DEFAULT partition for that range are moved into it first,
+-- so a year can be added after its rows started arriving. With p_attach = FALSE
+-- the table is left detached and without its exclusion constraint, for bulk
+-- loads (scripts/utils/bulk_load.py) that fill it before attach_names_partition.
+--
+-- p_parent is TEXT and resolved on each call: a REGCLASS default is bound to the
+-- table's oid when the function is created, so after partition_names.py swaps
+-- the tables it would still point at toponyms.names_unpartitioned (and keep that
+-- table from being dropped).
+DROP FUNCTION IF EXISTS toponyms.create_names_partition(TEXT, TIMESTAMPTZ, TIMESTAMPTZ, REGCLASS);
+DROP FUNCTION IF EXISTS toponyms.create_names_partition(TEXT, TIMESTAMPTZ, TIMESTAMPTZ, REGCLASS, BOOLEAN);
+DROP FUNCTION IF EXISTS toponyms.attach_names_partition(TEXT, TIMESTAMPTZ, TIMESTAMPTZ, REGCLASS);
+DROP FUNCTION IF EXISTS toponyms.ensure_names_partition(INTEGER, REGCLASS);
+DROP FUNCTION IF EXISTS toponyms.ensure_names_partition(INTEGER, REGCLASS, BOOLEAN);
+DROP FUNCTION IF EXISTS toponyms.names_partition_for(TIMESTAMPTZ, REGCLASS);
+CREATE OR REPLACE FUNCTION toponyms.create_names_partition(
+    p_name TEXT,
+    p_from TIMESTAMPTZ,
+    p_to TIMESTAMPTZ,
+    p_parent TEXT DEFAULT 'toponyms.names',
+    p_attach BOOLEAN DEFAULT TRUE
+)
+RETURNS TEXT AS $$
+DECLARE
+    parent REGCLASS := p_parent::regclass;
+    default_part REGCLASS;
+BEGIN
+    IF to_regclass(format('toponyms.%I', p_name)) IS NOT NULL THEN
+        RETURN p_name;
+    END IF;
+
+    SELECT NULLIF(partdefid, 0)::regclass INTO default_part
+    FROM pg_partitioned_table
+    WHERE partrelid = parent;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION '% is not a partitioned table', parent;
+    END IF;
+
+    EXECUTE format('CREATE TABLE toponyms.%I (LIKE %s INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', p_name, parent);
+    IF default_part IS NOT NULL THEN
+        EXECUTE format(
+            'WITH moved AS (DELETE FROM %s WHERE valid_start >= %L AND valid_start < %L RETURNING *) '
+            'INSERT INTO toponyms.%I SELECT * FROM moved',
+            default_part, p_from, p_to, p_name);
+    END IF;
+    IF p_attach THEN
+        PERFORM toponyms.attach_names_partition(p_name, p_from, p_to, p_parent);
+    END IF;
+    RETURN p_name;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION toponyms.create_names_partition IS 'Creates a names partition for [p_from, p_to), moving matching rows out of the DEFAULT partition';
+
+-- Adds the exclusion constraint to a filled, detached partition and attaches it;
+-- the parent's indexes are built on it during the attach.
+CREATE OR REPLACE FUNCTION toponyms.attach_names_partition(
+    p_name TEXT,
+    p_from TIMESTAMPTZ,
+    p_to TIMESTAMPTZ,
+    p_parent TEXT DEFAULT 'toponyms.names'
+)
+RETURNS TEXT AS $$
+BEGIN
+    PERFORM toponyms.add_name_exclusion(format('toponyms.%I', p_name)::regclass);
+    EXECUTE format('ALTER TABLE %s ATTACH PARTITION toponyms.%I FOR VALUES FROM (%L) TO (%L)',
+                   p_parent::regclass, p_name, p_from, p_to);
+    RETURN p_name;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION toponyms.ensure_names_partition(
+    p_year INTEGER,
+    p_parent TEXT DEFAULT 'toponyms.names',
+    p_attach BOOLEAN DEFAULT TRUE
+)
+RETURNS TEXT AS $$
+    SELECT toponyms.create_names_partition(
+        format('names_y%s', p_year),
+        make_timestamptz(p_year, 1, 1, 0, 0, 0, 'UTC'),
+        make_timestamptz(p_year + 1, 1, 1, 0, 0, 0, 'UTC'),
+        p_parent,
+        p_attach);
+$$ LANGUAGE sql;
+
+COMMENT ON FUNCTION toponyms.ensure_names_partition IS 'Creates the names partition for a valid_start year (UTC) if it does not exist';
+
+-- Non-default partition of p_parent whose range contains p_valid_start (NULL when
+-- such rows would go to the DEFAULT partition)
+CREATE OR REPLACE FUNCTION toponyms.names_partition_for(
+    p_valid_start TIMESTAMPTZ,
+    p_parent TEXT DEFAULT 'toponyms.names'
+)
+RETURNS REGCLASS AS $$
+    SELECT c.oid::regclass
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    CROSS JOIN LATERAL regexp_match(pg_get_expr(c.relpartbound, c.oid),
+                                    '^FOR VALUES FROM \(''([^'']*)''\) TO \(''([^'']*)''\)$') AS b
+    WHERE i.inhparent = p_parent::regclass
+      AND p_valid_start >= b[1]::timestamptz
+      AND p_valid_start < b[2]::timestamptz;
+$$ LANGUAGE sql STABLE;
+
+-- Per-partition copy of name_temporal_uniqueness (sql/30_constraints/01_names_exclusion.sql)
+CREATE OR REPLACE FUNCTION toponyms.add_name_exclusion(p_table REGCLASS)
+RETURNS VOID AS $$
+BEGIN
+    EXECUTE format(
+        'ALTER TABLE %s ADD CONSTRAINT %I EXCLUDE USING gist ('
+        '    entity_id WITH =, language_code WITH =, name_type WITH =,'
+        '    tstzrange(valid_start, valid_end) WITH &&'
+        ') WHERE (txn_end IS NULL)',
+        p_table, (SELECT relname FROM pg_class WHERE oid = p_table) || '_temporal_uniqueness');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Overlaps within a partition are caught by its exclusion constraint (so ON CONFLICT
+-- handling is unchanged there); this catches the ones that cross a year boundary.
+-- The advisory lock serialises writers of the same entity/language/name type so
+-- two concurrent inserts cannot both pass.
+CREATE OR REPLACE FUNCTION toponyms.check_name_overlap()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.txn_end IS NOT NULL THEN
+        RETURN NEW;
+    END IF;
+
+    PERFORM pg_advisory_xact_lock(hashtextextended(
+        NEW.entity_id::text || '/' || NEW.language_code || '/' || NEW.name_type, 0));
+
+    IF EXISTS (
+        SELECT 1
+        FROM toponyms.names n
+        WHERE n.entity_id = NEW.entity_id
+          AND n.language_code = NEW.language_code
+          AND n.name_type = NEW.name_type
+          AND n.txn_end IS NULL
+          AND n.name_id <> NEW.name_id
+          AND n.tableoid <> TG_RELID  -- same partition: left to its exclusion constraint
+          AND tstzrange(n.valid_start, n.valid_end) && tstzrange(NEW.valid_start, NEW.valid_end)
+    ) THEN
+        RAISE EXCEPTION 'conflicting key value violates exclusion constraint "name_temporal_uniqueness"'
+            USING ERRCODE = 'exclusion_violation',
+                  DETAIL = format('Name of entity %s (%s, %s) overlaps an existing name valid in %s.',
+                                  NEW.entity_id, NEW.language_code, NEW.name_type,
+                                  tstzrange(NEW.valid_start, NEW.valid_end));
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION toponyms.check_name_overlap IS 'Enforces name_temporal_uniqueness across names partitions';
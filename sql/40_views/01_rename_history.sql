@@ -0,0 +1,128 @@
+-- 01_rename_history.sql
+-- Precomputed rename history for dashboards.
+--
+-- toponyms.entity_name_history and toponyms.name_rename_events are summary tables
+-- maintained per entity by toponyms.refresh_name_history(entity_ids), so an import
+-- batch only recomputes the entities it touched. The per-month and per-district
+-- rollups are materialized views over the (small) rename events table and are
+-- refreshed concurrently at the end of the same call.
+
+-- Ordered list of names per entity and language
+CREATE TABLE IF NOT EXISTS toponyms.entity_name_history (
+    entity_id UUID NOT NULL REFERENCES toponyms.entities(entity_id) ON DELETE CASCADE,
+    language_code VARCHAR(3) NOT NULL,
+    name_history JSONB NOT NULL,
+    name_count INTEGER NOT NULL,
+    rename_count INTEGER NOT NULL DEFAULT 0,
+    last_renamed_at TIMESTAMPTZ,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (entity_id, language_code)
+);
+
+-- One row per change of name between consecutive names of an entity in one language
+CREATE TABLE IF NOT EXISTS toponyms.name_rename_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    entity_id UUID NOT NULL REFERENCES toponyms.entities(entity_id) ON DELETE CASCADE,
+    language_code VARCHAR(3) NOT NULL,
+    renamed_at TIMESTAMPTZ NOT NULL,
+    old_name TEXT NOT NULL,
+    new_name TEXT NOT NULL,
+    new_name_type VARCHAR(20) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS name_rename_events_entity_idx ON toponyms.name_rename_events (entity_id);
+CREATE INDEX IF NOT EXISTS name_rename_events_renamed_at_idx ON toponyms.name_rename_events (renamed_at);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS toponyms.mv_renames_per_month AS
+SELECT date_trunc('month', r.renamed_at) AS month,
+       e.entity_type,
+       r.language_code,
+       COUNT(*) AS renames,
+       COUNT(DISTINCT r.entity_id) AS renamed_entities
+FROM toponyms.name_rename_events r
+JOIN toponyms.entities e ON e.entity_id = r.entity_id
+GROUP BY 1, 2, 3;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_renames_per_month_key ON toponyms.mv_renames_per_month (month, entity_type, language_code);
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS toponyms.mv_renames_per_district AS
+SELECT d.entity_id AS district_entity_id,
+       (SELECT n.name_text FROM toponyms.names n
+        WHERE n.entity_id = d.entity_id AND n.txn_end IS NULL
+        ORDER BY (n.language_code = 'ukr') DESC, n.valid_start DESC
+        LIMIT 1) AS district_name,
+       COUNT(*) AS renames,
+       COUNT(DISTINCT r.entity_id) AS renamed_entities,
+       MAX(r.renamed_at) AS last_renamed_at
+FROM toponyms.name_rename_events r
+JOIN toponyms.entities e ON e.entity_id = r.entity_id
+LEFT JOIN LATERAL (
+    SELECT dist.entity_id
+    FROM toponyms.entities dist
+    WHERE dist.entity_type = 'district'
+      AND dist.txn_end IS NULL
+      AND ST_GeometryType(dist.geometry) IN ('ST_Polygon', 'ST_MultiPolygon')
+      AND ST_Contains(dist.geometry, COALESCE(e.centroid, ST_PointOnSurface(e.geometry)))
+    ORDER BY ST_Area(dist.geometry)
+    LIMIT 1
+) d ON TRUE
+GROUP BY d.entity_id;
+CREATE UNIQUE INDEX IF NOT EXISTS mv_renames_per_district_key ON toponyms.mv_renames_per_district (district_entity_id);
+
+
+CREATE OR REPLACE FUNCTION toponyms.refresh_name_history(p_entity_ids UUID[] DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    DELETE FROM toponyms.name_rename_events
+    WHERE p_entity_ids IS NULL OR entity_id = ANY(p_entity_ids);
+
+    DELETE FROM toponyms.entity_name_history
+    WHERE p_entity_ids IS NULL OR entity_id = ANY(p_entity_ids);
+
+    INSERT INTO toponyms.name_rename_events (entity_id, language_code, renamed_at, old_name, new_name, new_name_type)
+    SELECT entity_id, language_code, valid_start, prev_name, name_text, name_type
+    FROM (
+        SELECT n.entity_id, n.language_code, n.valid_start, n.name_text, n.name_type, n.normalized_name,
+               lag(n.name_text) OVER w AS prev_name,
+               lag(n.normalized_name) OVER w AS prev_normalized_name
+        FROM toponyms.names n
+        WHERE n.txn_end IS NULL
+          AND (p_entity_ids IS NULL OR n.entity_id = ANY(p_entity_ids))
+        WINDOW w AS (PARTITION BY n.entity_id, n.language_code ORDER BY n.valid_start, n.name_id)
+    ) ordered
+    WHERE prev_name IS NOT NULL
+      AND prev_normalized_name IS DISTINCT FROM normalized_name;
+
+    INSERT INTO toponyms.entity_name_history
+    (entity_id, language_code, name_history, name_count, rename_count, last_renamed_at)
+    SELECT n.entity_id,
+           n.language_code,
+           jsonb_agg(jsonb_build_object(
+               'name', n.name_text,
+               'name_type', n.name_type,
+               'valid_start', n.valid_start,
+               'valid_end', n.valid_end
+           ) ORDER BY n.valid_start, n.name_id),
+           COUNT(*),
+           COALESCE(MAX(r.renames), 0),
+           MAX(r.last_renamed_at)
+    FROM toponyms.names n
+    LEFT JOIN (
+        SELECT entity_id, language_code, COUNT(*) AS renames, MAX(renamed_at) AS last_renamed_at
+        FROM toponyms.name_rename_events
+        WHERE p_entity_ids IS NULL OR entity_id = ANY(p_entity_ids)
+        GROUP BY entity_id, language_code
+    ) r ON r.entity_id = n.entity_id AND r.language_code = n.language_code
+    WHERE n.txn_end IS NULL
+      AND (p_entity_ids IS NULL OR n.entity_id = ANY(p_entity_ids))
+    GROUP BY n.entity_id, n.language_code;
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+
+    REFRESH MATERIALIZED VIEW CONCURRENTLY toponyms.mv_renames_per_month;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY toponyms.mv_renames_per_district;
+
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION toponyms.refresh_name_history IS 'Recomputes name history and rename events for the given entities (all when NULL) and refreshes the rename rollup views';